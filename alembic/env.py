@@ -10,6 +10,7 @@ from sqlmodel import SQLModel
 from alembic import context
 
 from hobbes.models.book_models import * # noqa: F403
+from hobbes.models.artifact_models import * # noqa: F403
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
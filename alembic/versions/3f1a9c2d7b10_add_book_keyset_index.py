@@ -0,0 +1,37 @@
+"""add book keyset pagination index
+
+Revision ID: 3f1a9c2d7b10
+Revises: 
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2d7b10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_book_create_datetimestamp_book_id",
+        "book",
+        ["create_datetimestamp", "book_id"],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_book_create_datetimestamp_book_id", table_name="book", if_exists=True
+    )
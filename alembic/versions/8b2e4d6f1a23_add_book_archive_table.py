@@ -0,0 +1,43 @@
+"""add book archive table
+
+Revision ID: 8b2e4d6f1a23
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-18 10:04:12.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e4d6f1a23"
+down_revision: Union[str, None] = "3f1a9c2d7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "book_archive",
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("isbn", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("genre", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("condition", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("book_id", sa.Uuid(), nullable=False),
+        sa.Column("create_datetimestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("archive_datetimestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("book_id"),
+    )
+    op.create_index(
+        op.f("ix_book_archive_isbn"), "book_archive", ["isbn"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_book_archive_isbn"), table_name="book_archive")
+    op.drop_table("book_archive")
@@ -0,0 +1,37 @@
+"""add hero team recent index
+
+Revision ID: a6d2e8f4c035
+Revises: f5c1a7e3b920
+Create Date: 2026-10-18 14:11:26.905318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d2e8f4c035"
+down_revision: Union[str, None] = "f5c1a7e3b920"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_hero_team_id_create_datetimestamp",
+        "hero",
+        ["team_id", sa.text("create_datetimestamp DESC")],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_hero_team_id_create_datetimestamp", table_name="hero", if_exists=True
+    )
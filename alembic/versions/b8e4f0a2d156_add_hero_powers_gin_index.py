@@ -0,0 +1,42 @@
+"""add hero powers gin index
+
+Revision ID: b8e4f0a2d156
+Revises: a6d2e8f4c035
+Create Date: 2026-10-18 15:02:13.440127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e4f0a2d156"
+down_revision: Union[str, None] = "a6d2e8f4c035"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # jsonb_path_ops is postgres only, other dialects search powers unindexed
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_hero_powers_path_ops",
+        "hero",
+        ["powers"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"powers": "jsonb_path_ops"},
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_hero_powers_path_ops", table_name="hero", if_exists=True)
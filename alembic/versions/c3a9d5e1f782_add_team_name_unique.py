@@ -0,0 +1,32 @@
+"""add team name unique
+
+Revision ID: c3a9d5e1f782
+Revises: b8e4f0a2d156
+Create Date: 2026-10-18 15:48:37.120584
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "c3a9d5e1f782"
+down_revision: Union[str, None] = "b8e4f0a2d156"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # fails while duplicate team names exist, merge or rename them first
+    op.drop_index("ix_team_name", table_name="team", if_exists=True)
+    op.create_index("ix_team_name", "team", ["name"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_team_name", table_name="team")
+    op.create_index("ix_team_name", "team", ["name"], unique=False)
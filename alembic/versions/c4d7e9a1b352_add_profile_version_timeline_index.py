@@ -0,0 +1,39 @@
+"""add profile version timeline index
+
+Revision ID: c4d7e9a1b352
+Revises: 8b2e4d6f1a23
+Create Date: 2026-10-18 11:21:37.104215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d7e9a1b352"
+down_revision: Union[str, None] = "8b2e4d6f1a23"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_profileversions_prf_id_create_dts",
+        "profileversions",
+        ["prf_id", sa.text("create_dts DESC")],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_profileversions_prf_id_create_dts",
+        table_name="profileversions",
+        if_exists=True,
+    )
@@ -0,0 +1,145 @@
+"""add profile version base
+
+Revision ID: d1e7a3c9f460
+Revises: c3a9d5e1f782
+Create Date: 2026-10-18 17:02:41.518306
+
+"""
+
+import copy
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "d1e7a3c9f460"
+down_revision: Union[str, None] = "c3a9d5e1f782"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+versions = sa.table(
+    "profileversions",
+    sa.column("ver_id", sa.Uuid()),
+    sa.column("prf_id", sa.Uuid()),
+    sa.column(
+        "ver_data",
+        postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite"),
+    ),
+    sa.column(
+        "ver_delta",
+        postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite"),
+    ),
+    sa.column("delta_depth", sa.Integer()),
+    sa.column("ver_base", sa.Uuid()),
+    sa.column("create_dts", sa.DateTime(timezone=True)),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("profileversions", sa.Column("ver_base", sa.Uuid(), nullable=True))
+    op.create_foreign_key(
+        "profileversions_ver_base_fkey",
+        "profileversions",
+        "profileversions",
+        ["ver_base"],
+        ["ver_id"],
+    )
+
+    # existing deltas were written against the version before them in create_dts order
+    previous = versions.alias("previous")
+    op.execute(
+        versions.update()
+        .where(versions.c.delta_depth > 0)
+        .values(
+            ver_base=sa.select(previous.c.ver_id)
+            .where(
+                previous.c.prf_id == versions.c.prf_id,
+                sa.tuple_(previous.c.create_dts, previous.c.ver_id)
+                < sa.tuple_(versions.c.create_dts, versions.c.ver_id),
+            )
+            .order_by(previous.c.create_dts.desc(), previous.c.ver_id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+    )
+
+
+def apply_patch(doc, patch: list[dict]):
+    """frozen copy of the JSON Patch replay used by the delta storage mode, kept here
+    so this revision keeps rebuilding the same documents if the service code changes
+    """
+    for operation in patch:
+        path = operation["path"]
+        if path == "":
+            doc = copy.deepcopy(operation["value"])
+            continue
+
+        tokens = [
+            token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")
+        ]
+        *parents, last = tokens
+        target = doc
+        for token in parents:
+            target = target[int(token) if isinstance(target, list) else token]
+        if operation["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(operation["value"])
+    return doc
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # earlier revisions chain deltas by create_dts, which skewed host clocks may have
+    # reordered. Rewrite deltas as full snapshots along their links before dropping them
+    conn = op.get_bind()
+    prf_ids = conn.execute(
+        sa.select(versions.c.prf_id).where(versions.c.delta_depth > 0).distinct()
+    ).scalars()
+    for prf_id in prf_ids.all():
+        rows = conn.execute(
+            sa.select(
+                versions.c.ver_id,
+                versions.c.ver_data,
+                versions.c.ver_delta,
+                versions.c.delta_depth,
+                versions.c.ver_base,
+            ).where(versions.c.prf_id == prf_id)
+        ).all()
+        rows_by_id = {row.ver_id: row for row in rows}
+        docs = {}
+        updates = []
+        for row in rows:
+            chain = []
+            base = row
+            while base.ver_id not in docs and base.delta_depth > 0:
+                chain.append(base)
+                base = rows_by_id.get(base.ver_base)
+                if base is None:
+                    raise RuntimeError(f"profile version {row.ver_id} has no snapshot")
+            doc = docs.setdefault(base.ver_id, base.ver_data)
+            for delta in reversed(chain):
+                doc = apply_patch(copy.deepcopy(doc), delta.ver_delta)
+                docs[delta.ver_id] = doc
+                updates.append({"b_ver_id": delta.ver_id, "b_ver_data": doc})
+        if updates:
+            conn.execute(
+                versions.update()
+                .where(versions.c.ver_id == sa.bindparam("b_ver_id"))
+                .values(
+                    ver_data=sa.bindparam("b_ver_data"),
+                    ver_delta=sa.null(),
+                    delta_depth=0,
+                    ver_base=None,
+                ),
+                updates,
+            )
+
+    op.drop_constraint(
+        "profileversions_ver_base_fkey", "profileversions", type_="foreignkey"
+    )
+    op.drop_column("profileversions", "ver_base")
@@ -0,0 +1,42 @@
+"""add profile name prefix index
+
+Revision ID: d9a3f5b7c814
+Revises: c4d7e9a1b352
+Create Date: 2026-10-18 12:02:45.318904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9a3f5b7c814"
+down_revision: Union[str, None] = "c4d7e9a1b352"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # text_pattern_ops is postgres only, other dialects keep the plain name index
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        "ix_profiles_prf_name_lower_pattern",
+        "profiles",
+        [sa.text("lower(prf_name) text_pattern_ops")],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index(
+        "ix_profiles_prf_name_lower_pattern", table_name="profiles", if_exists=True
+    )
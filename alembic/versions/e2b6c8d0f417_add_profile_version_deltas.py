@@ -0,0 +1,117 @@
+"""add profile version deltas
+
+Revision ID: e2b6c8d0f417
+Revises: d9a3f5b7c814
+Create Date: 2026-10-18 12:48:09.771530
+
+"""
+
+import copy
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b6c8d0f417"
+down_revision: Union[str, None] = "d9a3f5b7c814"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "profileversions",
+        sa.Column(
+            "ver_delta",
+            postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite"),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "profileversions",
+        sa.Column("delta_depth", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def apply_patch(doc, patch: list[dict]):
+    """frozen copy of the JSON Patch replay used by the delta storage mode, kept here
+    so this revision keeps rebuilding the same documents if the service code changes
+    """
+    for operation in patch:
+        path = operation["path"]
+        if path == "":
+            doc = copy.deepcopy(operation["value"])
+            continue
+
+        tokens = [
+            token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")
+        ]
+        *parents, last = tokens
+        target = doc
+        for token in parents:
+            target = target[int(token) if isinstance(target, list) else token]
+        if operation["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(operation["value"])
+    return doc
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # delta rows have no ver_data, rebuild them as full copies before the delta
+    # columns go. Each delta applies to the version before it in create_dts order
+    versions = sa.table(
+        "profileversions",
+        sa.column("ver_id", sa.Uuid()),
+        sa.column("prf_id", sa.Uuid()),
+        sa.column(
+            "ver_data",
+            postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite"),
+        ),
+        sa.column(
+            "ver_delta",
+            postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), "sqlite"),
+        ),
+        sa.column("delta_depth", sa.Integer()),
+        sa.column("create_dts", sa.DateTime(timezone=True)),
+    )
+    conn = op.get_bind()
+    prf_ids = conn.execute(
+        sa.select(versions.c.prf_id).where(versions.c.delta_depth > 0).distinct()
+    ).scalars()
+    for prf_id in prf_ids.all():
+        rows = conn.execute(
+            sa.select(
+                versions.c.ver_id,
+                versions.c.ver_data,
+                versions.c.ver_delta,
+                versions.c.delta_depth,
+            )
+            .where(versions.c.prf_id == prf_id)
+            .order_by(versions.c.create_dts, versions.c.ver_id)
+        )
+        updates = []
+        doc = None
+        for ver_id, ver_data, ver_delta, delta_depth in rows:
+            if delta_depth == 0:
+                doc = ver_data
+                continue
+            if doc is None:
+                raise RuntimeError(f"profile version {ver_id} has no snapshot")
+            doc = apply_patch(copy.deepcopy(doc), ver_delta)
+            updates.append({"b_ver_id": ver_id, "b_ver_data": doc})
+        if updates:
+            conn.execute(
+                versions.update()
+                .where(versions.c.ver_id == sa.bindparam("b_ver_id"))
+                .values(ver_data=sa.bindparam("b_ver_data")),
+                updates,
+            )
+
+    op.drop_column("profileversions", "delta_depth")
+    op.drop_column("profileversions", "ver_delta")
@@ -0,0 +1,57 @@
+"""clear oversized dependency version keys
+
+Revision ID: e8b4c0d6a2f1
+Revises: d1e7a3c9f460
+Create Date: 2026-10-18 17:41:12.804733
+
+"""
+
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "e8b4c0d6a2f1"
+down_revision: Union[str, None] = "d1e7a3c9f460"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# version key components are zero padded to this many digits
+WIDTH = 10
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keys with a component longer than the padding sort out of PEP 440 order,
+    # versions without a key are always rechecked when resolving
+    dependencies = sa.table(
+        "dependencies",
+        sa.column("dep_id", sa.Uuid()),
+        sa.column("version_key", sa.String()),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(dependencies.c.dep_id, dependencies.c.version_key).where(
+            dependencies.c.version_key.is_not(None)
+        )
+    )
+    oversized = [
+        {"b_dep_id": dep_id}
+        for dep_id, key in rows
+        if any(len(digits) > WIDTH for digits in re.findall(r"\d+", key))
+    ]
+    if oversized:
+        conn.execute(
+            dependencies.update()
+            .where(dependencies.c.dep_id == sa.bindparam("b_dep_id"))
+            .values(version_key=None),
+            oversized,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the cleared keys were out of order, nothing to restore
@@ -0,0 +1,102 @@
+"""add dependency version key
+
+Revision ID: f5c1a7e3b920
+Revises: e2b6c8d0f417
+Create Date: 2026-10-18 13:36:52.240117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from packaging.version import InvalidVersion, Version
+
+# revision identifiers, used by Alembic.
+revision: str = "f5c1a7e3b920"
+down_revision: Union[str, None] = "e2b6c8d0f417"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copy of the hobbes.services.versions key encoder, replaying this revision
+# must produce the keys it wrote even if the service encoder changes later
+WIDTH = 10
+PRE_PHASES = {"a": "B", "b": "C", "rc": "D"}
+
+
+def number(value: int) -> str:
+    return f"{value:0{WIDTH}d}"
+
+
+def version_key(version: str) -> str | None:
+    """sortable key of a version string, None when it can not be parsed or a
+    component does not fit in WIDTH digits"""
+    try:
+        parsed = Version(version)
+    except InvalidVersion:
+        return None
+
+    numbers = [parsed.epoch, *parsed.release]
+    if parsed.pre is not None:
+        numbers.append(parsed.pre[1])
+    numbers.extend(value for value in (parsed.post, parsed.dev) if value is not None)
+    if max(numbers) >= 10**WIDTH:
+        return None
+
+    release = list(parsed.release)
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    key = number(parsed.epoch) + "".join(f".{number(part)}" for part in release)
+
+    if parsed.pre is None and parsed.post is None and parsed.dev is not None:
+        pre = "A"
+    elif parsed.pre is None:
+        pre = "E"
+    else:
+        pre = PRE_PHASES[parsed.pre[0]] + number(parsed.pre[1])
+    post = "A" if parsed.post is None else "B" + number(parsed.post)
+    dev = "B" if parsed.dev is None else "A" + number(parsed.dev)
+    return f"{key}-{pre}{post}{dev}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "dependencies",
+        sa.Column("version_key", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+    # backfill keys for existing rows
+    dependencies = sa.table(
+        "dependencies",
+        sa.column("dep_id", sa.Uuid()),
+        sa.column("version", sa.String()),
+        sa.column("version_key", sa.String()),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(dependencies.c.dep_id, dependencies.c.version))
+    updates = [
+        {"b_dep_id": dep_id, "b_version_key": version_key(version)}
+        for dep_id, version in rows
+    ]
+    if updates:
+        conn.execute(
+            dependencies.update()
+            .where(dependencies.c.dep_id == sa.bindparam("b_dep_id"))
+            .values(version_key=sa.bindparam("b_version_key")),
+            updates,
+        )
+
+    op.create_index(
+        "ix_dependencies_dep_name_version_key",
+        "dependencies",
+        ["dep_name", "version_key"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_dependencies_dep_name_version_key", table_name="dependencies")
+    op.drop_column("dependencies", "version_key")
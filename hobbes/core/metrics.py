@@ -0,0 +1,171 @@
+"""
+Prometheus metrics for the FastAPI service and Celery workers: route latency,
+SQLAlchemy connection pool state, pool checkout wait time per pool and per task and
+query duration
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "hobbes_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+WAIT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "hobbes_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=WAIT_BUCKETS,
+)
+TASK_CONNECTION_WAIT = Histogram(
+    "hobbes_task_connection_wait_seconds",
+    "Total pool checkout wait of one celery task run",
+    ["task"],
+    buckets=WAIT_BUCKETS,
+)
+QUERY_DURATION = Histogram(
+    "hobbes_db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ["pool", "statement"],
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float):
+    """record one HTTP request
+
+    Args:
+        method (str): HTTP method
+        route (str): route template e.g. /v1/books/{book_id}, never the raw path
+        status (int): response status code
+        duration (float): seconds
+    """
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(duration)
+
+
+# checkout waits of the current celery task, set by hobbes.db.task_db_manager
+checkout_waits: ContextVar[list[float] | None] = ContextVar(
+    "checkout_waits", default=None
+)
+
+
+class CheckoutTimerMixin:
+    """times pool checkouts including the wait for a free connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            POOL_CHECKOUT_WAIT.labels(self._orig_logging_name or "default").observe(
+                elapsed
+            )
+            waits = checkout_waits.get()
+            if waits is not None:
+                waits.append(elapsed)
+
+
+class InstrumentedQueuePool(CheckoutTimerMixin, QueuePool):
+    """QueuePool with checkout wait metrics for sync engines"""
+
+
+class InstrumentedAsyncQueuePool(CheckoutTimerMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait metrics for async engines"""
+
+
+class PoolCollector(Collector):
+    """reads pool gauges from registered engines at scrape time"""
+
+    def __init__(self):
+        self.engines: dict[str, Engine] = {}
+
+    def collect(self):
+        gauges = {
+            "size": GaugeMetricFamily(
+                "hobbes_db_pool_size", "Configured pool size", labels=["pool"]
+            ),
+            "checkedout": GaugeMetricFamily(
+                "hobbes_db_pool_checked_out",
+                "Connections currently checked out",
+                labels=["pool"],
+            ),
+            "overflow": GaugeMetricFamily(
+                "hobbes_db_pool_overflow",
+                "Connections open beyond pool_size",
+                labels=["pool"],
+            ),
+            "checkedin": GaugeMetricFamily(
+                "hobbes_db_pool_checked_in", "Idle pooled connections", labels=["pool"]
+            ),
+        }
+        for name, engine in list(self.engines.items()):
+            pool = engine.pool
+            for attr, gauge in gauges.items():
+                reader = getattr(pool, attr, None)
+                if reader is not None:
+                    gauge.add_metric([name], reader())
+        yield from gauges.values()
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute is skipped on failure, drop the pending start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine, name: str):
+    """register a sync engine (engine.sync_engine for async engines) for pool gauges
+    and statement duration metrics
+
+    Args:
+        engine (Engine): SQLAlchemy sync engine
+        name (str): pool label
+    """
+    pool_collector.engines[name] = engine
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        QUERY_DURATION.labels(name, keyword).observe(time.perf_counter() - starts.pop())
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
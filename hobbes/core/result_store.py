@@ -0,0 +1,137 @@
+"""
+Chunked task result storage in Redis. Large task results are written as fixed size
+pages of pre-serialized JSON so neither the worker nor the API holds the full result.
+
+Also reads celery task state straight from the redis result backend: batched with MGET
+and pushed through the pub/sub message celery publishes on every state change.
+"""
+
+import json
+import logging
+import os
+import time
+from functools import cache
+from typing import AsyncIterator
+
+import redis
+import redis.asyncio
+from celery import states
+
+logger = logging.getLogger(__name__)
+
+RESULT_CHUNK_SIZE = int(os.getenv("RESULT_CHUNK_SIZE", "1000"))
+RESULT_EXPIRES = int(os.getenv("CELERY_RESULT_EXPIRES", "86400"))
+RESULT_REDIS_URL = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+# celery redis backend key and pub/sub channel prefix for task meta
+TASK_META_PREFIX = "celery-task-meta-"
+# seconds between keep alive events on idle task event streams
+TASK_EVENTS_KEEPALIVE = float(os.getenv("TASK_EVENTS_KEEPALIVE", "15"))
+# longest a task event stream stays open, unknown or expired task ids never get ready
+TASK_EVENTS_MAX_SECONDS = float(os.getenv("TASK_EVENTS_MAX_SECONDS", "3600"))
+
+
+def chunk_key(task_id: str, page: int) -> str:
+    return f"hobbes:task-result:{task_id}:{page}"
+
+
+@cache
+def sync_client() -> redis.Redis:
+    """redis client for celery workers"""
+    return redis.Redis.from_url(RESULT_REDIS_URL)
+
+
+@cache
+def async_client() -> redis.asyncio.Redis:
+    """redis client for the FastAPI service"""
+    return redis.asyncio.Redis.from_url(RESULT_REDIS_URL)
+
+
+def write_result_chunk(task_id: str, page: int, json_rows: list[str]):
+    """store one page of JSON serialized rows as a JSON array
+
+    Args:
+        task_id (str): celery task id
+        page (int): zero based page number
+        json_rows (list[str]): rows already serialized to JSON
+    """
+    sync_client().set(
+        chunk_key(task_id, page), "[" + ",".join(json_rows) + "]", ex=RESULT_EXPIRES
+    )
+
+
+async def read_result_chunk(task_id: str, page: int) -> bytes | None:
+    """read one page of a chunked task result
+
+    Args:
+        task_id (str): celery task id
+        page (int): zero based page number
+
+    Returns:
+        bytes | None: JSON array or None when the page does not exist or expired
+    """
+    return await async_client().get(chunk_key(task_id, page))
+
+
+def task_meta_key(task_id: str) -> str:
+    return f"{TASK_META_PREFIX}{task_id}"
+
+
+async def fetch_task_metas(task_ids: list[str]) -> list[dict | None]:
+    """fetch celery task meta for many tasks in a single MGET round trip
+
+    Args:
+        task_ids (list[str]): celery task ids
+
+    Returns:
+        list[dict | None]: task meta in task_ids order, None for unknown or expired ids
+    """
+    values = await async_client().mget([task_meta_key(task_id) for task_id in task_ids])
+    return [json.loads(value) if value else None for value in values]
+
+
+async def watch_task_metas(
+    task_ids: list[str],
+) -> AsyncIterator[tuple[str, dict | None] | None]:
+    """yield the current meta of each task then every state change pushed by celery
+    until all tasks reach a ready state. Subscribes before the snapshot so no
+    transition is missed
+
+    Args:
+        task_ids (list[str]): celery task ids
+
+    Raises:
+        TimeoutError: tasks still not ready after TASK_EVENTS_MAX_SECONDS
+
+    Yields:
+        tuple[str, dict | None] | None: task id and meta, None on keep alive timeout
+    """
+    deadline = time.monotonic() + TASK_EVENTS_MAX_SECONDS
+    pubsub = async_client().pubsub()
+    await pubsub.subscribe(*[task_meta_key(task_id) for task_id in task_ids])
+    try:
+        pending = set(task_ids)
+        for task_id, meta in zip(task_ids, await fetch_task_metas(task_ids)):
+            if meta and meta.get("status") in states.READY_STATES:
+                pending.discard(task_id)
+            yield task_id, meta
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{len(pending)} tasks not ready")
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(TASK_EVENTS_KEEPALIVE, remaining),
+            )
+            if message is None:
+                yield None
+                continue
+
+            meta = json.loads(message["data"])
+            task_id = message["channel"].decode().removeprefix(TASK_META_PREFIX)
+            if meta.get("status") in states.READY_STATES:
+                pending.discard(task_id)
+            yield task_id, meta
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
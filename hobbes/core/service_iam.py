@@ -1,16 +1,24 @@
+import asyncio
+import hashlib
 import logging
 import os
+import threading
+import time
 from ast import literal_eval
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import cache
 from typing import Annotated
 
 import jwt
 import ldap3
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
-from jwt.exceptions import InvalidTokenError
-from ldap3.core.exceptions import LDAPException
+from jwt.exceptions import PyJWTError
+from ldap3.core.exceptions import LDAPException, LDAPServerPoolExhaustedError
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +30,72 @@ ldap_urls = literal_eval(os.getenv("LDAP_URLS", "[]"))
 receive_timeout = int(os.getenv("LDAP_RECEIVE_TIMEOUT", "45"))
 time_limit = int(os.getenv("LDAP_TIME_LIMIT", "45"))
 connect_timeout = int(os.getenv("LDAP_CONNECT_TIMEOUT", "10"))
+# seconds an unreachable server is skipped before the pool checks it again
+ldap_exhaust_seconds = int(os.getenv("LDAP_EXHAUST_SECONDS", "60"))
+# passes over the server list before a bind gives up when no server is reachable
+ldap_pool_cycles = int(os.getenv("LDAP_POOL_CYCLES", "1"))
+# threads available for blocking LDAP binds
+ldap_max_workers = int(os.getenv("LDAP_MAX_WORKERS", "8"))
+# logins running or queued for a bind thread before new logins fail fast
+ldap_max_pending = int(os.getenv("LDAP_MAX_PENDING", "32"))
+# verified claims cache, 0 disables it
+jwt_cache_size = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+# cache lifetime for tokens without an exp claim
+jwt_cache_ttl = int(os.getenv("JWT_CACHE_TTL", "300"))
+# optional asymmetric keys e.g. RS256, JWKS endpoint takes precedence over a PEM file
+jwt_jwks_url = os.getenv("JWT_JWKS_URL")
+jwt_public_key_file = os.getenv("JWT_PUBLIC_KEY_FILE")
 
 
 class LDAPAuthException(Exception):
     """exceptions generated from LDAPHandler class"""
 
 
+class LDAPSaturatedException(LDAPAuthException):
+    """raised when too many logins are already waiting on the directory"""
+
+
+class LDAPUnavailableException(LDAPAuthException):
+    """raised when no server in the pool is reachable"""
+
+
+@cache
+def ldap_server_pool() -> ldap3.ServerPool:
+    """
+    Build the LDAP server pool once so active/exhausted server state is kept across
+    logins instead of retrying a dead server on every bind. Offline servers are checked
+    again after LDAP_EXHAUST_SECONDS and a bind gives up after LDAP_POOL_CYCLES passes
+    so an outage of every server can not hang the bind threads
+
+    Returns:
+        ldap3.ServerPool: pool of LDAP_URLS servers
+    """
+    servers = []
+    for url in ldap_urls:
+        servers.append(ldap3.Server(host=url, connect_timeout=connect_timeout))
+
+    return ldap3.ServerPool(
+        servers,
+        pool_strategy=ldap3.FIRST,
+        active=ldap_pool_cycles,
+        exhaust=ldap_exhaust_seconds,
+    )
+
+
+# bounded thread pool so blocking binds never run on the event loop
+ldap_executor = ThreadPoolExecutor(
+    max_workers=ldap_max_workers, thread_name_prefix="ldap-bind"
+)
+
+
 class LDAPAuth:
     """
     Class authenticate against LDAP and return user permission scope list e.g. read|write
     """
 
+    pending = 0
+    lock = threading.Lock()
+
     @staticmethod
     def authenticate(username: str, password: str):
         """
@@ -42,6 +105,9 @@ class LDAPAuth:
             username (str): client username
             password (str): client password
 
+        Raises:
+            LDAPUnavailableException: no LDAP server reachable
+
         Returns:
             list[str]: list of permissions default to ["read", "write"] for now
         """
@@ -51,34 +117,73 @@ class LDAPAuth:
                 logger.debug("testing so return")
                 return ["read", "write"]
 
-            servers = []
-            for url in ldap_urls:
-                servers.append(ldap3.Server(host=url, connect_timeout=connect_timeout))
-
-            pool = ldap3.ServerPool(
-                servers, pool_strategy=ldap3.FIRST, active=True, exhaust=True
-            )
-
+            # bind after construction so the connection is always released below,
+            # auto_bind would lose it when the bind raises inside the constructor
             connection = ldap3.Connection(
-                server=pool,
+                server=ldap_server_pool(),
                 user=f"{username}@{auth_domain}",
                 password=password,
-                auto_bind=True,
+                auto_bind=ldap3.AUTO_BIND_NONE,
                 raise_exceptions=True,
                 receive_timeout=receive_timeout,
                 client_strategy=ldap3.SAFE_SYNC,
             )
+            connection.bind()
+            if not connection.bound:
+                raise LDAPAuthException(f"ldap bind failed for {username}")
             logger.debug("ldap auth success.....")
 
             return ["read", "write"]
 
+        except LDAPServerPoolExhaustedError as error:
+            raise LDAPUnavailableException("no ldap server reachable") from error
+
         except (LDAPException, Exception) as error:
             logger.exception(error)
             return None
 
         finally:
-            if connection:
+            if connection is not None:
                 connection.unbind()
+                # the shared pool registers every connection and never drops them
+                ldap_server_pool().pool_states.pop(connection, None)
+
+    @classmethod
+    async def authenticate_async(cls, username: str, password: str):
+        """
+        Run the blocking bind on the LDAP thread pool. Fails fast once LDAP_MAX_PENDING
+        logins are in flight so a slow directory can not pile up requests
+
+        Args:
+            username (str): client username
+            password (str): client password
+
+        Raises:
+            LDAPSaturatedException: too many logins in flight
+            LDAPUnavailableException: no LDAP server reachable
+
+        Returns:
+            list[str]: list of permissions or None on failure
+        """
+        with cls.lock:
+            if cls.pending >= ldap_max_pending:
+                raise LDAPSaturatedException(f"{cls.pending} ldap logins in flight")
+            cls.pending += 1
+
+        try:
+            future = ldap_executor.submit(cls.authenticate, username, password)
+        except Exception:
+            cls.release()
+            raise
+        # release on the executor future, a cancelled request leaves the bind running
+        future.add_done_callback(cls.release)
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    def release(cls, future: Future | None = None):
+        """free a pending login slot, runs on the bind thread once the bind finishes"""
+        with cls.lock:
+            cls.pending -= 1
 
 
 class Token(BaseModel):
@@ -102,11 +207,106 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified token claims keyed by token digest. Entries expire
+    at the token exp claim so a cached token is never accepted past its lifetime
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, TokenData, frozenset]] = (
+            OrderedDict()
+        )
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> tuple[TokenData, frozenset] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, token_data, scopes = entry
+        if expires <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return token_data, scopes
+
+    def put(self, key: bytes, expires: float, token_data: TokenData, scopes: frozenset):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (expires, token_data, scopes)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(jwt_cache_size)
+
+
+def load_verification_key():
+    """
+    Load the token verification key once at import. Returns a PyJWKClient for JWKS,
+    which caches fetched signing keys, the PEM public key or the shared HMAC secret
+
+    Returns:
+        PyJWKClient | str: key source
+    """
+    if jwt_jwks_url:
+        return jwt.PyJWKClient(jwt_jwks_url, cache_keys=True)
+    if jwt_public_key_file:
+        with open(jwt_public_key_file, "r") as f:
+            return f.read()
+    return jwt_key
+
+
+verification_key = load_verification_key()
+
+
+def credentials_exception() -> HTTPException:
+    """401 raised for any token validation failure"""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="invalid token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def decode_token(token: str) -> dict:
+    """
+    Verify token signature and claims with the configured key
+
+    Args:
+        token (str): encoded JWT
+
+    Raises:
+        PyJWTError: token validation failure, also raised by the JWKS client for an
+            unknown key id or an unreachable key set endpoint
+
+    Returns:
+        dict: token claims
+    """
+    key = verification_key
+    if isinstance(key, jwt.PyJWKClient):
+        # may fetch the key set over the network on a key id miss
+        signing_key = await run_in_threadpool(key.get_signing_key_from_jwt, token)
+        key = signing_key.key
+    return jwt.decode(token, key, algorithms=[jwt_alg])
+
+
 async def validate_token(
     security_scopes: SecurityScopes, token: Annotated[str, Depends(oauth2_scheme)]
 ) -> TokenData:
     """
-    Validate oauth bearer token sent in client request authorization header
+    Validate oauth bearer token sent in client request authorization header. Verified
+    claims are cached until the token expires so repeat requests skip jwt.decode
 
     Args:
         security_scopes (SecurityScopes): permissions required for consuming the APIs e.g. read|write
@@ -118,29 +318,33 @@ async def validate_token(
     Returns:
         TokenData: username and scope
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="invalid token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    key = token_cache.digest(token)
+    cached = token_cache.get(key)
+    if cached is None:
+        try:
+            payload = await decode_token(token)
+        except PyJWTError:
+            raise credentials_exception()
 
-    try:
-        payload = jwt.decode(token, jwt_key, algorithms=[jwt_alg])
         # validate username in JWT subject claim
         username = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise credentials_exception()
 
-        # validate permissions in JWT scope claim
         token_scopes = payload.get("scope", [])
-        for scope in security_scopes.scopes:
-            if scope not in token_scopes:
-                raise credentials_exception
-
-        return TokenData(scopes=token_scopes, username=username)
-
-    except InvalidTokenError:
-        raise credentials_exception
+        token_data = TokenData(scopes=token_scopes, username=username)
+        scopes = frozenset(token_scopes)
+        token_cache.put(
+            key, payload.get("exp", time.time() + jwt_cache_ttl), token_data, scopes
+        )
+    else:
+        token_data, scopes = cached
+
+    # validate permissions in JWT scope claim
+    if not scopes.issuperset(security_scopes.scopes):
+        raise credentials_exception()
+
+    return token_data
 
 
 async def create_access_token(data: dict, expires_delta: timedelta) -> str:
@@ -1,10 +1,22 @@
 import logging
 import os
+import time
+import uuid
+from datetime import datetime
 
 import celery
+from sqlalchemy import DateTime, delete, insert, literal, text
+from sqlalchemy.orm import Session
 from sqlmodel import desc, select
 
-from hobbes.models.book_models import Book, BookPayload
+from hobbes.models.book_models import (
+    ArchivePayload,
+    Book,
+    BookArchive,
+    BookPayload,
+    gen_utcnow,
+)
+from hobbes.core.result_store import RESULT_CHUNK_SIZE, write_result_chunk
 from hobbes.db.task_db_manager import DBTaskCll, DBTaskCM
 
 logger = logging.getLogger(__name__)
@@ -13,6 +25,19 @@ logger = logging.getLogger(__name__)
 MAX_RETRIES = int(os.getenv("CELERY_MAX_RETRIES", "3"))
 # count down retries
 COUNTDOWN = int(os.getenv("CELERY_COUNTDOWN", "3"))
+# pause between archive batches so vacuum and other writers get a turn on book
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.1"))
+# max time an archive batch waits on a row or table lock before failing
+ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv("ARCHIVE_LOCK_TIMEOUT_MS", "2000"))
+
+ARCHIVE_COLUMNS = (
+    "book_id",
+    "title",
+    "isbn",
+    "genre",
+    "condition",
+    "create_datetimestamp",
+)
 
 
 @celery.shared_task
@@ -29,25 +54,94 @@ def send_email(recipient, subject, body):
     return True
 
 
+def move_books_batch(
+    session: Session, older_than: datetime, batch_size: int
+) -> list[uuid.UUID]:
+    """move one batch of books older than a cutoff into book_archive and commit.
+    INSERT ... SELECT followed by DELETE ... RETURNING in a single short transaction,
+    so an interrupted run loses nothing and a rerun resumes with the remaining rows
+
+    Args:
+        session (Session): SQLAlchemy session
+        older_than (datetime): archive books created before this timestamp
+        batch_size (int): max rows moved by the batch
+
+    Returns:
+        list[uuid.UUID]: ids of the books moved, empty when nothing is left
+    """
+    batch = (
+        select(Book.book_id)
+        .where(Book.create_datetimestamp < older_than)
+        .order_by(Book.create_datetimestamp, Book.book_id)
+        .limit(batch_size)
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        # never queue behind long locks on the hot table, skip rows being edited
+        session.execute(text(f"SET LOCAL lock_timeout = '{ARCHIVE_LOCK_TIMEOUT_MS}ms'"))
+        batch = batch.with_for_update(skip_locked=True)
+
+    book_ids = list(session.scalars(batch).all())
+    if not book_ids:
+        session.commit()
+        return []
+
+    columns = [getattr(Book, col) for col in ARCHIVE_COLUMNS]
+    session.execute(
+        insert(BookArchive).from_select(
+            [*ARCHIVE_COLUMNS, "archive_datetimestamp"],
+            select(*columns, literal(gen_utcnow(), DateTime(timezone=True))).where(
+                Book.book_id.in_(book_ids)
+            ),
+        )
+    )
+    moved = session.scalars(
+        delete(Book).where(Book.book_id.in_(book_ids)).returning(Book.book_id)
+    ).all()
+    session.commit()
+    return list(moved)
+
+
 @celery.shared_task(
+    base=DBTaskCM,
     name="archive_book",
     bind=True,
     max_retries=MAX_RETRIES,
     retry_backoff=True,
     pydantic=True,
+    acks_late=True,
+    reject_on_worker_lost=True,
 )
-def archive_book(self, payload: BookPayload):
-    """DBtask implementation that uses context manager Task subclass
+def archive_book(self, payload: ArchivePayload):
+    """Move books older than payload.older_than into book_archive in bounded batches.
+    Progress is published as PROGRESS task state with rows moved so far. Each batch
+    commits on its own so the task is safe to redeliver after a worker restart
 
     Args:
-        payload (BookPayload): data payload
+        payload (ArchivePayload): cutoff and batch size
 
     Returns:
-        [list]: list of json string formatted objects retrieve from db
+        dict: rows moved and batch count
     """
+    moved = 0
+    batches = 0
     try:
-        logger.info(payload)
-        return True
+        with self.get_session() as session:
+            while True:
+                book_ids = move_books_batch(
+                    session, payload.older_than, payload.batch_size
+                )
+                if not book_ids:
+                    break
+
+                moved += len(book_ids)
+                batches += 1
+                logger.debug("archive batch %s moved %s rows", batches, moved)
+                self.update_state(
+                    state="PROGRESS", meta={"moved": moved, "batches": batches}
+                )
+                time.sleep(ARCHIVE_BATCH_PAUSE)
+
+        return {"moved": moved, "batches": batches}
     except Exception as error:
         logger.exception(error)
         if self.request.retries >= self.max_retries:
@@ -55,6 +149,34 @@ def archive_book(self, payload: BookPayload):
         raise self.retry(exc=error, countdown=COUNTDOWN)
 
 
+def store_inventory_chunks(task_id: str, session: Session) -> dict:
+    """stream books through a server side cursor and store them as result pages of
+    RESULT_CHUNK_SIZE rows. Only one page is held in memory at a time
+
+    Args:
+        task_id (str): celery task id the pages are stored under
+        session (Session): SQLAlchemy session
+
+    Returns:
+        dict: page count, row count and page size, read pages from
+            /v1/books/tasks/result/{task_id}?page=
+    """
+    results = session.scalars(
+        select(Book)
+        .order_by(desc(Book.create_datetimestamp))
+        .execution_options(yield_per=RESULT_CHUNK_SIZE)
+    )
+    pages = 0
+    rows = 0
+    for partition in results.partitions():
+        write_result_chunk(
+            task_id, pages, [item.model_dump_json() for item in partition]
+        )
+        pages += 1
+        rows += len(partition)
+    return {"pages": pages, "rows": rows, "chunk_size": RESULT_CHUNK_SIZE}
+
+
 @celery.shared_task(
     base=DBTaskCM,
     name="search_inventory_cm",
@@ -64,21 +186,16 @@ def archive_book(self, payload: BookPayload):
     pydantic=True,
 )
 def search_inventory_cm(self, payload: BookPayload):
-    """DBtask implementation that uses callable Task subclass
+    """DBtask implementation that uses context manager Task subclass
 
     Args:
         payload (BookPayload): data payload
 
     Returns:
-        [list]: list of json string formatted objects retrieve from db
+        dict: page count and row count of the chunked result
     """
     with self.get_session() as session:
-        results = session.scalars(
-            select(Book).order_by(desc(Book.create_datetimestamp))
-        )
-
-        json_strings = [item.model_dump_json() for item in results.all()]
-        return json_strings
+        return store_inventory_chunks(self.request.id, session)
 
 
 @celery.shared_task(
@@ -90,12 +207,15 @@ def search_inventory_cm(self, payload: BookPayload):
     pydantic=True,
 )
 def search_inventory_cll(self, payload: BookPayload):
-    results = self.session.scalars(
-        select(Book).order_by(desc(Book.create_datetimestamp))
-    )
-    # dumnp objects into a json list so celery can return
-    json_strings = [item.model_dump_json() for item in results.all()]
-    return json_strings
+    """DBtask implementation that uses callable Task subclass
+
+    Args:
+        payload (BookPayload): data payload
+
+    Returns:
+        dict: page count and row count of the chunked result
+    """
+    return store_inventory_chunks(self.request.id, self.session)
 
 
 def replay_task(task_id):
@@ -1,6 +1,13 @@
 import logging
+import os
+import time
 from asyncio import current_task
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
 
+from fastapi import Request, Response
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     async_scoped_session,
@@ -10,8 +17,71 @@ from sqlalchemy.ext.asyncio import (
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from hobbes.core.metrics import InstrumentedAsyncQueuePool, instrument_engine
+
 logger = logging.getLogger(__name__)
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# seconds a replica is skipped after a connection failure
+DB_REPLICA_EJECT_SECONDS = float(os.getenv("DB_REPLICA_EJECT_SECONDS", "30"))
+# opt in read-your-writes window pinning a client to the primary after a write, 0 disables
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "0"))
+# "create_all" creates missing tables on startup, "check" only verifies the alembic
+# revision so production boots run no DDL
+DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "create_all")
+ALEMBIC_INI = Path(__file__).parents[2] / "alembic.ini"
+PRIMARY_PIN_COOKIE = "hobbes_primary_until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class SchemaRevisionException(Exception):
+    """raised when the database is not at the alembic head revision"""
+
+
+def alembic_heads() -> set[str]:
+    """head revisions of the migration scripts. alembic is imported here since only
+    the check startup mode needs it
+
+    Returns:
+        set[str]: revision ids
+    """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def is_connection_error(error: Exception) -> bool:
+    """decide if an error means the database is unreachable rather than a bad query
+
+    Args:
+        error (Exception): error raised while using a session
+
+    Returns:
+        bool: True for connection failures
+    """
+    if isinstance(error, exc.DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError, OSError))
+
+
+@dataclass
+class Replica:
+    """read replica engine with passive health state"""
+
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    ejected_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
 
 class DatabaseAsyncSessionManager:
     """Async database engine and session managment class for use in FastAPI lifespan"""
@@ -19,10 +89,36 @@ class DatabaseAsyncSessionManager:
     def __init__(self):
         self._engine: AsyncEngine | None = None
         self._async_session: AsyncSession | None = None
+        self._replicas: list[Replica] = []
+        self._next_replica = 0
+
+    def _create_engine(
+        self, database_url, name, pool_size, max_overflow, pool_timeout, pre_ping=False
+    ):
+        engine = create_async_engine(
+            database_url,
+            echo=False,
+            future=True,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_pre_ping=pre_ping,
+            pool_logging_name=name,
+        )
+        instrument_engine(engine.sync_engine, name)
+        return engine
 
-    def init(self, database_url):
-        self._engine = create_async_engine(
-            database_url, echo=False, future=True, pool_size=5, max_overflow=10
+    def init(
+        self,
+        database_url,
+        replica_urls: list[str] | None = None,
+        pool_size: int = DB_POOL_SIZE,
+        max_overflow: int = DB_MAX_OVERFLOW,
+        pool_timeout: float = DB_POOL_TIMEOUT,
+    ):
+        self._engine = self._create_engine(
+            database_url, "api", pool_size, max_overflow, pool_timeout
         )
         # async scoped session using event current task
         self._async_session = async_scoped_session(
@@ -32,17 +128,61 @@ class DatabaseAsyncSessionManager:
             scopefunc=current_task,
         )
 
+        self._replicas = []
+        for index, url in enumerate(replica_urls or []):
+            name = f"replica-{index}"
+            # pre ping so connections to a recovered replica are replaced
+            engine = self._create_engine(
+                url, name, pool_size, max_overflow, pool_timeout, pre_ping=True
+            )
+            self._replicas.append(
+                Replica(
+                    name=name,
+                    engine=engine,
+                    session_factory=async_sessionmaker(
+                        engine, expire_on_commit=False, class_=AsyncSession
+                    ),
+                )
+            )
+
     async def init_db(self):
         """create all tables"""
         async with self._engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.create_all)
 
+    async def check_db(self, heads: set[str]):
+        """verify the database is at the expected alembic revision without running DDL
+
+        Args:
+            heads (set[str]): expected revisions e.g. from alembic_heads
+
+        Raises:
+            SchemaRevisionException: revision differs or alembic_version is missing
+        """
+        try:
+            async with self._engine.connect() as conn:
+                result = await conn.execute(
+                    text("SELECT version_num FROM alembic_version")
+                )
+                current = set(result.scalars().all())
+        except exc.DBAPIError as error:
+            raise SchemaRevisionException(f"alembic revision unavailable: {error}")
+
+        if current != heads:
+            raise SchemaRevisionException(
+                f"database at revision {sorted(current)}, expected {sorted(heads)}"
+            )
+        logger.info("database at alembic revision %s", sorted(current))
+
     async def close(self):
         """shutdown datbase engine"""
         if self._engine:
             await self._engine.dispose()
+            for replica in self._replicas:
+                await replica.engine.dispose()
             self._engine = None
             self._async_session = None
+            self._replicas = []
         else:
             logger.error("DatabaseSessionManager was never initialized")
 
@@ -60,12 +200,67 @@ class DatabaseAsyncSessionManager:
         """
         await self._async_session.remove()
 
+    def next_replica(self) -> Replica | None:
+        """round robin over healthy replicas
+
+        Returns:
+            Replica | None: replica or None when none are configured or all are ejected
+        """
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[self._next_replica % len(self._replicas)]
+            self._next_replica += 1
+            if replica.healthy:
+                return replica
+        return None
+
+    def eject(self, replica: Replica):
+        """skip a failing replica for DB_REPLICA_EJECT_SECONDS"""
+        replica.ejected_until = time.monotonic() + DB_REPLICA_EJECT_SECONDS
+        logger.warning(
+            "ejecting %s for %s seconds", replica.name, DB_REPLICA_EJECT_SECONDS
+        )
+
+    @asynccontextmanager
+    async def read_session(self, use_primary: bool = False):
+        """session for read only work bound to a healthy replica, falling back to the
+        primary scoped session when there are no replicas, all are ejected or the
+        caller is pinned to the primary
+
+        Args:
+            use_primary (bool): force the primary e.g. read-your-writes window
+
+        Yields:
+            AsyncSession: SQLAlchemy session object
+        """
+        replica = None if use_primary else self.next_replica()
+        if replica is None:
+            session = await self.get_async_session()
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                await self.remove_session()
+            return
+
+        session = replica.session_factory()
+        try:
+            yield session
+        except Exception as error:
+            await session.rollback()
+            if is_connection_error(error):
+                self.eject(replica)
+            raise
+        finally:
+            await session.close()
+
 
 # manager instance
 async_session_manager = DatabaseAsyncSessionManager()
 
 
-async def get_async_session():
+async def get_async_session(request: Request, response: Response):
     """create async session used with FastAPI Dependency injection
 
     other way to handle it:
@@ -80,6 +275,14 @@ async def get_async_session():
     Yields:
         session (AsyncSession): Asyn SQLAlchemy session
     """
+    if DB_READ_YOUR_WRITES_SECONDS > 0 and request.method in WRITE_METHODS:
+        # pin the client to the primary so its next reads see this write
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE,
+            str(time.time() + DB_READ_YOUR_WRITES_SECONDS),
+            max_age=int(DB_READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+        )
 
     # get scoped session
     session = await async_session_manager.get_async_session()
@@ -92,3 +295,37 @@ async def get_async_session():
     finally:
         # remove session when task is complete
         await async_session_manager.remove_session()
+
+
+def pinned_to_primary(request: Request) -> bool:
+    """check the read-your-writes cookie set by get_async_session on writes
+
+    Args:
+        request (Request): client request
+
+    Returns:
+        bool: True while the client is inside its read-your-writes window
+    """
+    if DB_READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(request: Request):
+    """create replica bound async session for read only routes, used with FastAPI
+    Dependency injection alongside get_async_session
+
+    Yields:
+        session (AsyncSession): Asyn SQLAlchemy session
+    """
+    async with async_session_manager.read_session(
+        pinned_to_primary(request)
+    ) as session:
+        try:
+            yield session
+        except Exception as error:
+            logger.error(error)
+            raise
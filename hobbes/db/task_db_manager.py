@@ -1,11 +1,22 @@
 import logging
 import os
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 
 from celery import Task, current_task
 from gevent import getcurrent as gevent_getcurrent
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from hobbes.core.metrics import (
+    TASK_CONNECTION_WAIT,
+    CheckoutTimerMixin,
+    checkout_waits,
+    instrument_engine,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +25,17 @@ DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
 DB_HOST = os.environ.get("DB_HOST", "")
 DB_PORT = os.environ.get("DB_PORT", "")
 DB_NAME = os.environ.get("DB_NAME", "")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# upper bound on connections of a gevent worker, tasks beyond it wait in FIFO order
+DB_WORKER_POOL_MAX = int(os.getenv("DB_WORKER_POOL_MAX", "100"))
+# connections of each prefork child, a child runs one task at a time
+DB_CHILD_POOL_SIZE = int(os.getenv("DB_CHILD_POOL_SIZE", "1"))
+# celery pools running many tasks in one process
+GREEN_POOLS = {"gevent", "eventlet", "threads"}
+# celery pools running one task at a time per process
+PROCESS_POOLS = {"prefork", "processes", "solo"}
 
 if DB_HOST:
     SYNC_DATABASE_URL = f"postgresql+psycopg://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
@@ -21,67 +43,247 @@ else:
     SYNC_DATABASE_URL = None
 
 
+class FairSemaphore:
+    """counting semaphore that hands released slots to waiters in arrival order, so
+    a task that just released a connection can not take it back ahead of older
+    waiters. Built on threading primitives which gevent patches in the worker, so
+    waiting only blocks the calling greenlet"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: deque[threading.Event] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        if waiter.wait(timeout):
+            return True
+        with self._lock:
+            if waiter.is_set():
+                # released between the timeout and taking the lock
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._value += 1
+
+
+class FairQueuePool(QueuePool):
+    """QueuePool whose checkouts beyond pool_size + max_overflow wait in a FIFO queue
+    instead of racing on the pool's condition variable"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        capacity = self.size() + self._max_overflow
+        self._slots = FairSemaphore(capacity) if self._max_overflow >= 0 else None
+
+    def _do_get(self):
+        if self._slots is None:
+            return super()._do_get()
+        if not self._slots.acquire(self._timeout):
+            raise exc.TimeoutError(
+                f"QueuePool limit of size {self.size()} overflow "
+                f"{self._max_overflow} reached, connection timed out, "
+                f"timeout {self._timeout:.2f}",
+                code="3o7r",
+            )
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+
+class InstrumentedFairQueuePool(CheckoutTimerMixin, FairQueuePool):
+    """FairQueuePool with checkout wait metrics, the wait includes the FIFO queue"""
+
+
+def worker_pool_size(concurrency: int, pool: str) -> tuple[int, int]:
+    """pool_size and max_overflow for a celery worker. Green pools run up to
+    concurrency tasks at once, so they get one connection per task up to
+    DB_WORKER_POOL_MAX and no overflow. Prefork children and solo workers run one
+    task at a time and get DB_CHILD_POOL_SIZE each. Other pools keep the configured
+    sizes
+
+    Args:
+        concurrency (int): worker concurrency
+        pool (str): celery pool name e.g. gevent, prefork
+
+    Returns:
+        tuple[int, int]: pool_size and max_overflow
+    """
+    if pool in GREEN_POOLS:
+        return max(min(concurrency, DB_WORKER_POOL_MAX), 1), 0
+    if pool in PROCESS_POOLS:
+        return DB_CHILD_POOL_SIZE, 0
+    return DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+
 class DatabaseSessionManager:
-    """Sync database engine and session managment class for use in Celery workers"""
+    """Sync database engine and session managment class for use in Celery workers.
+    The engine is built on first use so the worker can size it first, see configure"""
 
     def celery_task_scopefunc(self):
         return (current_task.request.id, gevent_getcurrent())
 
     def __init__(self):
-        if SYNC_DATABASE_URL:
-            self._engine = create_engine(
-                SYNC_DATABASE_URL,
-                echo=False,
-                pool_size=5,
-                max_overflow=10,
-            )
-            self._session = scoped_session(
-                sessionmaker(
-                    autocommit=False,
-                    autoflush=False,
-                    expire_on_commit=False,
-                    bind=self._engine,
-                ),
-                scopefunc=self.celery_task_scopefunc,
-            )
+        self._engine = None
+        self._session = None
+
+    def configure(
+        self,
+        database_url: str | None = SYNC_DATABASE_URL,
+        pool_size: int = DB_POOL_SIZE,
+        max_overflow: int = DB_MAX_OVERFLOW,
+        pool_timeout: float = DB_POOL_TIMEOUT,
+    ):
+        """build the engine and scoped session factory
+
+        Args:
+            database_url (str | None): sync database url, nothing is built when None
+            pool_size (int): pooled connections
+            max_overflow (int): connections opened beyond pool_size under load
+            pool_timeout (float): seconds a checkout waits before failing
+        """
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine, self._session = None, None
+        if not database_url:
+            return
+
+        self._engine = create_engine(
+            database_url,
+            echo=False,
+            poolclass=InstrumentedFairQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_logging_name="worker",
+        )
+        instrument_engine(self._engine, "worker")
+        self._session = scoped_session(
+            sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+                bind=self._engine,
+            ),
+            scopefunc=self.celery_task_scopefunc,
+        )
+        logger.info(
+            "worker db pool size %s overflow %s timeout %s",
+            pool_size,
+            max_overflow,
+            pool_timeout,
+        )
 
     def get_session(self):
+        if self._session is None:
+            self.configure()
         return self._session()
 
     def remove_session(self):
         self._session.remove()
 
+    def after_fork(self):
+        """give a forked child its own pool. The pool copied from the parent is
+        dropped without closing its connections, which still belong to the parent
+        https://docs.sqlalchemy.org/en/20/core/pooling.html#using-connection-pools-with-multiprocessing-or-os-fork
+        """
+        if self._engine is None:
+            return
+        self._engine.dispose(close=False)
+        # drop any sessions registered in the parent along with its pool
+        self._session = scoped_session(
+            self._session.session_factory, scopefunc=self.celery_task_scopefunc
+        )
+
+    def dispose(self):
+        """close pooled connections e.g. when a prefork child exits"""
+        if self._engine is not None:
+            self._engine.dispose()
+
 
 session_manager = DatabaseSessionManager()
 
 
+@contextmanager
+def track_connection_wait(task: Task):
+    """collect the pool checkout waits of one task run, then log the total and
+    observe it in hobbes_task_connection_wait_seconds
+
+    Args:
+        task (Task): running celery task
+    """
+    waits = []
+    token = checkout_waits.set(waits)
+    try:
+        yield
+    finally:
+        checkout_waits.reset(token)
+        total = sum(waits)
+        TASK_CONNECTION_WAIT.labels(task.name).observe(total)
+        logger.info(
+            "task %s %s waited %.4fs for %s connection checkouts",
+            task.name,
+            task.request.id,
+            total,
+            len(waits),
+            extra={"connection_wait": total},
+        )
+
+
 class DBTaskCM(Task):
     """Base celery task that includes context manager for SqlAlchemy scoped session"""
 
     @contextmanager
     def get_session(self):
-        session = session_manager.get_session()
-        try:
-            yield session
-        except Exception as error:
-            session.rollback()
-            logger.error(error)
-            raise
-        finally:
-            session_manager.remove_session()
+        with track_connection_wait(self):
+            session = session_manager.get_session()
+            try:
+                yield session
+            except Exception as error:
+                session.rollback()
+                logger.error(error)
+                raise
+            finally:
+                session_manager.remove_session()
 
 
 class DBTaskCll(Task):
     """Base celery task with callable to include SqlAlchemy scoped session"""
 
+    @property
+    def session(self):
+        # the task instance is shared by every greenlet, the scoped session is not
+        return session_manager.get_session()
+
     def __call__(self, *args, **kwargs):
-        self.session = session_manager.get_session()
-        try:
-            return super().__call__(*args, **kwargs)
-        except Exception as error:
-            self.session.rollback()
-            logger.error(error)
-            raise
-        finally:
-            logger.info("closing the session")
-            session_manager.remove_session()
+        with track_connection_wait(self):
+            try:
+                return super().__call__(*args, **kwargs)
+            except Exception as error:
+                self.session.rollback()
+                logger.error(error)
+                raise
+            finally:
+                logger.info("closing the session")
+                session_manager.remove_session()
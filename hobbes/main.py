@@ -1,15 +1,22 @@
 import logging
 import os
-import tomllib
+import time
 from contextlib import asynccontextmanager
-from pathlib import Path
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as package_version
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from hobbes.routers.apis_v1 import book_router
-from hobbes.db.db_manager import async_session_manager
+from hobbes.db.db_manager import DB_STARTUP_MODE, alembic_heads, async_session_manager
+from hobbes.core.metrics import observe_request
+from hobbes.core.service_iam import ldap_server_pool
+from hobbes.routers.artifacts import artifacts_router
 from hobbes.routers.auth import auth_router
+from hobbes.routers.profiles import profiles_router
 from hobbes.routers.teams import teams_router
 
 logger = logging.getLogger(__name__)
@@ -22,6 +29,14 @@ DB_NAME = os.environ.get("DB_NAME")
 DATABASE_URL = (
     f"postgresql+asyncpg://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+# comma separated host:port list of read replicas sharing the primary credentials
+DB_REPLICA_HOSTS = [
+    host.strip() for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host
+]
+REPLICA_URLS = [
+    f"postgresql+asyncpg://{DB_USERNAME}:{DB_PASSWORD}@{host}/{DB_NAME}"
+    for host in DB_REPLICA_HOSTS
+]
 
 origins = [
     "http://localhost",
@@ -33,22 +48,28 @@ origins = [
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI lifespan funciton to execute steps before app starts and when it shuts downs.
-    In this case init SQLAlchemy engine and create tables
+    In this case init SQLAlchemy engine and create tables, or only check the alembic
+    revision when DB_STARTUP_MODE is check
 
     Args:
         app (FastAPI): FastAPI app
     """
-    async_session_manager.init(DATABASE_URL)
-    await async_session_manager.init_db()
+    async_session_manager.init(DATABASE_URL, REPLICA_URLS)
+    if DB_STARTUP_MODE == "check":
+        await async_session_manager.check_db(alembic_heads())
+    else:
+        await async_session_manager.init_db()
+    # build the LDAP server pool once so its server state persists across logins
+    ldap_server_pool()
     yield
     await async_session_manager.close()
 
 
-# get project version from pyproject.toml
-version = "0.0.1"
-with open(Path(__file__).parent.parent / "pyproject.toml", "rb") as f:
-    toml_dict = tomllib.load(f)
-    version = toml_dict["project"]["version"]
+# get project version from the installed package metadata
+try:
+    version = package_version("hobbes")
+except PackageNotFoundError:
+    version = "0.0.1"
 
 
 # init application
@@ -68,10 +89,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def route_metrics(request: Request, call_next):
+    """record per route latency using the route template to bound label cardinality"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    observe_request(
+        request.method,
+        route.path if route else "unmatched",
+        response.status_code,
+        time.perf_counter() - start,
+    )
+    return response
+
+
 # add api endpoint
 app.include_router(book_router)
 app.include_router(teams_router)
 app.include_router(auth_router)
+app.include_router(profiles_router)
+app.include_router(artifacts_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """prometheus scrape endpoint"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
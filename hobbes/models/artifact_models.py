@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import JSON, Column, DateTime, Enum, Field, SQLModel
 
@@ -26,6 +26,14 @@ class Profiles(SQLModel, table=True):
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
 
+    # case insensitive prefix search, text_pattern_ops lets LIKE 'abc%' use a btree
+    __table_args__ = (
+        Index(
+            "ix_profiles_prf_name_lower_pattern",
+            text("lower(prf_name) text_pattern_ops"),
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class ProfileVersions(SQLModel, table=True):
     """Profile version table schema"""
@@ -36,12 +44,36 @@ class ProfileVersions(SQLModel, table=True):
     prf_id: uuid.UUID = Field(nullable=False, foreign_key="profiles.prf_id")
     username: str = Field(nullable=False, description="user who created the version")
     # use variant so we can use JSON for sqlite for pytests and JSONB for postgres for service
-    ver_data: dict = Field(sa_column=Column(JSONB().with_variant(JSON, "sqlite")))
+    ver_data: Optional[dict] = Field(
+        default=None, sa_column=Column(JSONB().with_variant(JSON, "sqlite"))
+    )
+    # delta storage: JSON Patch from the previous version and the number of deltas
+    # since the last full snapshot, 0 means ver_data holds the full document
+    ver_delta: Optional[list] = Field(
+        default=None,
+        sa_column=Column(JSONB().with_variant(JSON, "sqlite")),
+        exclude=True,
+    )
+    delta_depth: int = Field(
+        default=0, sa_column_kwargs={"server_default": "0"}, exclude=True
+    )
+    # version the delta applies to, None for snapshots. Chains follow this link
+    # rather than create_dts order, which comes from each API host's clock
+    ver_base: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="profileversions.ver_id", exclude=True
+    )
     create_dts: datetime = Field(
         default_factory=gen_utcnow,
         sa_column=Column(DateTime(timezone=True), index=True, nullable=False),
     )
 
+    # as-of lookups walk one profile's history newest first
+    __table_args__ = (
+        Index(
+            "ix_profileversions_prf_id_create_dts", "prf_id", text("create_dts DESC")
+        ),
+    )
+
 
 class ProfileCreatePayload(SQLModel):
     """Profile inbound REST payload"""
@@ -79,6 +111,13 @@ class ProfilesSearchResponse(SQLModel):
     version: ProfileVersions
 
 
+class ProfilesSearchPaginationResponse(SQLModel):
+    """profile search page, next_cursor is None on the last page"""
+
+    rows: list[ProfilesSearchResponse]
+    next_cursor: Optional[str] = None
+
+
 class PackageTypes(str, enum.Enum):
     """Package types"""
 
@@ -151,6 +190,8 @@ class Dependencies(SQLModel, table=True):
     )
     dep_name: str = Field(nullable=False)
     version: str = Field(nullable=False)
+    # sortable PEP 440 key maintained from version, None when version does not parse
+    version_key: Optional[str] = Field(default=None, exclude=True)
     relative_url: Optional[str] = Field(default=None)
     detail: Optional[str] = Field(default=None)
     rep_id: uuid.UUID = Field(nullable=False, foreign_key="repositories.rep_id")
@@ -161,6 +202,7 @@ class Dependencies(SQLModel, table=True):
 
     __table_args__ = (
         UniqueConstraint("dep_name", "version", name="unique_name_version_constraint"),
+        Index("ix_dependencies_dep_name_version_key", "dep_name", "version_key"),
     )
 
 
@@ -171,8 +213,58 @@ class ProfilesPaginationResponse(SQLModel):
     profiles: list[Profiles]
 
 
+class DependencyRepositoryRead(SQLModel):
+    """dependency with its repository, listing response for include=repository"""
+
+    dep_id: uuid.UUID
+    dep_name: str
+    version: str
+    relative_url: Optional[str] = None
+    detail: Optional[str] = None
+    rep_id: uuid.UUID
+    create_dts: datetime
+    repository: Optional[Repositories] = None
+
+
 class ArtifactPaginationResponse(SQLModel):
     """Pagination API response"""
 
     total: int
-    rows: list[Repositories | Dependencies]
+    rows: list[Repositories | Dependencies | DependencyRepositoryRead]
+
+
+class ArtifactCursorPaginationResponse(SQLModel):
+    """keyset pagination API response, next_cursor is None on the last page"""
+
+    rows: list[Repositories | Dependencies | DependencyRepositoryRead]
+    next_cursor: Optional[str] = None
+
+
+class BulkDeletePayload(SQLModel):
+    """ids to delete in one request, dependencies of deleted repositories and versions
+    of deleted profiles are removed with them"""
+
+    repositories: list[uuid.UUID] = Field(default=[], max_length=1000)
+    dependencies: list[uuid.UUID] = Field(default=[], max_length=1000)
+    profiles: list[uuid.UUID] = Field(default=[], max_length=1000)
+
+
+class BulkDeleteResponse(SQLModel):
+    """ids actually deleted, including cascaded dependencies"""
+
+    repositories: list[uuid.UUID]
+    dependencies: list[uuid.UUID]
+    profiles: list[uuid.UUID]
+
+
+class DependencyResolvePayload(SQLModel):
+    """requirements to resolve, e.g. requests>=2.30,<3"""
+
+    requirements: list[str] = Field(min_length=1, max_length=1000)
+
+
+class DependencyResolution(SQLModel):
+    """highest dependency version satisfying a requirement, None when nothing matches"""
+
+    requirement: str
+    dependency: Optional[Dependencies] = None
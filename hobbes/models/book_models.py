@@ -1,9 +1,10 @@
 import enum
 import uuid
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
-from pydantic import BaseModel
+from pydantic import AwareDatetime, BaseModel
+from sqlalchemy import Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import JSON, Column, DateTime, Enum, Field, SQLModel
 
@@ -29,28 +30,90 @@ class Book(BookPayload, table=True):
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
 
+    # keyset pagination index matching the (create_datetimestamp, book_id) sort key
+    __table_args__ = (
+        Index(
+            "ix_book_create_datetimestamp_book_id", "create_datetimestamp", "book_id"
+        ),
+    )
+
+
+class BookArchive(BookPayload, table=True):
+    """archived book rows moved out of the hot book table by the archive_book task"""
+
+    __tablename__ = "book_archive"
+
+    isbn: str = Field(index=True, nullable=False)
+    book_id: uuid.UUID = Field(nullable=False, primary_key=True)
+    create_datetimestamp: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    archive_datetimestamp: datetime = Field(
+        default_factory=gen_utcnow,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+
+
+class ArchivePayload(SQLModel):
+    older_than: AwareDatetime = Field(
+        description="archive books created before this timestamp"
+    )
+    batch_size: int = Field(default=1000, ge=1, le=10000)
+
 
 class PaginationResponse(SQLModel):
     total: int
     rows: list
 
 
+class CursorPaginationResponse(SQLModel):
+    rows: list
+    next_cursor: Optional[str] = None
+
+
+class BulkRowError(SQLModel):
+    index: int
+    detail: list
+
+
+class BulkInsertResponse(SQLModel):
+    inserted: int
+    errors: list[BulkRowError]
+
+
 class BookFilter(SQLModel):
     title: Optional[str] = None
     isbn: Optional[str] = None
     genre: Optional[str] = None
     condition: Optional[str] = None
     create_datetimestamp: Optional[str] = None
+    any_of: Optional[list["BookFilter"]] = Field(
+        default=None, description="OR groups, each group is ANDed internally"
+    )
+    limit: Optional[int] = Field(default=None, ge=1, le=100)
+    cursor: Optional[str] = None
+
+
+class ExportFormat(str, enum.Enum):
+    """Book export serialization formats"""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
 
 
 class TaskResponse(BaseModel):
     task_id: str
     task_status: str
-    task_result: str
+    task_result: Optional[str] = None
+    task_progress: Optional[dict] = None
+
+
+class TaskStatusRequest(BaseModel):
+    task_ids: list[str] = Field(min_length=1, max_length=1000)
 
 
 class TeamPayload(SQLModel):
-    name: str = Field(index=True)
+    name: str = Field(index=True, unique=True)
     headquarters: str
 
 
@@ -93,4 +156,64 @@ class Hero(HeroPayload, table=True):
         )
     )
     # variant for testing with sqlite
-    powers: dict = Field(sa_column=Column(JSONB().with_variant(JSON, "sqlite")))
+    powers: Optional[dict] = Field(
+        default=None, sa_column=Column(JSONB().with_variant(JSON, "sqlite"))
+    )
+
+    # latest hero per team walks each team's heroes newest first
+    __table_args__ = (
+        Index(
+            "ix_hero_team_id_create_datetimestamp",
+            "team_id",
+            text("create_datetimestamp DESC"),
+        ),
+        # powers containment (@>) search, jsonb_path_ops is postgres only
+        Index(
+            "ix_hero_powers_path_ops",
+            "powers",
+            postgresql_using="gin",
+            postgresql_ops={"powers": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class RosterHeroPayload(HeroPayload):
+    powers: Optional[dict] = None
+
+
+class RosterTeamPayload(TeamPayload):
+    heroes: list[RosterHeroPayload] = Field(default_factory=list)
+
+
+class RosterImportPayload(SQLModel):
+    teams: list[RosterTeamPayload] = Field(min_length=1)
+
+
+class RosterTeamResult(SQLModel):
+    tid: uuid.UUID
+    name: str
+    heroes: int
+
+
+class RosterImportResponse(SQLModel):
+    teams: list[RosterTeamResult]
+    heroes: int
+
+
+class PowerPathEquals(SQLModel):
+    path: list[str] = Field(min_length=1, description="keys from the powers root")
+    value: Any
+
+
+class HeroSearchPayload(SQLModel):
+    contains: Optional[dict] = Field(
+        default=None, description="powers contain this document (@>)"
+    )
+    has_keys: Optional[list[str]] = Field(
+        default=None, description="top level powers keys that must all exist"
+    )
+    path_equals: Optional[list[PowerPathEquals]] = None
+    level: Optional[MutantClass] = None
+    team_id: Optional[uuid.UUID] = None
+    limit: int = Field(default=100, ge=1, le=100)
+    cursor: Optional[str] = None
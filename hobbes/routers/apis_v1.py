@@ -1,29 +1,59 @@
+import json
 import logging
 import uuid
 from datetime import datetime
 from typing import Annotated
 
-from celery.result import AsyncResult
-from fastapi import APIRouter, Depends, HTTPException, Query, Security, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Security,
+    status,
+)
+from fastapi.responses import Response, StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from hobbes.services.crud import (
     add_book,
     all_books,
+    all_books_cursor,
+    bulk_add_books,
     date_filter_books,
+    date_filter_query,
     edit_book,
     filter_books,
+    filter_query,
+    stream_books,
+)
+from hobbes.services.cache import BOOKS, cached_response, response_cache
+from hobbes.services.cursor import InvalidCursorException
+from hobbes.services.filter_engine import InvalidFilterException
+from hobbes.db.db_manager import (
+    get_async_session,
+    get_read_session,
+    pinned_to_primary,
 )
-from hobbes.db.db_manager import get_async_session
 from hobbes.core.service_iam import TokenData, validate_token
 from hobbes.models.book_models import (
+    ArchivePayload,
     Book,
     BookFilter,
     BookPayload,
+    BulkInsertResponse,
+    CursorPaginationResponse,
+    ExportFormat,
     PaginationResponse,
     TaskResponse,
+    TaskStatusRequest,
+)
+from hobbes.core.result_store import (
+    fetch_task_metas,
+    read_result_chunk,
+    watch_task_metas,
 )
-from hobbes.core.tasks import archive_book, replay_task, search_inventory_cll
 
 logger = logging.getLogger(__name__)
 
@@ -34,19 +64,32 @@ book_router = APIRouter(
 )
 
 
+def lazy_tasks():
+    """celery task module imported on first use. It pulls in celery, gevent and the
+    worker sync engine, which the API process only needs once it queues a task
+
+    Returns:
+        module: hobbes.core.tasks
+    """
+    from hobbes.core import tasks
+
+    return tasks
+
+
 @book_router.post("/archive_book", status_code=201)
-async def archive(payload: BookPayload) -> TaskResponse:
-    """archive
+async def archive(payload: ArchivePayload) -> TaskResponse:
+    """start background task moving books older than a cutoff into book_archive.
+    Poll /tasks/status/{task_id} for the rows moved so far
 
     Args:
-        payload (BookPayload): book json payload
+        payload (ArchivePayload): cutoff and batch size
 
     Returns:
         TaskResponse: task info
     """
     logger.debug("payload is %s", payload)
 
-    task = archive_book.delay(payload.model_dump())
+    task = lazy_tasks().archive_book.delay(payload.model_dump(mode="json"))
     return TaskResponse(
         task_id=task.id, task_status=task.status, task_result=task.state
     )
@@ -64,7 +107,7 @@ async def inventory(payload: BookPayload) -> TaskResponse:
     """
     logger.debug("payload is %s", payload)
 
-    task = search_inventory_cll.delay(payload.model_dump())
+    task = lazy_tasks().search_inventory_cll.delay(payload.model_dump())
     return TaskResponse(
         task_id=task.id, task_status=task.status, task_result=task.state
     )
@@ -90,6 +133,90 @@ async def insert_book(
     return await add_book(payload, session)
 
 
+async def ndjson_rows(request: Request):
+    """split a streamed NDJSON request body into lines without buffering the body
+
+    Args:
+        request (Request): starlette request
+
+    Yields:
+        tuple[int, bytes]: line index and raw JSON line
+    """
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, line
+            index += 1
+    if buffer.strip():
+        yield index, buffer
+
+
+async def json_array_rows(rows: list):
+    """adapt a decoded JSON array to the bulk row iterator
+
+    Args:
+        rows (list): decoded JSON array
+
+    Yields:
+        tuple[int, dict]: row index and object
+    """
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+@book_router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": BookPayload.model_json_schema(),
+                    }
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def insert_books_bulk(
+    request: Request,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> BulkInsertResponse:
+    """endpoint to insert many books. Accepts a JSON array or, with an
+    application/x-ndjson content type, one book per line. Valid rows are written in
+    batches, invalid rows are returned with their index and validation errors
+
+    Args:
+        request (Request): request with JSON array or NDJSON body
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        BulkInsertResponse: inserted count and per row errors
+    """
+    logger.debug("bulk insert by %s", token.username)
+    if "ndjson" in request.headers.get("content-type", ""):
+        return await bulk_add_books(ndjson_rows(request), session)
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="expected a JSON array"
+        )
+    return await bulk_add_books(json_array_rows(rows), session)
+
+
 @book_router.put("/{book_id}", status_code=status.HTTP_200_OK)
 async def udpate_book(
     book_id: uuid.UUID,
@@ -113,33 +240,60 @@ async def udpate_book(
 
 @book_router.get("", operation_id="get_all")
 async def get_all_books(
+    request: Request,
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-    session: AsyncSession = Depends(get_async_session),
-) -> PaginationResponse:
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+) -> PaginationResponse | CursorPaginationResponse:
     """get all Books
 
+    Offset mode is used by default. Passing the cursor parameter switches to keyset
+    mode: send an empty cursor for the first page then the next_cursor from each
+    response until it is null. Keyset pages cost the same regardless of depth.
+
+    Offset pages are served from the response cache with an ETag, a matching
+    If-None-Match returns 304.
+
     Args:
-        session (AsyncSession, optional): _description_. Defaults to Depends(get_async_session).
+        offset (int): row offset, offset mode only
+        limit (int): page size
+        cursor (str, optional): opaque next_cursor from the previous page
+        session (AsyncSession, optional): _description_. Defaults to Depends(get_read_session).
+        primary_session (AsyncSession, optional): primary session for cache misses, a
+            lagging replica would cache rows from before the last write
 
     Returns:
-        List[Book]: list of Book objects
+        PaginationResponse | CursorPaginationResponse: page of Book objects
     """
-    return await all_books(session, offset, limit)
+    if cursor is None:
+        entry = await response_cache.get_or_load(
+            BOOKS,
+            ("all_books", offset, limit),
+            lambda: all_books(primary_session, offset, limit),
+            refresh=pinned_to_primary(request),
+        )
+        return cached_response(request, entry)
+
+    try:
+        return await all_books_cursor(session, cursor, limit)
+    except InvalidCursorException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
 
 @book_router.get("/getbydate")
 async def get_books_by_date(
     date_param: datetime,
     compare: str,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """query Books by date filter.
 
     Args:
         date_param (datetime): format %Y-%m-%dT%H:%M:%SZ
         compare (str): gt or lt
-        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
 
     Returns:
         List[Book]: list of Book objects
@@ -149,7 +303,7 @@ async def get_books_by_date(
 
 @book_router.post("/search")
 async def search_books(
-    filter: BookFilter, session: AsyncSession = Depends(get_async_session)
+    filter: BookFilter, session: AsyncSession = Depends(get_read_session)
 ):
     """search Books by dynamic filter
 
@@ -162,18 +316,111 @@ async def search_books(
         "column5": ">=1", # greatr than or equal to
         "column6": "<=1", # less than or equal to
         "column7": "a,b", # between
+        "column8": "[a,b,c]", # in list
+        "column9": "abc*", # starts with
+        "column10": "a|>b", # a OR greater than b
+        "any_of": [{"column1": "a"}, {"column2": "b"}], # OR groups
+        "limit": 10, # page size, returns rows and next_cursor
+        "cursor": "...", # next_cursor from the previous page
         }
 
     datetime stamp string uses %Y-%m-%dT%H:%M:%SZ format
 
     Args:
         filter (BookFilter): book filter model
-        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
 
     Returns:
-        List[Book]: list of Book objects
+        List[Book] | CursorPaginationResponse: list of Book objects or a page of them
+    """
+    limit = filter.limit
+    if limit is None and filter.cursor:
+        limit = 100
+
+    try:
+        return await filter_books(
+            filter.model_dump(exclude_none=True, exclude={"limit", "cursor"}),
+            session,
+            limit,
+            filter.cursor,
+        )
+    except (InvalidFilterException, InvalidCursorException) as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def export_response(
+    query, fmt: ExportFormat, session: AsyncSession, params: dict | None = None
+):
+    """wrap streamed book export in a StreamingResponse
+
+    Args:
+        query (Select): book select statement
+        fmt (ExportFormat): output format
+        session (AsyncSession): SQLModel async session object
+        params (dict | None): bind parameters for query
+
+    Returns:
+        StreamingResponse: chunked response
     """
-    return await filter_books(filter.model_dump(exclude_none=True), session)
+    return StreamingResponse(
+        stream_books(query, fmt, session, params),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=books.{fmt.value}"},
+    )
+
+
+@book_router.get("/export", response_class=StreamingResponse)
+async def export_books_by_date(
+    date_param: datetime,
+    compare: str,
+    fmt: ExportFormat = ExportFormat.NDJSON,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """stream Books by date filter as NDJSON or CSV. Memory use stays flat regardless
+    of the number of matching rows
+
+    Args:
+        date_param (datetime): format %Y-%m-%dT%H:%M:%SZ
+        compare (str): gt or lt
+        fmt (ExportFormat): ndjson or csv
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        StreamingResponse: books one per line
+    """
+    return export_response(date_filter_query(date_param, compare), fmt, session)
+
+
+@book_router.post("/export/search", response_class=StreamingResponse)
+async def export_search_books(
+    filter: BookFilter,
+    fmt: ExportFormat = ExportFormat.NDJSON,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """stream Books matching a dynamic filter as NDJSON or CSV. Uses the same filter
+    operators as /search
+
+    Args:
+        filter (BookFilter): book filter model
+        fmt (ExportFormat): ndjson or csv
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        StreamingResponse: books one per line
+    """
+    try:
+        query, params = filter_query(
+            filter.model_dump(exclude_none=True, exclude={"limit", "cursor"})
+        )
+    except InvalidFilterException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+    return export_response(query, fmt, session, params)
 
 
 @book_router.get("/tasks/status/{task_id}")
@@ -188,16 +435,129 @@ async def get_status(task_id) -> TaskResponse:
         AsyncResult.state returns PENDING in case of unknown task ids.
         https://docs.celeryq.dev/en/latest/userguide/tasks.html#pending
     """
+    from celery.result import AsyncResult
+
     task = AsyncResult(task_id)
-    if task.result:
+    if task.state == "PROGRESS":
+        return TaskResponse(
+            task_id=task.id, task_status=task.status, task_progress=task.info
+        )
+
+    if task.result is not None:
         result = str(task.result)
     else:
         result = None
+    return TaskResponse(task_id=task.id, task_status=task.status, task_result=result)
+
+
+def task_response(task_id: str, meta: dict | None) -> TaskResponse:
+    """build TaskResponse from raw celery result backend meta
+
+    Args:
+        task_id (str): task uuid string
+        meta (dict | None): celery task meta, None when unknown or expired
+
+    Returns:
+        TaskResponse: task status, PENDING for unknown ids like AsyncResult
+    """
+    if not meta:
+        return TaskResponse(task_id=task_id, task_status="PENDING")
+
+    status_ = meta.get("status", "PENDING")
+    result = meta.get("result")
+    if status_ == "PROGRESS":
+        return TaskResponse(task_id=task_id, task_status=status_, task_progress=result)
     return TaskResponse(
-        task_id=task.id, task_status=task.status, task_result=result.info
+        task_id=task_id,
+        task_status=status_,
+        task_result=str(result) if result is not None else None,
     )
 
 
+@book_router.post("/tasks/status")
+async def get_status_batch(payload: TaskStatusRequest) -> list[TaskResponse]:
+    """retrieve the status of many tasks with a single result backend round trip
+
+    Args:
+        payload (TaskStatusRequest): task uuid strings
+
+    Returns:
+        list[TaskResponse]: status per task in request order
+    """
+    metas = await fetch_task_metas(payload.task_ids)
+    return [
+        task_response(task_id, meta) for task_id, meta in zip(payload.task_ids, metas)
+    ]
+
+
+async def task_event_stream(task_ids: list[str]):
+    """format task state changes as Server-Sent Events
+
+    Args:
+        task_ids (list[str]): task uuid strings
+
+    Yields:
+        str: SSE frame
+    """
+    try:
+        async for event in watch_task_metas(task_ids):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            task_id, meta = event
+            data = task_response(task_id, meta).model_dump_json()
+            yield f"event: status\ndata: {data}\n\n"
+    except TimeoutError:
+        # clients reconnect or poll /tasks/status for tasks still running
+        yield "event: timeout\ndata: {}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+@book_router.get("/tasks/events", response_class=StreamingResponse)
+async def task_status_events(
+    task_id: Annotated[list[str], Query(min_length=1, max_length=1000)],
+):
+    """Server-Sent Events stream of task state changes pushed from the result backend.
+    Sends the current state of every task, then each change, and closes with a done
+    event once all tasks are ready, or a timeout event after TASK_EVENTS_MAX_SECONDS.
+    Replaces polling /tasks/status/{task_id}
+
+    Args:
+        task_id (list[str]): repeatable task uuid query parameter
+
+    Returns:
+        StreamingResponse: text/event-stream
+    """
+    return StreamingResponse(
+        task_event_stream(task_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@book_router.get("/tasks/result/{task_id}")
+async def get_result_page(task_id: str, page: Annotated[int, Query(ge=0)] = 0):
+    """read one page of a chunked task result e.g. search_inventory. The page count is
+    in the task result from /tasks/status/{task_id}
+
+    Args:
+        task_id (str): task uuid string
+        page (int): zero based page number
+
+    Returns:
+        Response: JSON array of rows
+    """
+    chunk = await read_result_chunk(task_id, page)
+    if chunk is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"page {page} of task id {task_id} not found or expired",
+        )
+    return Response(content=chunk, media_type="application/json")
+
+
 @book_router.put("/tasks/retry/{task_id}")
 async def replay_web_task(task_id) -> TaskResponse:
     """_summary_
@@ -208,7 +568,7 @@ async def replay_web_task(task_id) -> TaskResponse:
     Returns:
         TaskResponse: model containing task id, status and result strings
     """
-    task = replay_task(task_id)
+    task = lazy_tasks().replay_task(task_id)
     if task:
         return TaskResponse(
             task_id=task.id, task_status=task.status, task_result=task.result
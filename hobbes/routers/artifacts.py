@@ -0,0 +1,358 @@
+import logging
+import uuid
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Security, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from hobbes.core.service_iam import TokenData, validate_token
+from hobbes.db.db_manager import (
+    get_async_session,
+    get_read_session,
+    pinned_to_primary,
+)
+from hobbes.models.artifact_models import (
+    ArtifactCursorPaginationResponse,
+    ArtifactPaginationResponse,
+    BulkDeletePayload,
+    BulkDeleteResponse,
+    Dependencies,
+    DependencyCreatePayload,
+    DependencyEditPayload,
+    DependencyResolution,
+    DependencyResolvePayload,
+    Repositories,
+    RepositoryCreatePayload,
+    RepositoryEditPayload,
+)
+from hobbes.services.artifacts_crud import (
+    DependencyNotFoundException,
+    IdNotFoundException,
+    InvalidRequirementException,
+    RepositoryNotFoundException,
+    add_dependency,
+    add_repository,
+    bulk_delete,
+    delete_by_id,
+    edit_dependency,
+    edit_repository,
+    fetch_by_id,
+    fetch_items,
+    fetch_items_cursor,
+    resolve_dependencies,
+)
+from hobbes.services.cache import ARTIFACTS, cached_response, response_cache
+from hobbes.services.cursor import InvalidCursorException
+
+logger = logging.getLogger(__name__)
+
+artifacts_router = APIRouter(
+    prefix="/v1/artifacts",
+    tags=["Artifacts"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@artifacts_router.post("/repositories", status_code=status.HTTP_201_CREATED)
+async def create_repository(
+    payload: RepositoryCreatePayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> Repositories:
+    """create repository
+
+    Args:
+        payload (RepositoryCreatePayload): repository json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        Repositories: repository
+    """
+    return await add_repository(session, payload, token)
+
+
+@artifacts_router.put("/repositories/{rep_id}")
+async def update_repository(
+    rep_id: uuid.UUID,
+    payload: RepositoryEditPayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> Repositories:
+    """edit repository
+
+    Args:
+        rep_id (uuid.UUID): repository id
+        payload (RepositoryEditPayload): repository json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        Repositories: edited repository
+    """
+    try:
+        return await edit_repository(session, rep_id, payload, token)
+    except RepositoryNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.post("/dependencies", status_code=status.HTTP_201_CREATED)
+async def create_dependency(
+    payload: DependencyCreatePayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> Dependencies:
+    """create dependency
+
+    Args:
+        payload (DependencyCreatePayload): dependency json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        Dependencies: dependency
+    """
+    return await add_dependency(session, payload, token)
+
+
+@artifacts_router.put("/dependencies/{dep_id}")
+async def update_dependency(
+    dep_id: uuid.UUID,
+    payload: DependencyEditPayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> Dependencies:
+    """edit dependency
+
+    Args:
+        dep_id (uuid.UUID): dependency id
+        payload (DependencyEditPayload): dependency json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        Dependencies: edited dependency
+    """
+    try:
+        return await edit_dependency(session, dep_id, payload, token)
+    except DependencyNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.get("/repositories")
+async def get_repositories(
+    request: Request,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+) -> ArtifactPaginationResponse | ArtifactCursorPaginationResponse:
+    """list repositories ordered by name
+
+    Offset mode is used by default. Passing the cursor parameter switches to keyset
+    mode: send an empty cursor for the first page then the next_cursor from each
+    response until it is null.
+
+    Args:
+        offset (int): row offset, offset mode only
+        limit (int): page size
+        cursor (str, optional): opaque next_cursor from the previous page
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+        primary_session (AsyncSession, optional): primary session for cache misses, a
+            lagging replica would cache rows from before the last write
+
+    Returns:
+        ArtifactPaginationResponse | ArtifactCursorPaginationResponse: page of repositories
+    """
+    if cursor is not None:
+        try:
+            return await fetch_items_cursor(session, Repositories, cursor, limit)
+        except InvalidCursorException as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+    entry = await response_cache.get_or_load(
+        ARTIFACTS,
+        ("repositories", offset, limit),
+        lambda: fetch_items(primary_session, Repositories, offset, limit),
+        refresh=pinned_to_primary(request),
+    )
+    return cached_response(request, entry)
+
+
+@artifacts_router.get("/dependencies")
+async def get_dependencies(
+    request: Request,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+    cursor: str | None = None,
+    include: Literal["repository"] | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+) -> ArtifactPaginationResponse | ArtifactCursorPaginationResponse:
+    """list dependencies ordered by name
+
+    Offset mode is used by default. Passing the cursor parameter switches to keyset
+    mode ordered by (dep_name, version): send an empty cursor for the first page then
+    the next_cursor from each response until it is null. include=repository embeds
+    each dependency's repository, loaded with one query per page.
+
+    Args:
+        offset (int): row offset, offset mode only
+        limit (int): page size
+        cursor (str, optional): opaque next_cursor from the previous page
+        include (str, optional): "repository" to embed the parent repository
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+        primary_session (AsyncSession, optional): primary session for cache misses, a
+            lagging replica would cache rows from before the last write
+
+    Returns:
+        ArtifactPaginationResponse | ArtifactCursorPaginationResponse: page of dependencies
+    """
+    include_repository = include == "repository"
+    if cursor is not None:
+        try:
+            return await fetch_items_cursor(
+                session, Dependencies, cursor, limit, include_repository
+            )
+        except InvalidCursorException as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+            )
+
+    entry = await response_cache.get_or_load(
+        ARTIFACTS,
+        ("dependencies", offset, limit, include_repository),
+        lambda: fetch_items(
+            primary_session, Dependencies, offset, limit, include_repository
+        ),
+        refresh=pinned_to_primary(request),
+    )
+    return cached_response(request, entry)
+
+
+@artifacts_router.post("/dependencies/resolve")
+async def resolve(
+    payload: DependencyResolvePayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    session: AsyncSession = Depends(get_read_session),
+) -> list[DependencyResolution]:
+    """resolve requirements such as requests>=2.30,<3 to the highest stored version
+    satisfying each, in one query
+
+    Args:
+        payload (DependencyResolvePayload): PEP 508 requirement strings
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        list[DependencyResolution]: best match per requirement, dependency is null when
+            no version satisfies it
+    """
+    try:
+        return await resolve_dependencies(session, payload.requirements)
+    except InvalidRequirementException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+@artifacts_router.get("/repositories/{rep_id}")
+async def get_repository(
+    rep_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    session: AsyncSession = Depends(get_read_session),
+) -> Repositories:
+    """get repository by id
+
+    Args:
+        rep_id (uuid.UUID): repository id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        Repositories: repository
+    """
+    try:
+        return await fetch_by_id(session, Repositories, rep_id)
+    except IdNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.get("/dependencies/{dep_id}")
+async def get_dependency(
+    dep_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    session: AsyncSession = Depends(get_read_session),
+) -> Dependencies:
+    """get dependency by id
+
+    Args:
+        dep_id (uuid.UUID): dependency id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        Dependencies: dependency
+    """
+    try:
+        return await fetch_by_id(session, Dependencies, dep_id)
+    except IdNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.delete("/repositories/{rep_id}")
+async def delete_repository(
+    rep_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> bool:
+    """delete repository
+
+    Args:
+        rep_id (uuid.UUID): repository id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        bool: delete success
+    """
+    try:
+        return await delete_by_id(session, Repositories, rep_id)
+    except IdNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.delete("/dependencies/{dep_id}")
+async def delete_dependency(
+    dep_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> bool:
+    """delete dependency
+
+    Args:
+        dep_id (uuid.UUID): dependency id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        bool: delete success
+    """
+    try:
+        return await delete_by_id(session, Dependencies, dep_id)
+    except IdNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@artifacts_router.post("/delete")
+async def delete_many(
+    payload: BulkDeletePayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> BulkDeleteResponse:
+    """delete many repositories, dependencies and profiles in one transaction.
+    Dependencies of deleted repositories and versions of deleted profiles are deleted
+    with them, unknown ids are ignored
+
+    Args:
+        payload (BulkDeletePayload): ids to delete
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        BulkDeleteResponse: deleted ids
+    """
+    return await bulk_delete(session, payload)
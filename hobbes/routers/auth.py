@@ -7,7 +7,14 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from hobbes.core.service_iam import LDAPAuth, create_access_token, Token
+from hobbes.core.service_iam import (
+    LDAPAuth,
+    LDAPSaturatedException,
+    LDAPUnavailableException,
+    Token,
+    create_access_token,
+    ldap_exhaust_seconds,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +42,24 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> T
     Returns:
         Token: JWT token
     """
-    auth_scopes = LDAPAuth.authenticate(form_data.username, form_data.password)
+    try:
+        auth_scopes = await LDAPAuth.authenticate_async(
+            form_data.username, form_data.password
+        )
+    except LDAPSaturatedException as error:
+        logger.warning(error)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="authentication service busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+    except LDAPUnavailableException as error:
+        logger.error(error)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="authentication service unavailable, retry later",
+            headers={"Retry-After": str(ldap_exhaust_seconds)},
+        )
     if not auth_scopes:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,258 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Security, status
+from pydantic import AwareDatetime
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from hobbes.core.service_iam import TokenData, validate_token
+from hobbes.db.db_manager import (
+    get_async_session,
+    get_read_session,
+    pinned_to_primary,
+)
+from hobbes.models.artifact_models import (
+    ProfileCreatePayload,
+    ProfileCreateVersionPayload,
+    ProfileResponse,
+    ProfilesPaginationResponse,
+    ProfilesSearchPaginationResponse,
+    ProfilesSearchResponse,
+    ProfileVersions,
+)
+from hobbes.services.cache import PROFILES, cached_response, response_cache
+from hobbes.services.cursor import InvalidCursorException
+from hobbes.services.pf_crud import (
+    IdNotFoundException,
+    ProfileNotFoundException,
+    add_profile,
+    add_profile_version,
+    fetch_by_id,
+    fetch_profile_version,
+    fetch_profile_versions,
+    fetch_profiles,
+    find_profile,
+    remove_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+profiles_router = APIRouter(
+    prefix="/v1/profiles",
+    tags=["Profiles"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@profiles_router.post("", status_code=status.HTTP_201_CREATED)
+async def create_profile(
+    payload: ProfileCreatePayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> ProfileResponse:
+    """create profile and its first version
+
+    Args:
+        payload (ProfileCreatePayload): profile json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        ProfileResponse: profile and version
+    """
+    logger.debug("payload is %s %s", payload, token.username)
+    return await add_profile(session, payload, token)
+
+
+@profiles_router.post("/{profile_name}/versions", status_code=status.HTTP_201_CREATED)
+async def create_profile_version(
+    profile_name: str,
+    payload: ProfileCreateVersionPayload,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> ProfileResponse:
+    """add new version to an existing profile
+
+    Args:
+        profile_name (str): profile name
+        payload (ProfileCreateVersionPayload): version json payload
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        ProfileResponse: profile and version
+    """
+    try:
+        return await add_profile_version(session, profile_name, payload, token)
+    except ProfileNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@profiles_router.get("")
+async def get_profiles(
+    request: Request,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+    session: AsyncSession = Depends(get_async_session),
+) -> ProfilesPaginationResponse:
+    """list profiles without versions
+
+    Args:
+        offset (int): row offset
+        limit (int): page size
+        session (AsyncSession, optional): primary session from db_manager get_async_session, cache
+            misses must not read a lagging replica
+
+    Returns:
+        ProfilesPaginationResponse: total and page of profiles
+    """
+    entry = await response_cache.get_or_load(
+        PROFILES,
+        ("profiles", offset, limit),
+        lambda: fetch_profiles(session, offset, limit),
+        refresh=pinned_to_primary(request),
+    )
+    return cached_response(request, entry)
+
+
+@profiles_router.get("/search")
+async def search_profiles(
+    profile_name: str,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    search_date: AwareDatetime | None = None,
+    limit: Annotated[int | None, Query(ge=1, le=100)] = None,
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> list[ProfilesSearchResponse] | ProfilesSearchPaginationResponse:
+    """search profiles by case insensitive name prefix, returning the latest version
+    of each matching profile
+
+    Passing limit or cursor switches to keyset pages ordered by profile name, send
+    the next_cursor from each response until it is null.
+
+    Args:
+        profile_name (str): profile name prefix
+        search_date (AwareDatetime, optional): as of timestamp, defaults to now
+        limit (int, optional): page size
+        cursor (str, optional): opaque next_cursor from the previous page
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        list[ProfilesSearchResponse] | ProfilesSearchPaginationResponse: latest
+            version per matching profile or a page of them
+    """
+    if limit is None and cursor:
+        limit = 100
+
+    try:
+        return await find_profile(
+            session,
+            profile_name,
+            search_date or datetime.now(timezone.utc),
+            limit,
+            cursor,
+        )
+    except ProfileNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    except InvalidCursorException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+@profiles_router.get("/versions/{ver_id}")
+async def get_profile_version_by_id(
+    ver_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    session: AsyncSession = Depends(get_read_session),
+) -> ProfileVersions:
+    """get profile version by id
+
+    Args:
+        ver_id (uuid.UUID): version id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        ProfileVersions: profile version
+    """
+    try:
+        return await fetch_by_id(session, ProfileVersions, ver_id)
+    except ProfileNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@profiles_router.get("/{profile_name}")
+async def get_profile_version(
+    request: Request,
+    profile_name: str,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    search_date: AwareDatetime | None = None,
+    session: AsyncSession = Depends(get_async_session),
+) -> ProfileVersions:
+    """get the profile version in effect at search_date
+
+    Args:
+        profile_name (str): profile name
+        search_date (AwareDatetime, optional): as of timestamp, defaults to now
+        session (AsyncSession, optional): primary session from db_manager get_async_session, cache
+            misses must not read a lagging replica
+
+    Returns:
+        ProfileVersions: most recent version prior to search_date
+    """
+    # the current version is cached until the next profile write, a fixed past
+    # search_date is cached under its own key
+    key = ("profile_version", profile_name, search_date and search_date.isoformat())
+    try:
+        entry = await response_cache.get_or_load(
+            PROFILES,
+            key,
+            lambda: fetch_profile_version(
+                session, profile_name, search_date or datetime.now(timezone.utc)
+            ),
+            refresh=pinned_to_primary(request),
+        )
+        return cached_response(request, entry)
+    except ProfileNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@profiles_router.get("/{profile_name}/versions")
+async def get_profile_versions(
+    profile_name: str,
+    token: Annotated[TokenData, Security(validate_token, scopes=["read"])],
+    session: AsyncSession = Depends(get_read_session),
+) -> list[ProfileVersions]:
+    """get all versions of a profile
+
+    Args:
+        profile_name (str): profile name
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        list[ProfileVersions]: profile versions
+    """
+    try:
+        return await fetch_profile_versions(session, profile_name)
+    except ProfileNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+
+@profiles_router.delete("/{prf_id}")
+async def delete_profile(
+    prf_id: uuid.UUID,
+    token: Annotated[TokenData, Security(validate_token, scopes=["write"])],
+    session: AsyncSession = Depends(get_async_session),
+) -> bool:
+    """delete profile and all of its versions
+
+    Args:
+        prf_id (uuid.UUID): profile id
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
+
+    Returns:
+        bool: delete success
+    """
+    try:
+        return await remove_profile(session, prf_id)
+    except IdNotFoundException as error:
+        raise HTTPException(status_code=404, detail=str(error))
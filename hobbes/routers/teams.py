@@ -1,11 +1,28 @@
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from hobbes.services.crud import insert_hero, insert_team, search_recent_team_member
-from hobbes.db.db_manager import get_async_session
-from hobbes.models.book_models import HeroPayload, TeamPayload
+from hobbes.db.db_manager import get_async_session, get_read_session
+from hobbes.models.book_models import (
+    CursorPaginationResponse,
+    Hero,
+    HeroPayload,
+    HeroSearchPayload,
+    RosterImportPayload,
+    RosterImportResponse,
+    TeamPayload,
+)
+from hobbes.services.crud import (
+    TeamExistsException,
+    TeamNotFoundException,
+    import_roster,
+    insert_hero,
+    insert_team,
+    search_heroes,
+    search_recent_team_member,
+)
+from hobbes.services.cursor import InvalidCursorException
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +47,10 @@ async def add_team(
     """
     logger.debug("payload is %s", payload)
 
-    return await insert_team(payload, session)
+    try:
+        return await insert_team(payload, session)
+    except TeamExistsException as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
 
 
 @teams_router.post("/hero/{team}", status_code=201)
@@ -47,18 +67,73 @@ async def add_hero(
     """
     logger.debug("payload is %s", payload)
 
-    return await insert_hero(payload, team, session)
+    try:
+        return await insert_hero(payload, team, session)
+    except TeamNotFoundException as error:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(error))
 
 
-@teams_router.post("/recent_heroes", status_code=201)
-async def search_heroes(session: AsyncSession = Depends(get_async_session)):
-    """add hero
+@teams_router.post("/roster", status_code=201)
+async def add_roster(
+    payload: RosterImportPayload, session: AsyncSession = Depends(get_async_session)
+) -> RosterImportResponse:
+    """import teams with their heroes in one transaction
 
     Args:
-        payload (HeroPayload): book json payload
+        payload (RosterImportPayload): teams with nested heroes
+        session (AsyncSession, optional): Dependency injection calling db_manager get_async_session
 
     Returns:
-        resp
+        RosterImportResponse: team id and hero count per team
     """
+    logger.debug("roster import of %s teams", len(payload.teams))
+
+    try:
+        return await import_roster(payload, session)
+    except TeamExistsException as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+
+
+@teams_router.get("/recent_heroes")
+async def recent_heroes(
+    session: AsyncSession = Depends(get_read_session),
+) -> dict[str, Hero]:
+    """most recently created hero of every team
+
+    Args:
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
 
+    Returns:
+        dict[str, Hero]: team name to its latest hero
+    """
     return await search_recent_team_member(session)
+
+
+@teams_router.post("/heroes/search")
+async def search_hero_powers(
+    payload: HeroSearchPayload, session: AsyncSession = Depends(get_read_session)
+) -> CursorPaginationResponse:
+    """search heroes by powers, level and team. All given predicates must match
+
+    Example
+        {
+        "contains": {"fire": {"range": 3}}, # powers contain the document
+        "has_keys": ["flight"], # top level powers keys exist
+        "path_equals": [{"path": ["fire", "range"], "value": 3}], # value at path
+        "level": "alpha",
+        "team_id": "...",
+        "limit": 10, # page size, default 100
+        "cursor": "...", # next_cursor from the previous page
+        }
+
+    Args:
+        payload (HeroSearchPayload): hero search model
+        session (AsyncSession, optional): Dependency injection calling db_manager get_read_session
+
+    Returns:
+        CursorPaginationResponse: page of Hero objects and cursor for the next page
+    """
+    try:
+        return await search_heroes(session, payload)
+    except InvalidCursorException as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
@@ -2,19 +2,30 @@ import logging
 import uuid
 from typing import Type
 
-from sqlmodel import SQLModel, func, select
+from packaging.requirements import InvalidRequirement, Requirement
+from sqlalchemy import delete, tuple_
+from sqlmodel import SQLModel, and_, func, or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from hobbes.routers.auth import TokenData
+from hobbes.core.service_iam import TokenData
 from hobbes.models.artifact_models import (
+    BulkDeletePayload,
+    BulkDeleteResponse,
     Dependencies,
     DependencyCreatePayload,
     DependencyEditPayload,
+    DependencyRepositoryRead,
+    DependencyResolution,
+    ArtifactCursorPaginationResponse,
     ArtifactPaginationResponse,
     Repositories,
     RepositoryCreatePayload,
     RepositoryEditPayload,
 )
+from hobbes.services.cache import ARTIFACTS, response_cache
+from hobbes.services.cursor import decode_cursor, encode_cursor
+from hobbes.services.pf_crud import delete_profile_rows, profiles_deleted
+from hobbes.services.versions import parse, specifier_bounds, version_key
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +42,10 @@ class IdNotFoundException(Exception):
     """Id not found"""
 
 
+class InvalidRequirementException(Exception):
+    """requirement string can not be parsed"""
+
+
 async def add_repository(
     session: AsyncSession, payload: RepositoryCreatePayload, token: TokenData
 ) -> Repositories:
@@ -51,6 +66,7 @@ async def add_repository(
     )
     session.add(rep)
     await session.commit()
+    await response_cache.invalidate(ARTIFACTS)
 
     return rep
 
@@ -88,6 +104,7 @@ async def edit_repository(
 
         session.add(rep)
         await session.commit()
+        await response_cache.invalidate(ARTIFACTS)
         await session.refresh(rep)
 
         return rep
@@ -113,12 +130,14 @@ async def add_dependency(
     dep = Dependencies(
         dep_name=payload.dep_name,
         version=payload.version,
+        version_key=version_key(payload.version),
         relative_url=payload.relative_url,
         detail=payload.detail,
         rep_id=payload.rep_id,
     )
     session.add(dep)
     await session.commit()
+    await response_cache.invalidate(ARTIFACTS)
     return dep
 
 
@@ -149,6 +168,7 @@ async def edit_dependency(
 
         if dep.version != payload.version:
             dep.version = payload.version
+            dep.version_key = version_key(payload.version)
 
         if dep.relative_url != payload.relative_url:
             dep.relative_url = payload.relative_url
@@ -161,6 +181,7 @@ async def edit_dependency(
 
         session.add(dep)
         await session.commit()
+        await response_cache.invalidate(ARTIFACTS)
         await session.refresh(dep)
 
         return dep
@@ -168,7 +189,11 @@ async def edit_dependency(
 
 
 async def fetch_items(
-    session: AsyncSession, model: Type[SQLModel], offset: int, limit: int
+    session: AsyncSession,
+    model: Type[SQLModel],
+    offset: int,
+    limit: int,
+    include_repository: bool = False,
 ) -> ArtifactPaginationResponse:
     """
     Fetch list of items based on model parameter.
@@ -177,6 +202,7 @@ async def fetch_items(
         session (AsyncSession): SQLModel scoped async session object
         offset (int): table offset
         limit (int): row limit
+        include_repository (bool): attach the repository to each dependency
 
     Returns:
         ArtifactPaginationResponse: paginated model list of rows
@@ -199,7 +225,160 @@ async def fetch_items(
             .limit(limit)
         )
 
-    return ArtifactPaginationResponse(total=total, rows=list(result.all()))
+    rows = list(result.all())
+    if include_repository and model == Dependencies:
+        rows = await with_repositories(session, rows)
+    return ArtifactPaginationResponse(total=total, rows=rows)
+
+
+async def with_repositories(
+    session: AsyncSession, dependencies: list[Dependencies]
+) -> list[DependencyRepositoryRead]:
+    """
+    Attach the parent repository to each dependency, loading all of them in one query
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        dependencies (list[Dependencies]): page of dependencies
+
+    Returns:
+        list[DependencyRepositoryRead]: dependencies with their repository
+    """
+    rep_ids = {dep.rep_id for dep in dependencies}
+    repositories = {}
+    if rep_ids:
+        result = await session.exec(
+            select(Repositories).where(Repositories.rep_id.in_(rep_ids))
+        )
+        repositories = {rep.rep_id: rep for rep in result.all()}
+
+    return [
+        DependencyRepositoryRead(
+            **dep.model_dump(), repository=repositories.get(dep.rep_id)
+        )
+        for dep in dependencies
+    ]
+
+
+async def fetch_items_cursor(
+    session: AsyncSession,
+    model: Type[SQLModel],
+    cursor: str | None,
+    limit: int,
+    include_repository: bool = False,
+) -> ArtifactCursorPaginationResponse:
+    """
+    Keyset paginated listing. Repositories are ordered by rep_name and dependencies by
+    (dep_name, version), both covered by their unique indexes, so deep pages cost the
+    same as the first one
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        model (Type[SQLModel]): Repositories or Dependencies
+        cursor (str | None): next_cursor from the previous page or None for the first page
+        limit (int): page size
+        include_repository (bool): attach the repository to each dependency
+
+    Raises:
+        InvalidCursorException: malformed cursor
+
+    Returns:
+        ArtifactCursorPaginationResponse: page of rows and cursor for the next page
+    """
+    if model == Repositories:
+        query = select(Repositories).order_by(Repositories.rep_name)
+        if cursor:
+            (last_name,) = decode_cursor(cursor, str)
+            query = query.where(Repositories.rep_name > last_name)
+    else:
+        query = select(Dependencies).order_by(
+            Dependencies.dep_name, Dependencies.version
+        )
+        if cursor:
+            last_name, last_version = decode_cursor(cursor, str, str)
+            query = query.where(
+                tuple_(Dependencies.dep_name, Dependencies.version)
+                > tuple_(last_name, last_version)
+            )
+
+    # fetch one extra row to know if there is a next page
+    result = await session.exec(query.limit(limit + 1))
+    rows = list(result.all())
+
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        if model == Repositories:
+            next_cursor = encode_cursor(rows[-1].rep_name)
+        else:
+            next_cursor = encode_cursor(rows[-1].dep_name, rows[-1].version)
+
+    if include_repository and model == Dependencies:
+        rows = await with_repositories(session, rows)
+    return ArtifactCursorPaginationResponse(rows=rows, next_cursor=next_cursor)
+
+
+async def resolve_dependencies(
+    session: AsyncSession, requirements: list[str]
+) -> list[DependencyResolution]:
+    """
+    Find the highest stored version satisfying each requirement. Every requirement is
+    narrowed to a (dep_name, version_key) range plus the versions without a key, and
+    all ranges are fetched in one query; the exact specifier match, including
+    pre-release rules and the newest first order, runs in Python
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        requirements (list[str]): PEP 508 name and specifier e.g. requests>=2.30,<3
+
+    Raises:
+        InvalidRequirementException: requirement can not be parsed
+
+    Returns:
+        list[DependencyResolution]: one resolution per requirement in request order
+    """
+    parsed = []
+    ranges = []
+    for text in requirements:
+        try:
+            requirement = Requirement(text)
+        except InvalidRequirement as error:
+            raise InvalidRequirementException(f"invalid requirement {text}: {error}")
+        parsed.append(requirement)
+
+        low, high = specifier_bounds(requirement.specifier)
+        bounds = []
+        if low is not None:
+            bounds.append(Dependencies.version_key >= low)
+        if high is not None:
+            bounds.append(Dependencies.version_key <= high)
+        conditions = [Dependencies.dep_name == requirement.name]
+        if bounds:
+            # versions without a key are outside the key order, recheck all of them
+            conditions.append(or_(Dependencies.version_key.is_(None), and_(*bounds)))
+        ranges.append(and_(*conditions))
+
+    result = await session.exec(select(Dependencies).where(or_(*ranges)))
+    candidates: dict[str, list[Dependencies]] = {}
+    for dep in result.all():
+        candidates.setdefault(dep.dep_name, []).append(dep)
+
+    resolved = []
+    for text, requirement in zip(requirements, parsed):
+        by_version = {
+            dep.version: dep
+            for dep in candidates.get(requirement.name, [])
+            if parse(dep.version) is not None
+        }
+        # newest first and filter keeps order, so the first match is best
+        newest = sorted(by_version, key=parse, reverse=True)
+        best = next(iter(requirement.specifier.filter(newest)), None)
+        resolved.append(
+            DependencyResolution(
+                requirement=text, dependency=by_version[best] if best else None
+            )
+        )
+    return resolved
 
 
 async def fetch_by_id(session: AsyncSession, model: Type[SQLModel], obj_id: uuid.UUID):
@@ -223,27 +402,107 @@ async def fetch_by_id(session: AsyncSession, model: Type[SQLModel], obj_id: uuid
     raise IdNotFoundException(f"{model} id {obj_id} not found")
 
 
+async def delete_artifact_rows(
+    session: AsyncSession,
+    rep_ids: list[uuid.UUID],
+    dep_ids: list[uuid.UUID],
+) -> tuple[list[uuid.UUID], list[uuid.UUID]]:
+    """
+    Delete repositories and dependencies with one DELETE ... RETURNING per table.
+    Dependencies of deleted repositories are deleted with them. Does not commit
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        rep_ids (list[uuid.UUID]): repository ids
+        dep_ids (list[uuid.UUID]): dependency ids
+
+    Returns:
+        tuple[list[uuid.UUID], list[uuid.UUID]]: deleted repository and dependency ids
+    """
+    deleted_deps = []
+    if rep_ids or dep_ids:
+        result = await session.exec(
+            delete(Dependencies)
+            .where(
+                or_(
+                    Dependencies.dep_id.in_(dep_ids),
+                    Dependencies.rep_id.in_(rep_ids),
+                )
+            )
+            .returning(Dependencies.dep_id)
+        )
+        deleted_deps = list(result.scalars())
+
+    deleted_reps = []
+    if rep_ids:
+        result = await session.exec(
+            delete(Repositories)
+            .where(Repositories.rep_id.in_(rep_ids))
+            .returning(Repositories.rep_id)
+        )
+        deleted_reps = list(result.scalars())
+    return deleted_reps, deleted_deps
+
+
 async def delete_by_id(
     session: AsyncSession, model: Type[SQLModel], obj_id: uuid.UUID
 ) -> bool:
     """
-    Delete dependency
+    Delete repository, with its dependencies, or dependency
 
     Args:
         session (AsyncSession): SQLModel scoped async session object
+        model (Type[SQLModel]): Repositories or Dependencies
         obj_id (uuid.UUID): model id
 
+    Raises:
+        IdNotFoundException: id not found
+
     Returns:
         bool: delete success
     """
     if model == Repositories:
-        result = await session.exec(select(model).where(Repositories.rep_id == obj_id))
-    else:
-        result = await session.exec(select(model).where(Dependencies.dep_id == obj_id))
-    resp = result.one_or_none()
-    if resp:
-        await session.delete(resp)
-        await session.commit()
-        return True
+        deleted, _ = await delete_artifact_rows(session, [obj_id], [])
     else:
+        _, deleted = await delete_artifact_rows(session, [], [obj_id])
+
+    if not deleted:
+        await session.rollback()
         raise IdNotFoundException(f"{model} id {obj_id} not found")
+
+    await session.commit()
+    await response_cache.invalidate(ARTIFACTS)
+    return True
+
+
+async def bulk_delete(
+    session: AsyncSession, payload: BulkDeletePayload
+) -> BulkDeleteResponse:
+    """
+    Delete repositories, dependencies and profiles in one transaction with one
+    statement per table. Unknown ids are ignored
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        payload (BulkDeletePayload): ids to delete
+
+    Returns:
+        BulkDeleteResponse: deleted ids
+    """
+    rep_ids, dep_ids = await delete_artifact_rows(
+        session, payload.repositories, payload.dependencies
+    )
+    prf_ids, profile_names, ver_ids = [], [], []
+    if payload.profiles:
+        prf_ids, profile_names, ver_ids = await delete_profile_rows(
+            session, payload.profiles
+        )
+    await session.commit()
+
+    if rep_ids or dep_ids:
+        await response_cache.invalidate(ARTIFACTS)
+    if prf_ids:
+        await profiles_deleted(profile_names, ver_ids)
+    return BulkDeleteResponse(
+        repositories=rep_ids, dependencies=dep_ids, profiles=prf_ids
+    )
@@ -0,0 +1,225 @@
+"""
+Response cache for hot read endpoints.
+
+Entries hold the serialized JSON body and its ETag. Lookups go through an in-process
+TTL/LRU tier and, when RESPONSE_CACHE_REDIS_URL is set, a shared Redis tier. Each
+namespace has a generation number that is part of every key; writes bump the
+generation so all cached pages of that namespace are invalidated at once.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")
+
+# namespaces invalidated together by writes
+BOOKS = "books"
+PROFILES = "profiles"
+ARTIFACTS = "artifacts"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """serialized response body and its strong ETag"""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "CacheEntry":
+        return cls(
+            body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        )
+
+
+def serialize(result) -> bytes:
+    """serialize a service result to JSON bytes
+
+    Args:
+        result: pydantic model or anything jsonable_encoder handles
+
+    Returns:
+        bytes: JSON body
+    """
+    if isinstance(result, BaseModel):
+        return result.model_dump_json().encode()
+    return json.dumps(jsonable_encoder(result)).encode()
+
+
+class TTLCache:
+    """bounded in-process LRU where every entry expires after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        expires, entry = item
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: Any):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, entry)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class ResponseCache:
+    """two tier response cache with per namespace generation invalidation
+
+    Args:
+        maxsize (int): in-process entries, 0 disables caching
+        ttl (float): entry lifetime in seconds for both tiers
+        redis_url (str | None): shared tier, in-process only when None
+    """
+
+    def __init__(self, maxsize: int, ttl: float, redis_url: str | None = None):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, ttl)
+        self.redis = redis.asyncio.Redis.from_url(redis_url) if redis_url else None
+        self._generations: dict[str, int] = {}
+
+    @staticmethod
+    def _generation_key(namespace: str) -> str:
+        return f"hobbes:cache:gen:{namespace}"
+
+    async def generation(self, namespace: str) -> int:
+        if self.redis is not None:
+            try:
+                value = await self.redis.get(self._generation_key(namespace))
+                return int(value or 0)
+            except redis.RedisError as error:
+                logger.warning("response cache generation lookup failed %s", error)
+        return self._generations.get(namespace, 0)
+
+    async def invalidate(self, namespace: str):
+        """drop every cached entry of a namespace. Called by writes after commit
+
+        Args:
+            namespace (str): BOOKS, PROFILES or ARTIFACTS
+        """
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        if self.redis is not None:
+            try:
+                await self.redis.incr(self._generation_key(namespace))
+            except redis.RedisError as error:
+                logger.warning("response cache invalidation failed %s", error)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: tuple,
+        loader: Callable[[], Awaitable],
+        refresh: bool = False,
+    ) -> CacheEntry:
+        """return the cached entry for key or run loader and cache its result. The
+        loader must read from the primary, a lagging replica would cache rows from
+        before the write that bumped the generation
+
+        Args:
+            namespace (str): invalidation namespace
+            key (tuple): hashable request parameters
+            loader (Callable[[], Awaitable]): service call producing the response
+            refresh (bool): skip both tiers and reload, e.g. a client pinned to the
+                primary after a write, another process may still hold an old entry
+
+        Returns:
+            CacheEntry: body and ETag
+        """
+        generation = await self.generation(namespace)
+        cache_key = f"{namespace}:{generation}:{key!r}"
+
+        entry = None if refresh else self.local.get(cache_key)
+        if entry is not None:
+            return entry
+
+        if self.redis is not None and not refresh:
+            try:
+                body = await self.redis.get(f"hobbes:cache:{cache_key}")
+                if body is not None:
+                    entry = CacheEntry.from_body(body)
+                    self.local.put(cache_key, entry)
+                    return entry
+            except redis.RedisError as error:
+                logger.warning("response cache read failed %s", error)
+
+        entry = CacheEntry.from_body(serialize(await loader()))
+        self.local.put(cache_key, entry)
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    f"hobbes:cache:{cache_key}", entry.body, ex=max(int(self.ttl), 1)
+                )
+            except redis.RedisError as error:
+                logger.warning("response cache write failed %s", error)
+        return entry
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_REDIS_URL
+)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """check If-None-Match against an ETag, weak comparison as in RFC 9110
+
+    Args:
+        request (Request): client request
+        etag (str): current ETag
+
+    Returns:
+        bool: True when the client copy is current
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags
+
+
+def cached_response(request: Request, entry: CacheEntry) -> Response:
+    """build a 304 when the client ETag is current, otherwise the cached JSON body
+
+    Args:
+        request (Request): client request
+        entry (CacheEntry): cached body and ETag
+
+    Returns:
+        Response: 304 without body or 200 JSON
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
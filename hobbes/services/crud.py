@@ -1,25 +1,79 @@
+import csv
+import io
+import json
 import logging
+import os
 import re
 import uuid
 from datetime import datetime
-
-from sqlalchemy import types
-from sqlalchemy.orm import class_mapper
-from sqlmodel import and_, desc, func, select
+from typing import AsyncIterable, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert, true, tuple_, type_coerce, types
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, class_mapper
+from sqlmodel import SQLModel, and_, desc, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from hobbes.models.book_models import (
     Book,
     BookPayload,
+    BulkInsertResponse,
+    BulkRowError,
+    CursorPaginationResponse,
+    ExportFormat,
     Hero,
     HeroPayload,
+    HeroSearchPayload,
     PaginationResponse,
+    RosterImportPayload,
+    RosterImportResponse,
+    RosterTeamResult,
     Team,
     TeamPayload,
+    gen_utcnow,
 )
+from hobbes.services.cache import BOOKS, TTLCache, response_cache
+from hobbes.services.cursor import decode_cursor, encode_cursor
+from hobbes.services.filter_engine import FilterEngine
 
 logger = logging.getLogger(__name__)
 
+# rows fetched per server side cursor round trip when streaming exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+BOOK_EXPORT_FIELDS = [
+    "book_id",
+    "title",
+    "isbn",
+    "genre",
+    "condition",
+    "create_datetimestamp",
+]
+
+# rows written per COPY or multi-row INSERT statement, per transaction for books
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BOOK_BULK_COLUMNS = (
+    "book_id",
+    "title",
+    "isbn",
+    "genre",
+    "condition",
+    "create_datetimestamp",
+)
+
+# process local team name to id cache for hero inserts
+# teams or heroes per multi-row INSERT in a roster import, capped by roster_chunk_size
+ROSTER_BATCH_SIZE = int(os.getenv("ROSTER_BATCH_SIZE", "1000"))
+# asyncpg binds at most this many parameters in one statement
+MAX_BIND_PARAMS = 32767
+TEAM_CACHE_TTL = float(os.getenv("TEAM_CACHE_TTL", "300"))
+TEAM_CACHE_SIZE = int(os.getenv("TEAM_CACHE_SIZE", "10000"))
+team_ids = TTLCache(TEAM_CACHE_SIZE, TEAM_CACHE_TTL)
+
+# compiled filter engine for the search endpoints
+book_filter = FilterEngine(Book, keyset=("create_datetimestamp", "book_id"))
+
 
 class BookNotFoundException(Exception):
     """Raised when a bank account has insufficient funds for a transaction."""
@@ -27,6 +81,14 @@ class BookNotFoundException(Exception):
     pass
 
 
+class TeamNotFoundException(Exception):
+    """raised when no team has the requested name"""
+
+
+class TeamExistsException(Exception):
+    """raised when a team name is already taken"""
+
+
 def set_val_type(column, val):
     """determine column type and cast value accordingly
 
@@ -99,7 +161,8 @@ def generate_filter(column, v):
 
 
 def build_query(table, filter_by):
-    """build query with binary filter from fields included in payload search
+    """build query with binary filter from fields included in payload search.
+    Superseded by FilterEngine, kept as the baseline for profiling/bench_filter_engine.py
 
     Args:
         table (SQLModel): SQLModel class
@@ -133,9 +196,89 @@ async def add_book(payload: BookPayload, session: AsyncSession):
     )
     session.add(book)
     await session.commit()
+    await response_cache.invalidate(BOOKS)
     return book
 
 
+async def insert_book_batch(batch: list[tuple], session: AsyncSession) -> int:
+    """write a batch of book records in one statement and commit. Uses asyncpg COPY on
+    postgres and a multi-row INSERT on other dialects e.g. sqlite for tests
+
+    Args:
+        batch (list[tuple]): records in BOOK_BULK_COLUMNS order
+        session (AsyncSession): SQLModel async scoped session object
+
+    Returns:
+        int: rows written
+    """
+    conn = await session.connection()
+    if conn.dialect.name == "postgresql":
+        raw_conn = await conn.get_raw_connection()
+        await raw_conn.driver_connection.copy_records_to_table(
+            Book.__tablename__, records=batch, columns=BOOK_BULK_COLUMNS
+        )
+    else:
+        await session.exec(
+            insert(Book).values([dict(zip(BOOK_BULK_COLUMNS, rec)) for rec in batch])
+        )
+    await session.commit()
+    await response_cache.invalidate(BOOKS)
+    return len(batch)
+
+
+async def bulk_add_books(
+    rows: AsyncIterable[tuple[int, dict | bytes]], session: AsyncSession
+) -> BulkInsertResponse:
+    """validate rows against BookPayload and insert the valid ones in batches of
+    BULK_BATCH_SIZE. Invalid rows are reported without aborting the rest
+
+    Args:
+        rows (AsyncIterable[tuple[int, dict | bytes]]): row index and either a decoded
+            JSON object or a raw NDJSON line
+        session (AsyncSession): SQLModel async scoped session object
+
+    Returns:
+        BulkInsertResponse: inserted row count and per row validation errors
+    """
+    inserted = 0
+    errors = []
+    batch = []
+    async for index, row in rows:
+        try:
+            if isinstance(row, (bytes, str)):
+                payload = BookPayload.model_validate_json(row)
+            else:
+                payload = BookPayload.model_validate(row)
+        except ValidationError as error:
+            errors.append(
+                BulkRowError(
+                    index=index,
+                    detail=error.errors(include_url=False, include_context=False),
+                )
+            )
+            continue
+
+        batch.append(
+            (
+                uuid.uuid4(),
+                payload.title,
+                payload.isbn,
+                payload.genre,
+                payload.condition,
+                gen_utcnow(),
+            )
+        )
+        if len(batch) >= BULK_BATCH_SIZE:
+            inserted += await insert_book_batch(batch, session)
+            batch = []
+
+    if batch:
+        inserted += await insert_book_batch(batch, session)
+
+    logger.debug("bulk insert %s rows with %s errors", inserted, len(errors))
+    return BulkInsertResponse(inserted=inserted, errors=errors)
+
+
 async def edit_book(book_id: uuid, payload: BookPayload, session: AsyncSession):
     """update book by id
 
@@ -159,6 +302,7 @@ async def edit_book(book_id: uuid, payload: BookPayload, session: AsyncSession):
 
         session.add(book)
         await session.commit()
+        await response_cache.invalidate(BOOKS)
         await session.refresh(book)
 
         return book
@@ -190,6 +334,59 @@ async def all_books(
     return response
 
 
+async def all_books_cursor(
+    session: AsyncSession, cursor: str | None, limit: int
+) -> CursorPaginationResponse:
+    """keyset paginated query for all books ordered by (create_datetimestamp, book_id).
+    Seeks past the last row of the previous page so the cost does not grow with page depth
+
+    Args:
+        session (AsyncSession): SQLModel async scoped session object
+        cursor (str | None): next_cursor from the previous page or None for the first page
+        limit (int): page size
+
+    Raises:
+        InvalidCursorException: malformed cursor
+
+    Returns:
+        CursorPaginationResponse: page of Book objects and cursor for the next page
+    """
+    query = select(Book).order_by(desc(Book.create_datetimestamp), desc(Book.book_id))
+    if cursor:
+        last_dts, last_id = decode_cursor(cursor, datetime, uuid.UUID)
+        query = query.where(
+            tuple_(Book.create_datetimestamp, Book.book_id) < tuple_(last_dts, last_id)
+        )
+
+    # fetch one extra row to know if there is a next page
+    results = await session.exec(query.limit(limit + 1))
+    rows = list(results.all())
+
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].create_datetimestamp, rows[-1].book_id)
+
+    return CursorPaginationResponse(rows=rows, next_cursor=next_cursor)
+
+
+def date_filter_query(date_param: datetime, compare: str):
+    """build select for books filtered by date
+
+    Args:
+        date_param (datetime): Datetime object to filter by
+        compare (str): comparisson string 'gt' or 'lt'
+
+    Returns:
+        Select: book select statement
+    """
+    if compare == "gt":
+        date_filter = Book.create_datetimestamp > date_param
+    else:
+        date_filter = Book.create_datetimestamp < date_param
+    return select(Book).where(date_filter).order_by(desc(Book.create_datetimestamp))
+
+
 async def date_filter_books(date_param: datetime, compare: str, session: AsyncSession):
     """Filter render stats by date
 
@@ -201,91 +398,317 @@ async def date_filter_books(date_param: datetime, compare: str, session: AsyncSe
     Returns:
         List[Book]: List of render stat objects
     """
-    if compare == "gt":
-        results = await session.exec(
-            select(Book)
-            .where(Book.create_datetimestamp > date_param)
-            .order_by(desc(Book.create_datetimestamp))
-        )
-    else:
-        results = await session.exec(
-            select(Book)
-            .where(Book.create_datetimestamp < date_param)
-            .order_by(desc(Book.create_datetimestamp))
-        )
+    results = await session.exec(date_filter_query(date_param, compare))
     return results.all()
 
 
-async def filter_books(filter_param: str, session: AsyncSession):
+def filter_query(
+    filter_param: dict, limit: int | None = None, cursor: str | None = None
+):
+    """build cached select for books filtered by any and all fields
+
+    Args:
+        filter_param (dict): Dictionary of columns and value to search on
+        limit (int | None): page size, enables keyset ordering
+        cursor (str | None): next_cursor from the previous page
+
+    Raises:
+        InvalidFilterException: value does not match the column type
+        InvalidCursorException: malformed cursor
+
+    Returns:
+        tuple[Select, dict]: book select statement and bind parameters
+    """
+    return book_filter.compile(filter_param, limit, cursor)
+
+
+async def filter_books(
+    filter_param: dict,
+    session: AsyncSession,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> list[Book] | CursorPaginationResponse:
     """Filter render stats by any and all fields
 
     Args:
-        filter_param (str): _description_
-        session (AsyncSession): _description_
+        filter_param (dict): Dictionary of columns and value to search on
+        session (AsyncSession): SQLModel async scoped session object
+        limit (int | None): page size. When set the response is keyset paginated
+        cursor (str | None): next_cursor from the previous page
 
     Returns:
-        List[Book]: List of render stat objects
+        List[Book] | CursorPaginationResponse: List of Book objects or a page of them
     """
-    results = await session.exec(
-        select(Book).filter(and_(*build_query(Book, filter_param)))
+    query, params = filter_query(filter_param, limit, cursor)
+    results = await session.exec(query, params=params)
+    if limit is None:
+        return results.all()
+
+    rows, next_cursor = book_filter.next_cursor(list(results.all()), limit)
+    return CursorPaginationResponse(rows=rows, next_cursor=next_cursor)
+
+
+async def stream_books(
+    query, fmt: ExportFormat, session: AsyncSession, params: dict | None = None
+) -> AsyncIterator[str]:
+    """Stream books matching query through a server side cursor serialized as NDJSON
+    or CSV. Only one batch of EXPORT_BATCH_SIZE rows is held in memory at a time.
+
+    Args:
+        query (Select): book select statement
+        fmt (ExportFormat): output format
+        session (AsyncSession): SQLModel async session object. Passed in directly since
+            the response body is iterated outside the request task scope
+        params (dict | None): bind parameters for query
+
+    Yields:
+        str: serialized chunk of rows
+    """
+    result = await session.stream_scalars(
+        query.execution_options(yield_per=EXPORT_BATCH_SIZE), params=params
     )
-    return results.all()
+    try:
+        if fmt == ExportFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(BOOK_EXPORT_FIELDS)
+            yield buffer.getvalue()
+
+        async for partition in result.partitions():
+            if fmt == ExportFormat.CSV:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [getattr(book, field) for field in BOOK_EXPORT_FIELDS]
+                    for book in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(book.model_dump_json() + "\n" for book in partition)
+    finally:
+        await result.close()
+
+
+def recent_heroes_query(dialect: str):
+    """select of every team with its most recently created hero, ordered by team name.
+    Postgres probes the hero (team_id, create_datetimestamp DESC) index once per team
+    through a LATERAL join, other dialects rank heroes with a row_number window
 
+    Args:
+        dialect (str): session dialect name
 
-async def search_recent_team_member(session: AsyncSession):
+    Returns:
+        Select: (Team, Hero) select statement
     """
-    https://medium.com/@umair.qau586/sqlalchemy-seriespart-3-mastering-sqlalchemy-queries-and-aggregation-597befb46b09
+    newest_first = (desc(Hero.create_datetimestamp), desc(Hero.hid))
+    if dialect == "postgresql":
+        latest = (
+            select(Hero)
+            .where(Hero.team_id == Team.tid)
+            .order_by(*newest_first)
+            .limit(1)
+            .lateral("latest_hero")
+        )
+        hero = aliased(Hero, latest)
+        return select(Team, hero).join(latest, true()).order_by(Team.name, Team.tid)
+
+    ranked = select(
+        Hero,
+        func.row_number()
+        .over(partition_by=Hero.team_id, order_by=newest_first)
+        .label("rank"),
+    ).subquery("ranked_hero")
+    hero = aliased(Hero, ranked)
+    return (
+        select(Team, hero)
+        .join(ranked, ranked.c.team_id == Team.tid)
+        .where(ranked.c.rank == 1)
+        .order_by(Team.name, Team.tid)
+    )
+
+
+async def search_recent_team_member(session: AsyncSession) -> dict[str, Hero]:
+    """most recently created hero of every team in one query. Teams without heroes
+    are left out
 
     Args:
-        session (AsyncSession): _description_
+        session (AsyncSession): SQLModel async scoped session object
 
     Returns:
-        _type_: _description_
+        dict[str, Hero]: team name to its latest hero, in team name order
+    """
+    conn = await session.connection()
+    result = await session.exec(recent_heroes_query(conn.dialect.name))
+    return {team.name: hero for team, hero in result.all()}
+
+
+def nested(path: list[str], value) -> dict:
+    """document holding value at path e.g. ["a", "b"], 1 -> {"a": {"b": 1}}"""
+    for key in reversed(path):
+        value = {key: value}
+    return value
+
+
+def json_path(path: list[str]) -> str:
+    """sqlite JSON path of keys, each key quoted e.g. ["a", "b"] -> $."a"."b" """
+    return "$" + "".join(f'."{key}"' for key in path)
+
+
+def leaves(doc: dict, path: tuple = ()):
+    """(path, value) of every non object value in doc, empty objects included"""
+    for key, value in doc.items():
+        if isinstance(value, dict) and value:
+            yield from leaves(value, (*path, key))
+        else:
+            yield [*path, key], value
+
+
+def sqlite_path_equals(path: list[str], value):
+    """json_extract equality, objects and arrays are compared as minified JSON"""
+    pointer = json_path(path)
+    if value is None:
+        return func.json_type(Hero.powers, pointer) == "null"
+    if isinstance(value, (dict, list)):
+        return func.json_extract(Hero.powers, pointer) == func.json(json.dumps(value))
+    return func.json_extract(Hero.powers, pointer) == value
+
+
+def powers_filters(dialect: str, payload: HeroSearchPayload) -> list:
+    """where clauses for the powers predicates of a hero search.
+
+    Postgres uses @> for containment and path equality so the jsonb_path_ops GIN
+    index applies, path equality is rechecked with #> since @> also matches arrays
+    holding the value. Key existence uses ?& which the index does not cover.
+    sqlite has no containment operator, documents are split into json_extract path
+    equalities and arrays must match whole
     """
+    clauses = []
+    if dialect == "postgresql":
+        if payload.contains:
+            clauses.append(Hero.powers.contains(payload.contains))
+        if payload.has_keys:
+            clauses.append(Hero.powers.has_all(array(payload.has_keys)))
+        for equals in payload.path_equals or []:
+            clauses.append(Hero.powers.contains(nested(equals.path, equals.value)))
+            clauses.append(
+                Hero.powers[tuple(equals.path)] == type_coerce(equals.value, JSONB)
+            )
+        return clauses
+
+    for path, value in leaves(payload.contains or {}):
+        clauses.append(sqlite_path_equals(path, value))
+    for key in payload.has_keys or []:
+        clauses.append(func.json_type(Hero.powers, json_path([key])).is_not(None))
+    for equals in payload.path_equals or []:
+        clauses.append(sqlite_path_equals(equals.path, equals.value))
+    return clauses
+
+
+async def search_heroes(
+    session: AsyncSession, payload: HeroSearchPayload
+) -> CursorPaginationResponse:
+    """keyset paginated hero search on powers, level and team_id ordered by
+    (create_datetimestamp, hid) newest first
 
-    sub = await session.scalars(
-        select(
-            Team.name,
-            func.rank().over(
-                order_by=desc(Hero.create_datetimestamp), partition_by=Team.name
-            ),
+    Args:
+        session (AsyncSession): SQLModel async scoped session object
+        payload (HeroSearchPayload): predicates, page size and cursor
+
+    Raises:
+        InvalidCursorException: malformed cursor
+
+    Returns:
+        CursorPaginationResponse: page of Hero objects and cursor for the next page
+    """
+    conn = await session.connection()
+    query = select(Hero).where(*powers_filters(conn.dialect.name, payload))
+    if payload.level is not None:
+        query = query.where(Hero.level == payload.level)
+    if payload.team_id is not None:
+        query = query.where(Hero.team_id == payload.team_id)
+    if payload.cursor:
+        last_dts, last_id = decode_cursor(payload.cursor, datetime, uuid.UUID)
+        query = query.where(
+            tuple_(Hero.create_datetimestamp, Hero.hid) < tuple_(last_dts, last_id)
         )
-        .select_from(Team)
-        .label("rank")
-    ).subquery()
 
-    result = await session.scalars(select(sub).filter(sub.c.rank == 1))
-    resp = []
-    logger.info(result)
-    for hero, team in result:
-        logger.info("Hero:", hero, "Team:", team)
-        resp[team] = hero
-    return resp
+    # fetch one extra row to know if there is a next page
+    query = query.order_by(desc(Hero.create_datetimestamp), desc(Hero.hid))
+    results = await session.exec(query.limit(payload.limit + 1))
+    rows = list(results.all())
+
+    next_cursor = None
+    if len(rows) > payload.limit:
+        rows = rows[: payload.limit]
+        next_cursor = encode_cursor(rows[-1].create_datetimestamp, rows[-1].hid)
+
+    return CursorPaginationResponse(rows=rows, next_cursor=next_cursor)
 
 
 async def insert_team(payload: TeamPayload, session: AsyncSession) -> Team:
-    """insert render stat row
+    """insert team and cache its id by name
 
     Args:
         payload (TeamPayload): payload from endpoint
         session (AsyncSession): SQLModel async scoped session object
+
+    Raises:
+        TeamExistsException: team name already taken
     """
     team = Team(name=payload.name, headquarters=payload.headquarters)
     session.add(team)
-    await session.commit()
-    return Team
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise TeamExistsException(f"team {payload.name} already exists")
+    team_ids.put(team.name, team.tid)
+    return team
+
+
+async def resolve_team_id(name: str, session: AsyncSession) -> uuid.UUID:
+    """team id by name, served from team_ids when cached. Names are unique and teams
+    are never renamed, so a cached id stays valid; misses are not cached
+
+    Args:
+        name (str): team name
+        session (AsyncSession): SQLModel async scoped session object
+
+    Raises:
+        TeamNotFoundException: no team with that name
+
+    Returns:
+        uuid.UUID: team id
+    """
+    tid = team_ids.get(name)
+    if tid is not None:
+        return tid
+
+    results = await session.exec(select(Team.tid).where(Team.name == name))
+    tid = results.one_or_none()
+    if tid is None:
+        raise TeamNotFoundException(f"team {name} not found")
+    team_ids.put(name, tid)
+    return tid
 
 
 async def insert_hero(payload: HeroPayload, team: str, session: AsyncSession) -> Hero:
-    """insert render stat row
+    """insert hero into the team with the given name
 
     Args:
         payload (HeroPayload): payload from endpoint
+        team (str): team name
         session (AsyncSession): SQLModel async scoped session object
+
+    Raises:
+        TeamNotFoundException: no team with that name
     """
-    resp = await session.scalars(select(Team).where(Team.name == team))
-    tt = resp.one_or_none()
-    hero = Hero(name=payload.name, secret_name=payload.secret_name, team_id=tt.tid)
+    hero = Hero(
+        name=payload.name,
+        secret_name=payload.secret_name,
+        level=payload.level,
+        team_id=await resolve_team_id(team, session),
+    )
     session.add(hero)
     await session.commit()
     return hero
@@ -315,3 +738,120 @@ async def insert_team_bundle(
     session.add(hero)
     await session.commit()
     return team, hero
+
+
+def roster_chunk_size(model: type[SQLModel]) -> int:
+    """rows per multi-row INSERT of model, ROSTER_BATCH_SIZE capped so one statement
+    never binds more than MAX_BIND_PARAMS parameters
+
+    Args:
+        model (type[SQLModel]): Team or Hero
+
+    Returns:
+        int: chunk size
+    """
+    columns = len(model.__table__.columns)
+    return max(1, min(ROSTER_BATCH_SIZE, MAX_BIND_PARAMS // columns))
+
+
+async def insert_roster_chunk(
+    teams: list[dict], heroes: list[dict], session: AsyncSession
+):
+    """write a chunk of teams and their heroes with one multi-row INSERT each. Team
+    ids are generated client side so heroes reference them without a flush
+
+    Args:
+        teams (list[dict]): team rows
+        heroes (list[dict]): hero rows of those or earlier teams
+        session (AsyncSession): SQLModel async scoped session object
+    """
+    if teams:
+        await session.exec(insert(Team).values(teams))
+    if heroes:
+        await session.exec(insert(Hero).values(heroes))
+
+
+async def write_roster(
+    payload: RosterImportPayload, session: AsyncSession
+) -> list[RosterTeamResult]:
+    """insert nested teams and heroes in chunks of at most roster_chunk_size teams or
+    heroes without committing
+
+    Args:
+        payload (RosterImportPayload): teams with their heroes
+        session (AsyncSession): SQLModel async scoped session object
+
+    Returns:
+        list[RosterTeamResult]: team id and hero count per team in payload order
+    """
+    results = []
+    team_chunk, hero_chunk = roster_chunk_size(Team), roster_chunk_size(Hero)
+    teams, heroes = [], []
+    for team_payload in payload.teams:
+        tid = uuid.uuid4()
+        teams.append(
+            {
+                "tid": tid,
+                "name": team_payload.name,
+                "headquarters": team_payload.headquarters,
+                "create_datetimestamp": gen_utcnow(),
+            }
+        )
+        for hero_payload in team_payload.heroes:
+            heroes.append(
+                {
+                    "hid": uuid.uuid4(),
+                    "name": hero_payload.name,
+                    "secret_name": hero_payload.secret_name,
+                    "level": hero_payload.level,
+                    "powers": hero_payload.powers,
+                    "team_id": tid,
+                    "create_datetimestamp": gen_utcnow(),
+                }
+            )
+            # a chunk may end mid team, its team row is already in this chunk
+            if len(heroes) >= hero_chunk:
+                await insert_roster_chunk(teams, heroes, session)
+                teams, heroes = [], []
+        if len(teams) >= team_chunk:
+            await insert_roster_chunk(teams, heroes, session)
+            teams, heroes = [], []
+
+        results.append(
+            RosterTeamResult(
+                tid=tid, name=team_payload.name, heroes=len(team_payload.heroes)
+            )
+        )
+
+    await insert_roster_chunk(teams, heroes, session)
+    return results
+
+
+async def import_roster(
+    payload: RosterImportPayload, session: AsyncSession
+) -> RosterImportResponse:
+    """insert nested teams and heroes in one transaction so the import is all or
+    nothing, then cache the new team ids by name
+
+    Args:
+        payload (RosterImportPayload): teams with their heroes
+        session (AsyncSession): SQLModel async scoped session object
+
+    Raises:
+        TeamExistsException: a team name is taken or repeated in the payload
+
+    Returns:
+        RosterImportResponse: team id and hero count per team in payload order
+    """
+    try:
+        results = await write_roster(payload, session)
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise TeamExistsException("roster team name already exists")
+
+    for result in results:
+        team_ids.put(result.name, result.tid)
+    total = sum(result.heroes for result in results)
+    logger.debug("imported %s teams with %s heroes", len(results), total)
+    return RosterImportResponse(teams=results, heroes=total)
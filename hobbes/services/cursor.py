@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+import logging
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursorException(Exception):
+    """raised when a pagination cursor can not be decoded"""
+
+
+def encode_cursor(*values) -> str:
+    """encode keyset values of the last row on a page into an opaque cursor string
+
+    Args:
+        values: datetime, uuid or str values in sort key order
+
+    Returns:
+        str: url safe cursor
+    """
+    parts = []
+    for val in values:
+        if isinstance(val, datetime):
+            parts.append(val.isoformat())
+        else:
+            parts.append(str(val))
+    raw = json.dumps(parts, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """decode cursor string back into keyset values
+
+    Args:
+        cursor (str): cursor created by encode_cursor
+        types: expected type per value e.g. datetime, uuid.UUID, str
+
+    Raises:
+        InvalidCursorException: malformed or tampered cursor
+
+    Returns:
+        tuple: typed keyset values
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(parts, list) or len(parts) != len(types):
+            raise ValueError("cursor length mismatch")
+
+        values = []
+        for val_type, val in zip(types, parts):
+            if val_type is datetime:
+                values.append(datetime.fromisoformat(val))
+            elif val_type is uuid.UUID:
+                values.append(uuid.UUID(val))
+            else:
+                values.append(val_type(val))
+        return tuple(values)
+
+    except (ValueError, TypeError, binascii.Error) as error:
+        logger.debug("invalid cursor %s: %s", cursor, error)
+        raise InvalidCursorException(f"invalid cursor {cursor}")
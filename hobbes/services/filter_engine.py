@@ -0,0 +1,331 @@
+"""
+Compiled filter engine for the dynamic search payloads.
+
+Filter values use an operator mini-language which is parsed once into a small AST.
+The SQL statement is built from the shape of the AST (fields and operators, not
+values) and cached, so repeated searches with the same shape only bind new values.
+
+    "1"          equal to
+    "!1"         not equal to
+    "<1" ">1"    less than, greater than
+    "<=1" ">=1"  less than or equal to, greater than or equal to
+    "a,b"        between
+    "[a,b,c]"    in list
+    "abc*"       starts with
+    "a|>b"       OR of terms on the same field
+
+Cross field OR groups are passed as a list of filters under the any_of key.
+"""
+
+import enum
+import logging
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Type
+
+from sqlalchemy import bindparam, tuple_, types
+from sqlalchemy.orm import class_mapper
+from sqlmodel import SQLModel, and_, desc, or_, select
+
+from hobbes.services.cursor import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# any_of key for cross field OR groups
+ANY_OF = "any_of"
+
+# operator prefix of a single term
+_OPERATOR_RE = re.compile(r"^(>=|<=|!|>|<)?(.*)$", re.DOTALL)
+_OR_SEPARATOR = "|"
+_LIKE_ESCAPE_RE = re.compile(r"([\\%_])")
+
+
+class InvalidFilterException(Exception):
+    """raised when a filter value can not be parsed or cast to the column type"""
+
+
+class Op(str, enum.Enum):
+    """Filter operators"""
+
+    EQ = "eq"
+    NE = "ne"
+    GT = "gt"
+    LT = "lt"
+    GE = "ge"
+    LE = "le"
+    BETWEEN = "between"
+    IN = "in"
+    PREFIX = "prefix"
+
+
+_PREFIX_OPS = {
+    "!": Op.NE,
+    ">": Op.GT,
+    "<": Op.LT,
+    ">=": Op.GE,
+    "<=": Op.LE,
+}
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """single field comparison"""
+
+    field: str
+    op: Op
+    values: tuple
+
+    @property
+    def shape(self):
+        return ("pred", self.field, self.op)
+
+
+@dataclass(frozen=True)
+class Group:
+    """AND or OR of child nodes"""
+
+    conjunction: str
+    children: tuple
+
+    @property
+    def shape(self):
+        return (self.conjunction, tuple(child.shape for child in self.children))
+
+
+@lru_cache(maxsize=4096)
+def parse_term(raw: str) -> tuple[Op, tuple[str, ...]]:
+    """parse one operator term into operator and raw string values
+
+    Args:
+        raw (str): term e.g. ">=2020-01-01T00:00:00Z"
+
+    Returns:
+        tuple[Op, tuple[str, ...]]: operator and values
+    """
+    if raw.startswith("[") and raw.endswith("]"):
+        return Op.IN, tuple(val.strip() for val in raw[1:-1].split(",") if val.strip())
+
+    prefix, val = _OPERATOR_RE.match(raw).groups()
+    if prefix:
+        return _PREFIX_OPS[prefix], (val,)
+
+    if "," in val:
+        low, high = val.split(",", 1)
+        return Op.BETWEEN, (low, high)
+
+    if val.endswith("*"):
+        return Op.PREFIX, (val[:-1],)
+
+    return Op.EQ, (val,)
+
+
+def _python_type(column):
+    """resolve the python type values are cast to for a column
+
+    Args:
+        column (Column): table column
+
+    Returns:
+        type: datetime, int, UUID or str
+    """
+    if isinstance(column.type, types.DateTime):
+        return datetime
+    if isinstance(column.type, types.Integer):
+        return int
+    if isinstance(column.type, types.Uuid):
+        return uuid.UUID
+    return str
+
+
+class FilterEngine:
+    """Parses filter payloads for a model and caches one statement per filter shape
+
+    Args:
+        model (Type[SQLModel]): SQLModel table class
+        keyset (tuple[str, ...]): column names used for ordering and cursor pagination
+        cache_size (int): max number of cached statement shapes
+    """
+
+    def __init__(self, model: Type[SQLModel], keyset: tuple[str, ...], cache_size=256):
+        self.model = model
+        mapper = class_mapper(model)
+        self.columns = {col.key: col for col in mapper.columns}
+        self.python_types = {
+            key: _python_type(col) for key, col in self.columns.items()
+        }
+        self.converters = {
+            key: datetime.fromisoformat if val_type is datetime else val_type
+            for key, val_type in self.python_types.items()
+        }
+        self.keyset = keyset
+        self.keyset_types = tuple(self.python_types[key] for key in keyset)
+        self.statement = lru_cache(maxsize=cache_size)(self._statement)
+
+    def parse(self, filter_by: dict) -> Group:
+        """parse filter payload into an AST. Unknown fields are ignored
+
+        Args:
+            filter_by (dict): column name to operator term, plus optional any_of list
+
+        Raises:
+            InvalidFilterException: value can not be cast to the column type
+
+        Returns:
+            Group: AND group of predicates
+        """
+        children = []
+        for field, raw in filter_by.items():
+            if field == ANY_OF:
+                alternatives = tuple(self.parse(sub) for sub in raw or [])
+                if alternatives:
+                    children.append(Group("or", alternatives))
+                continue
+
+            if field not in self.columns:
+                continue
+
+            terms = []
+            for term in "{}".format(raw).split(_OR_SEPARATOR):
+                op, values = parse_term(term)
+                terms.append(Predicate(field, op, self._cast(field, op, values)))
+            children.append(terms[0] if len(terms) == 1 else Group("or", tuple(terms)))
+
+        return Group("and", tuple(children))
+
+    def _cast(self, field: str, op: Op, values: tuple) -> tuple:
+        if op == Op.PREFIX:
+            if self.python_types[field] is not str:
+                raise InvalidFilterException(f"prefix match not supported on {field}")
+            return (_LIKE_ESCAPE_RE.sub(r"\\\1", values[0]) + "%",)
+
+        convert = self.converters[field]
+        try:
+            return tuple(convert(val) for val in values)
+        except ValueError as error:
+            raise InvalidFilterException(f"invalid value for {field}: {error}")
+
+    def _predicate_clause(self, pred_shape, names):
+        _, field, op = pred_shape
+        column = self.columns[field]
+
+        def param(expanding=False):
+            name = f"p{len(names)}"
+            names.append(name)
+            return bindparam(name, type_=column.type, expanding=expanding)
+
+        if op == Op.IN:
+            return column.in_(param(expanding=True))
+        if op == Op.BETWEEN:
+            return column.between(param(), param())
+        if op == Op.PREFIX:
+            return column.like(param(), escape="\\")
+        if op == Op.NE:
+            return column != param()
+        if op == Op.GT:
+            return column > param()
+        if op == Op.LT:
+            return column < param()
+        if op == Op.GE:
+            return column >= param()
+        if op == Op.LE:
+            return column <= param()
+        return column == param()
+
+    def _clause(self, shape, names):
+        if shape[0] == "pred":
+            return self._predicate_clause(shape, names)
+
+        conjunction, children = shape
+        clauses = [self._clause(child, names) for child in children]
+        if conjunction == "or":
+            return or_(*clauses)
+        return and_(*clauses)
+
+    def _statement(self, shape, paginated: bool, has_cursor: bool):
+        """build select for a filter shape. Wrapped in an lru cache per instance
+
+        Returns:
+            tuple[Select, tuple[str, ...]]: statement and bind parameter names in AST order
+        """
+        names = []
+        query = select(self.model)
+        if shape[1]:
+            query = query.where(self._clause(shape, names))
+
+        if paginated:
+            keyset_cols = [self.columns[key] for key in self.keyset]
+            if has_cursor:
+                query = query.where(
+                    tuple_(*keyset_cols)
+                    < tuple_(
+                        *(
+                            bindparam(f"cursor_{key}", type_=self.columns[key].type)
+                            for key in self.keyset
+                        )
+                    )
+                )
+            query = query.order_by(*(desc(col) for col in keyset_cols)).limit(
+                bindparam("limit", type_=types.Integer)
+            )
+        return query, tuple(names)
+
+    def _values(self, node, values):
+        if isinstance(node, Predicate):
+            if node.op == Op.IN:
+                values.append(list(node.values))
+            else:
+                values.extend(node.values)
+        else:
+            for child in node.children:
+                self._values(child, values)
+        return values
+
+    def compile(
+        self, filter_by: dict, limit: int | None = None, cursor: str | None = None
+    ):
+        """parse filter payload and return the cached statement and its bind values
+
+        Args:
+            filter_by (dict): filter payload
+            limit (int | None): page size. Enables keyset ordering when set
+            cursor (str | None): next_cursor from previous page
+
+        Raises:
+            InvalidFilterException: bad filter value
+            InvalidCursorException: bad cursor
+
+        Returns:
+            tuple[Select, dict]: statement and bind parameter values
+        """
+        tree = self.parse(filter_by)
+        paginated = limit is not None
+        query, names = self.statement(tree.shape, paginated, bool(cursor))
+        params = dict(zip(names, self._values(tree, [])))
+
+        if paginated:
+            # fetch one extra row to know if there is a next page
+            params["limit"] = limit + 1
+            if cursor:
+                last = decode_cursor(cursor, *self.keyset_types)
+                params.update(
+                    {f"cursor_{key}": val for key, val in zip(self.keyset, last)}
+                )
+        return query, params
+
+    def next_cursor(self, rows: list, limit: int) -> tuple[list, str | None]:
+        """trim the look ahead row and build the cursor for the next page
+
+        Args:
+            rows (list): rows fetched with limit + 1
+            limit (int): page size
+
+        Returns:
+            tuple[list, str | None]: page rows and next cursor
+        """
+        if limit > 0 and len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(*(getattr(rows[-1], key) for key in self.keyset))
+        return rows, None
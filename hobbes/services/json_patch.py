@@ -0,0 +1,107 @@
+"""
+Minimal RFC 6902 JSON Patch support for profile version deltas.
+
+make_patch diffs objects key by key and emits add, remove and replace operations.
+Arrays and scalars that differ are replaced whole, which keeps patches valid JSON
+Patch documents while avoiding an array diff.
+"""
+
+import copy
+
+
+class InvalidPatchException(Exception):
+    """raised when a patch does not apply to the document"""
+
+
+def escape_token(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def unescape_token(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def same(left, right) -> bool:
+    """JSON equality, unlike == it tells 1, 1.0 and True apart"""
+    if type(left) is not type(right):
+        return False
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(
+            same(value, right[key]) for key, value in left.items()
+        )
+    if isinstance(left, list):
+        return len(left) == len(right) and all(map(same, left, right))
+    return left == right
+
+
+def make_patch(src, dst, path: str = "") -> list[dict]:
+    """operations turning src into dst
+
+    Args:
+        src: source JSON document
+        dst: target JSON document
+        path (str): JSON pointer of src and dst inside the root document
+
+    Returns:
+        list[dict]: JSON Patch operations, empty when the documents are equal
+    """
+    if not (isinstance(src, dict) and isinstance(dst, dict)):
+        if same(src, dst):
+            return []
+        return [{"op": "replace", "path": path, "value": dst}]
+
+    ops = []
+    for key, value in src.items():
+        pointer = f"{path}/{escape_token(key)}"
+        if key not in dst:
+            ops.append({"op": "remove", "path": pointer})
+        else:
+            ops.extend(make_patch(value, dst[key], pointer))
+    for key, value in dst.items():
+        if key not in src:
+            ops.append(
+                {"op": "add", "path": f"{path}/{escape_token(key)}", "value": value}
+            )
+    return ops
+
+
+def apply_patch(doc, patch: list[dict]):
+    """apply operations produced by make_patch. The document is modified in place so
+    callers replaying a chain of patches copy the base once
+
+    Args:
+        doc: JSON document, modified in place
+        patch (list[dict]): JSON Patch operations
+
+    Raises:
+        InvalidPatchException: path missing or unsupported operation
+
+    Returns:
+        the patched document, a new object when the root is replaced
+    """
+    for op in patch:
+        path = op["path"]
+        if path == "":
+            if op["op"] != "replace":
+                raise InvalidPatchException(f"unsupported root operation {op['op']}")
+            doc = copy.deepcopy(op["value"])
+            continue
+
+        *parents, last = [unescape_token(token) for token in path[1:].split("/")]
+        target = doc
+        try:
+            for token in parents:
+                target = target[int(token) if isinstance(target, list) else token]
+            if not isinstance(target, dict):
+                raise InvalidPatchException(f"path {path} is not an object member")
+            if op["op"] == "remove":
+                del target[last]
+            elif op["op"] in ("add", "replace"):
+                if op["op"] == "replace" and last not in target:
+                    raise InvalidPatchException(f"path {path} not found")
+                target[last] = copy.deepcopy(op["value"])
+            else:
+                raise InvalidPatchException(f"unsupported operation {op['op']}")
+        except (KeyError, IndexError, ValueError, TypeError) as error:
+            raise InvalidPatchException(f"path {path} not found") from error
+    return doc
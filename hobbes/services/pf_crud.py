@@ -1,24 +1,38 @@
 import logging
+import os
 import uuid
+from datetime import timedelta
 from typing import Type
 
 from pydantic import AwareDatetime
+from sqlalchemy import delete
 from sqlmodel import SQLModel, and_, desc, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from hobbes.routers.auth import TokenData
-from hobbes.models.artifiacts_model import (
+from hobbes.core.service_iam import TokenData
+from hobbes.models.artifact_models import (
     ProfileCreatePayload,
     ProfileCreateVersionPayload,
     ProfileResponse,
     Profiles,
     ProfilesPaginationResponse,
+    ProfilesSearchPaginationResponse,
     ProfilesSearchResponse,
     ProfileVersions,
+    gen_utcnow,
 )
+from hobbes.services.cache import PROFILES, response_cache
+from hobbes.services.cursor import decode_cursor, encode_cursor
+from hobbes.services.json_patch import make_patch
+from hobbes.services.profile_timeline import as_utc, profile_timelines, replay
 
 logger = logging.getLogger(__name__)
 
+# "full" stores every version whole, "delta" stores JSON Patch deltas between versions
+# with a full snapshot every PROFILE_SNAPSHOT_INTERVAL versions
+PROFILE_STORAGE_MODE = os.getenv("PROFILE_STORAGE_MODE", "full")
+PROFILE_SNAPSHOT_INTERVAL = int(os.getenv("PROFILE_SNAPSHOT_INTERVAL", "32"))
+
 
 class ProfileNotFoundException(Exception):
     """crud exception when profile not found"""
@@ -57,6 +71,8 @@ async def add_profile(
     )
     session.add(pf_version)
     await session.commit()
+    await response_cache.invalidate(PROFILES)
+    profile_timelines.record(pf.prf_name, pf_version, payload.data)
 
     return ProfileResponse(
         prf_name=pf.prf_name,
@@ -65,7 +81,7 @@ async def add_profile(
         create_dts=pf_version.create_dts,
         username=pf_version.username,
         ver_id=pf_version.ver_id,
-        ver_data=pf_version.ver_data,
+        ver_data=payload.data,
     )
 
 
@@ -89,19 +105,26 @@ async def add_profile_version(
     Returns:
         UUID: profile version uuid
     """
-    result = await session.exec(
-        select(Profiles).where(Profiles.prf_name == profile_name)
-    )
+    query = select(Profiles).where(Profiles.prf_name == profile_name)
+    if PROFILE_STORAGE_MODE == "delta":
+        # serialize writers so each delta is taken against the latest version
+        query = query.with_for_update()
+    result = await session.exec(query)
     pf = result.one_or_none()
     if not pf:
         raise ProfileNotFoundException(f"profile {profile_name} not found")
 
     # create version
-    pf_version = ProfileVersions(
-        ver_data=payload.data, prf_id=pf.prf_id, username=token.username
-    )
+    if PROFILE_STORAGE_MODE == "delta":
+        pf_version = await delta_version(session, pf, payload.data, token.username)
+    else:
+        pf_version = ProfileVersions(
+            ver_data=payload.data, prf_id=pf.prf_id, username=token.username
+        )
     session.add(pf_version)
     await session.commit()
+    await response_cache.invalidate(PROFILES)
+    profile_timelines.record(pf.prf_name, pf_version, payload.data)
 
     return ProfileResponse(
         prf_name=pf.prf_name,
@@ -110,7 +133,56 @@ async def add_profile_version(
         create_dts=pf_version.create_dts,
         username=pf_version.username,
         ver_id=pf_version.ver_id,
-        ver_data=pf_version.ver_data,
+        ver_data=payload.data,
+    )
+
+
+async def delta_version(
+    session: AsyncSession, pf: Profiles, ver_data: dict, username: str
+) -> ProfileVersions:
+    """new version stored as a JSON Patch against the latest version, or as a full
+    snapshot once the chain reaches PROFILE_SNAPSHOT_INTERVAL
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        pf (Profiles): locked profile
+        ver_data (dict): full document of the new version
+        username (str): version author
+
+    Returns:
+        ProfileVersions: unsaved version row
+    """
+    result = await session.exec(
+        select(ProfileVersions.ver_id)
+        .where(ProfileVersions.prf_id == pf.prf_id)
+        .order_by(desc(ProfileVersions.create_dts), desc(ProfileVersions.ver_id))
+        .limit(1)
+    )
+    latest_id = result.first()
+    latest = await profile_timelines.version(session, latest_id) if latest_id else None
+    if latest is None:
+        return ProfileVersions(ver_data=ver_data, prf_id=pf.prf_id, username=username)
+
+    # host clocks can disagree or step back, keep versions after the latest one so
+    # as-of lookups see them in write order
+    create_dts = max(
+        gen_utcnow(), as_utc(latest.create_dts) + timedelta(microseconds=1)
+    )
+    if latest.delta_depth + 1 >= PROFILE_SNAPSHOT_INTERVAL:
+        return ProfileVersions(
+            ver_data=ver_data,
+            prf_id=pf.prf_id,
+            username=username,
+            create_dts=create_dts,
+        )
+
+    return ProfileVersions(
+        ver_delta=make_patch(latest.ver_data, ver_data),
+        delta_depth=latest.delta_depth + 1,
+        ver_base=latest.ver_id,
+        prf_id=pf.prf_id,
+        username=username,
+        create_dts=create_dts,
     )
 
 
@@ -161,16 +233,10 @@ async def fetch_profile_version(
     Returns:
         ProfileVersions: response containing most recent profile version
     """
-    result = await session.scalars(
-        select(ProfileVersions)
-        .join(Profiles)
-        .where(
-            Profiles.prf_name == profile_name, ProfileVersions.create_dts <= search_date
-        )
-        .order_by(desc(ProfileVersions.create_dts))
-        .limit(1)
-    )
-    version = result.one_or_none()
+    # bisect the cached (create_dts, ver_id) timeline instead of ORDER BY ... LIMIT 1
+    timeline = await profile_timelines.timeline(session, profile_name)
+    ver_id = timeline.as_of(search_date) if timeline else None
+    version = await profile_timelines.version(session, ver_id) if ver_id else None
     if version:
         return version
     raise ProfileNotFoundException(f"profile {profile_name} not found")
@@ -201,10 +267,11 @@ async def fetch_profile_versions(
                 ProfileVersions.prf_id == Profiles.prf_id,
             )
         )
+        .order_by(ProfileVersions.create_dts, ProfileVersions.ver_id)
     )
     rows = list(result.all())
     if len(rows) > 0:
-        return rows
+        return replay(rows)
     raise ProfileNotFoundException(f"no profile versions found for {profile_name}")
 
 
@@ -223,73 +290,206 @@ async def fetch_by_id(session: AsyncSession, model: Type[SQLModel], obj_id: uuid
     Returns:
         SQLModel: returns request SQLModel ORM object
     """
-    result = await session.get(model, obj_id)
+    if model is ProfileVersions:
+        # delta encoded versions are rebuilt and cached by the timeline index
+        result = await profile_timelines.version(session, obj_id)
+    else:
+        result = await session.get(model, obj_id)
     if result:
         return result
     raise ProfileNotFoundException(f"id {obj_id} not found")
 
 
+def like_prefix(value: str) -> str:
+    """escape LIKE wildcards in user input and append the prefix wildcard"""
+    escaped = value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"{escaped}%"
+
+
+def latest_versions_query(
+    dialect: str,
+    profile_name: str,
+    search_date: AwareDatetime,
+    after: str | None = None,
+    limit: int | None = None,
+):
+    """latest version per profile whose name starts with profile_name, as of
+    search_date, ordered by profile name. Postgres uses DISTINCT ON, other dialects a
+    row_number window
+
+    Args:
+        dialect (str): session dialect name
+        profile_name (str): case insensitive name prefix
+        search_date (AwareDatetime): as of timestamp
+        after (str | None): keyset, only names sorting after it
+        limit (int | None): page size, one extra row is fetched to detect the next page
+
+    Returns:
+        Select: (Profiles, ProfileVersions) select statement
+    """
+    conditions = [
+        # matches the lower(prf_name) text_pattern_ops index
+        func.lower(Profiles.prf_name).like(
+            like_prefix(profile_name.lower()), escape="!"
+        ),
+        ProfileVersions.create_dts <= search_date,
+    ]
+    if after is not None:
+        conditions.append(Profiles.prf_name > after)
+
+    if dialect == "postgresql":
+        query = (
+            select(Profiles, ProfileVersions)
+            .join(Profiles)
+            .where(*conditions)
+            .distinct(Profiles.prf_name)
+            .order_by(Profiles.prf_name, desc(ProfileVersions.create_dts))
+        )
+    else:
+        ranked = (
+            select(
+                ProfileVersions.ver_id,
+                func.row_number()
+                .over(
+                    partition_by=ProfileVersions.prf_id,
+                    order_by=desc(ProfileVersions.create_dts),
+                )
+                .label("rank"),
+            )
+            .join(Profiles)
+            .where(*conditions)
+            .subquery()
+        )
+        query = (
+            select(Profiles, ProfileVersions)
+            .join(Profiles)
+            .join(ranked, ranked.c.ver_id == ProfileVersions.ver_id)
+            .where(ranked.c.rank == 1)
+            .order_by(Profiles.prf_name)
+        )
+
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
 async def find_profile(
-    session: AsyncSession, profile_name: str, search_date: AwareDatetime
-) -> list[ProfilesSearchResponse]:
+    session: AsyncSession,
+    profile_name: str,
+    search_date: AwareDatetime,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> list[ProfilesSearchResponse] | ProfilesSearchPaginationResponse:
     """
-    Search for most recent version of a profile using a case insensitive profile name fragment in like query
+    Search profiles by case insensitive name prefix returning only the most recent
+    version of each profile as of search_date
 
     Args:
         session (AsyncSession): SQLModel scoped async session object
-        payload (ProfileSearchPayload): search payload
+        profile_name (str): profile name prefix
+        search_date (AwareDatetime): as of timestamp
+        limit (int | None): page size. When set the response is keyset paginated
+        cursor (str | None): next_cursor from the previous page
 
     Raises:
-        ProfileNotFoundException: profile not found
+        ProfileNotFoundException: no profile matches on the first page
+        InvalidCursorException: cursor can not be decoded
 
     Returns:
-        ProfileVersions: response containing most recent profile version
+        list[ProfilesSearchResponse] | ProfilesSearchPaginationResponse: latest version
+            per matching profile or a page of them
     """
+    after = decode_cursor(cursor, str)[0] if cursor else None
+    conn = await session.connection()
     result = await session.exec(
-        select(Profiles, ProfileVersions)
-        .join(Profiles)
-        .where(Profiles.prf_name.ilike(f"{profile_name}%"), ProfileVersions.create_dts <= search_date)  # type: ignore
-        .order_by(desc(ProfileVersions.create_dts))
+        latest_versions_query(
+            conn.dialect.name, profile_name, search_date, after, limit
+        )
     )
-
-    rows = result.fetchall()
-    if len(rows) > 0:
-        resp = []
-        for prof, prof_version in rows:
-            resp.append(
-                ProfilesSearchResponse(
-                    prf_name=prof.prf_name, prf_id=prof.prf_id, version=prof_version
-                )
+    rows = []
+    for prof, prof_version in result.all():
+        if prof_version.delta_depth > 0:
+            prof_version = await profile_timelines.version(session, prof_version.ver_id)
+        rows.append(
+            ProfilesSearchResponse(
+                prf_name=prof.prf_name, prf_id=prof.prf_id, version=prof_version
             )
-        return resp
+        )
+    if not rows and after is None:
+        raise ProfileNotFoundException(f"no profiles found")
 
-    raise ProfileNotFoundException(f"no profiles found")
+    if limit is None:
+        return rows
 
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].prf_name)
+    return ProfilesSearchPaginationResponse(rows=rows, next_cursor=next_cursor)
 
-async def remove_profile(session: AsyncSession, profile_id: uuid.UUID) -> bool:
+
+async def delete_profile_rows(
+    session: AsyncSession, profile_ids: list[uuid.UUID]
+) -> tuple[list[uuid.UUID], list[str], list[uuid.UUID]]:
     """
-    Delete dependency
+    Delete profiles and all of their versions with one DELETE ... RETURNING per table.
+    Does not commit so callers can group it with other deletes
 
     Args:
         session (AsyncSession): SQLModel scoped async session object
-        obj_id (uuid.UUID): model id
+        profile_ids (list[uuid.UUID]): profile ids
 
     Returns:
-        bool: delete success
+        tuple[list[uuid.UUID], list[str], list[uuid.UUID]]: deleted profile ids,
+            profile names and version ids
     """
+    result = await session.exec(
+        delete(ProfileVersions)
+        .where(ProfileVersions.prf_id.in_(profile_ids))
+        .returning(ProfileVersions.ver_id)
+    )
+    ver_ids = list(result.scalars())
 
     result = await session.exec(
-        select(ProfileVersions).where(ProfileVersions.prf_id == profile_id)
+        delete(Profiles)
+        .where(Profiles.prf_id.in_(profile_ids))
+        .returning(Profiles.prf_id, Profiles.prf_name)
     )
-    if result:
-        for vers in result.all():
-            logger.debug("delete profile version %s", vers.ver_id)
-            await session.delete(vers)
-    else:
+    rows = result.all()
+    logger.debug("deleted %s profiles and %s versions", len(rows), len(ver_ids))
+    return [row.prf_id for row in rows], [row.prf_name for row in rows], ver_ids
+
+
+async def profiles_deleted(profile_names: list[str], ver_ids: list[uuid.UUID]):
+    """drop cached pages, timelines and version bodies after a committed delete
+
+    Args:
+        profile_names (list[str]): deleted profile names
+        ver_ids (list[uuid.UUID]): deleted version ids
+    """
+    await response_cache.invalidate(PROFILES)
+    profile_timelines.discard(profile_names, ver_ids)
+
+
+async def remove_profile(session: AsyncSession, profile_id: uuid.UUID) -> bool:
+    """
+    Delete profile and its versions
+
+    Args:
+        session (AsyncSession): SQLModel scoped async session object
+        profile_id (uuid.UUID): profile id
+
+    Raises:
+        IdNotFoundException: profile not found
+
+    Returns:
+        bool: delete success
+    """
+    prf_ids, names, ver_ids = await delete_profile_rows(session, [profile_id])
+    if not prf_ids:
+        await session.rollback()
         raise IdNotFoundException(f"profile id {profile_id} not found")
 
-    result = await session.exec(select(Profiles).where(Profiles.prf_id == profile_id))
-    profile = result.one_or_none()
-    await session.delete(profile)
     await session.commit()
+    await profiles_deleted(names, ver_ids)
     return True
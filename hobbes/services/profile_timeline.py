@@ -0,0 +1,371 @@
+"""
+In-memory as-of index for profile versions.
+
+Each profile name maps to its version history as a sorted list of (create_dts, ver_id),
+so an as-of lookup is a bisect instead of an ORDER BY ... LIMIT 1 query.
+Version bodies never change once written and are cached by ver_id; versions stored as
+JSON Patch deltas are rebuilt along their ver_base links from the nearest snapshot or
+cached ancestor. Timelines are updated in place by writes in this process and, after
+PROFILE_TIMELINE_TTL seconds, extended with the versions other processes wrote since the
+newest one seen instead of being loaded again in full.
+"""
+
+import copy
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import and_, desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from hobbes.models.artifact_models import Profiles, ProfileVersions
+from hobbes.services.json_patch import InvalidPatchException, apply_patch
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TIMELINE_TTL = float(os.getenv("PROFILE_TIMELINE_TTL", "5"))
+PROFILE_TIMELINE_SIZE = int(os.getenv("PROFILE_TIMELINE_SIZE", "10000"))
+PROFILE_VERSION_CACHE_SIZE = int(os.getenv("PROFILE_VERSION_CACHE_SIZE", "10000"))
+# seconds before the newest known version re-read on refresh, covers writers whose
+# clocks lag or whose transactions commit out of create_dts order
+PROFILE_TIMELINE_OVERLAP = float(os.getenv("PROFILE_TIMELINE_OVERLAP", "60"))
+
+
+def as_utc(value: datetime) -> datetime:
+    """sqlite drops the offset of timezone aware columns, treat naive values as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def detached(row: ProfileVersions, ver_data: dict) -> ProfileVersions:
+    """full copy of a delta encoded version, not attached to any session"""
+    return ProfileVersions(
+        ver_id=row.ver_id,
+        prf_id=row.prf_id,
+        username=row.username,
+        create_dts=row.create_dts,
+        ver_data=ver_data,
+        delta_depth=row.delta_depth,
+        ver_base=row.ver_base,
+    )
+
+
+def replay(rows: list[ProfileVersions]) -> list[ProfileVersions]:
+    """rebuild full versions from one profile's rows by following each delta back
+    to its base version
+
+    Args:
+        rows (list[ProfileVersions]): snapshot and delta rows, oldest first
+
+    Raises:
+        InvalidPatchException: a delta has no snapshot behind it
+
+    Returns:
+        list[ProfileVersions]: versions with full ver_data, in the order given
+    """
+    rows_by_id = {row.ver_id: row for row in rows}
+    docs = {}
+    versions = []
+    for row in rows:
+        chain = []
+        base = row
+        while base.ver_id not in docs and base.delta_depth > 0:
+            chain.append(base)
+            base = rows_by_id.get(base.ver_base)
+            if base is None:
+                raise InvalidPatchException(f"version {row.ver_id} has no snapshot")
+        doc = docs.setdefault(base.ver_id, base.ver_data)
+        for delta in reversed(chain):
+            doc = apply_patch(copy.deepcopy(doc), delta.ver_delta)
+            docs[delta.ver_id] = doc
+        versions.append(
+            row if row.delta_depth == 0 else detached(row, docs[row.ver_id])
+        )
+    return versions
+
+
+@dataclass
+class Timeline:
+    """version history of one profile in create_dts order"""
+
+    prf_id: uuid.UUID
+    loaded_at: float
+    entries: list[tuple[datetime, uuid.UUID]] = field(default_factory=list)
+
+    def as_of(self, search_date: datetime) -> uuid.UUID | None:
+        """id of the most recent version created at or before search_date"""
+        # max uuid sorts after every version sharing the same create_dts
+        index = bisect_right(
+            self.entries, (as_utc(search_date), uuid.UUID(int=(1 << 128) - 1))
+        )
+        return self.entries[index - 1][1] if index else None
+
+    def add(self, create_dts: datetime, ver_id: uuid.UUID):
+        insort(self.entries, (as_utc(create_dts), ver_id))
+
+    def merge(self, entries: list[tuple[datetime, uuid.UUID]]):
+        """add versions read on refresh, skipping the ones already known"""
+        if not entries:
+            return
+        since = min(as_utc(create_dts) for create_dts, _ in entries)
+        start = bisect_left(self.entries, (since, uuid.UUID(int=0)))
+        known = {ver_id for _, ver_id in self.entries[start:]}
+        for create_dts, ver_id in entries:
+            if ver_id not in known:
+                self.add(create_dts, ver_id)
+
+
+class ProfileTimelineIndex:
+    """bounded LRU of profile timelines plus an LRU of immutable version bodies
+
+    Args:
+        ttl (float): seconds before a timeline is refreshed from the database
+        maxsize (int): profiles kept in memory
+        versions_maxsize (int): version bodies kept in memory
+    """
+
+    def __init__(self, ttl: float, maxsize: int, versions_maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.versions_maxsize = versions_maxsize
+        self._timelines: OrderedDict[str, Timeline] = OrderedDict()
+        self._versions: OrderedDict[uuid.UUID, ProfileVersions] = OrderedDict()
+
+    async def timeline(
+        self, session: AsyncSession, profile_name: str
+    ) -> Timeline | None:
+        """cached timeline of a profile, loaded with one index scan when missing and
+        refreshed with the versions written since the newest known one when older
+        than ttl
+
+        Args:
+            session (AsyncSession): SQLModel async session object
+            profile_name (str): profile name
+
+        Returns:
+            Timeline | None: None when the profile has no versions
+        """
+        timeline = self._timelines.get(profile_name)
+        if timeline and time.monotonic() - timeline.loaded_at < self.ttl:
+            self._timelines.move_to_end(profile_name)
+            return timeline
+
+        if timeline is None:
+            timeline = await self.load(session, profile_name)
+        else:
+            timeline = await self.refresh(session, profile_name, timeline)
+        if timeline is None:
+            self._timelines.pop(profile_name, None)
+            return None
+
+        self._timelines[profile_name] = timeline
+        self._timelines.move_to_end(profile_name)
+        if len(self._timelines) > self.maxsize:
+            self._timelines.popitem(last=False)
+        return timeline
+
+    async def load(self, session: AsyncSession, profile_name: str) -> Timeline | None:
+        """full version history of a profile
+
+        Args:
+            session (AsyncSession): SQLModel async session object
+            profile_name (str): profile name
+
+        Returns:
+            Timeline | None: None when the profile has no versions
+        """
+        result = await session.exec(
+            select(Profiles.prf_id, ProfileVersions.create_dts, ProfileVersions.ver_id)
+            .join(Profiles)
+            .where(Profiles.prf_name == profile_name)
+            .order_by(ProfileVersions.create_dts, ProfileVersions.ver_id)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+        return Timeline(
+            prf_id=rows[0].prf_id,
+            loaded_at=time.monotonic(),
+            entries=[(as_utc(row.create_dts), row.ver_id) for row in rows],
+        )
+
+    async def refresh(
+        self, session: AsyncSession, profile_name: str, timeline: Timeline
+    ) -> Timeline | None:
+        """extend an expired timeline with the versions created from
+        PROFILE_TIMELINE_OVERLAP seconds before its newest entry. The profile row is
+        outer joined so a deleted or recreated profile is still noticed
+
+        Args:
+            session (AsyncSession): SQLModel async session object
+            profile_name (str): profile name
+            timeline (Timeline): expired timeline
+
+        Returns:
+            Timeline | None: None when the profile no longer exists
+        """
+        since = timeline.entries[-1][0] - timedelta(seconds=PROFILE_TIMELINE_OVERLAP)
+        result = await session.exec(
+            select(Profiles.prf_id, ProfileVersions.create_dts, ProfileVersions.ver_id)
+            .outerjoin(
+                ProfileVersions,
+                and_(
+                    ProfileVersions.prf_id == Profiles.prf_id,
+                    ProfileVersions.create_dts >= since,
+                ),
+            )
+            .where(Profiles.prf_name == profile_name)
+        )
+        rows = result.all()
+        if not rows:
+            return None
+        if rows[0].prf_id != timeline.prf_id:
+            # deleted and created again under the same name by another process
+            return await self.load(session, profile_name)
+
+        timeline.merge(
+            [(row.create_dts, row.ver_id) for row in rows if row.ver_id is not None]
+        )
+        timeline.loaded_at = time.monotonic()
+        return timeline
+
+    async def version(
+        self, session: AsyncSession, ver_id: uuid.UUID
+    ) -> ProfileVersions | None:
+        """version body by id, from memory when cached
+
+        Args:
+            session (AsyncSession): SQLModel async session object
+            ver_id (uuid.UUID): version id
+
+        Returns:
+            ProfileVersions | None: version or None when it no longer exists
+        """
+        version = self._versions.get(ver_id)
+        if version is not None:
+            self._versions.move_to_end(ver_id)
+            return version
+
+        version = await session.get(ProfileVersions, ver_id)
+        if version is None:
+            return None
+        if version.delta_depth > 0:
+            version = await self.reconstruct(session, version)
+        self.cache_version(version)
+        return version
+
+    async def reconstruct(
+        self, session: AsyncSession, row: ProfileVersions
+    ) -> ProfileVersions:
+        """rebuild a delta encoded version. Follows the ver_base link ids back to the
+        snapshot in one recursive query, then loads the bodies only of the versions
+        after the nearest cached ancestor
+
+        Args:
+            session (AsyncSession): SQLModel async session object
+            row (ProfileVersions): delta row
+
+        Raises:
+            InvalidPatchException: the chain does not reach a snapshot
+
+        Returns:
+            ProfileVersions: detached version with full ver_data
+        """
+        cached = self._versions.get(row.ver_base)
+        if cached is not None:
+            doc = apply_patch(copy.deepcopy(cached.ver_data), row.ver_delta)
+            return detached(row, doc)
+
+        links = (
+            select(ProfileVersions.ver_id, ProfileVersions.ver_base)
+            .where(ProfileVersions.ver_id == row.ver_base)
+            .cte("links", recursive=True)
+        )
+        links = links.union_all(
+            select(ProfileVersions.ver_id, ProfileVersions.ver_base).join(
+                links, ProfileVersions.ver_id == links.c.ver_base
+            )
+        )
+        result = await session.exec(
+            select(links.c.ver_id, links.c.ver_base).select_from(links)
+        )
+        bases = {ver_id: ver_base for ver_id, ver_base in result.all()}
+
+        # walk newest first until a cached ancestor or the snapshot
+        uncached = []
+        base = None
+        ver_id = row.ver_base
+        while ver_id in bases:
+            cached = self._versions.get(ver_id)
+            if cached is not None:
+                base = cached.ver_data
+                break
+            uncached.append(ver_id)
+            ver_id = bases[ver_id]
+
+        result = await session.exec(
+            select(ProfileVersions).where(ProfileVersions.ver_id.in_(uncached))
+        )
+        bodies = {older.ver_id: older for older in result.all()}
+        chain = [row]
+        for ver_id in uncached:
+            older = bodies[ver_id]
+            if older.delta_depth == 0:
+                base = older.ver_data
+                break
+            chain.append(older)
+        if base is None:
+            raise InvalidPatchException(f"version {row.ver_id} has no snapshot")
+
+        doc = copy.deepcopy(base)
+        for delta in reversed(chain):
+            doc = apply_patch(doc, delta.ver_delta)
+        return detached(row, doc)
+
+    def cache_version(self, version: ProfileVersions):
+        self._versions[version.ver_id] = version
+        self._versions.move_to_end(version.ver_id)
+        if len(self._versions) > self.versions_maxsize:
+            self._versions.popitem(last=False)
+
+    def record(self, profile_name: str, version: ProfileVersions, ver_data: dict):
+        """add a freshly committed version to a loaded timeline and cache its body
+
+        Args:
+            profile_name (str): profile name
+            version (ProfileVersions): new version
+            ver_data (dict): full document, version only holds a delta in delta mode
+        """
+        self.cache_version(
+            version if version.delta_depth == 0 else detached(version, ver_data)
+        )
+        timeline = self._timelines.get(profile_name)
+        if timeline is not None:
+            timeline.add(version.create_dts, version.ver_id)
+
+    def discard(self, profile_names: list[str], ver_ids: list[uuid.UUID]):
+        """forget deleted profiles and their versions
+
+        Args:
+            profile_names (list[str]): profile names
+            ver_ids (list[uuid.UUID]): deleted version ids
+        """
+        for profile_name in profile_names:
+            self._timelines.pop(profile_name, None)
+        for ver_id in ver_ids:
+            self._versions.pop(ver_id, None)
+
+    def clear(self):
+        self._timelines.clear()
+        self._versions.clear()
+
+
+profile_timelines = ProfileTimelineIndex(
+    PROFILE_TIMELINE_TTL, PROFILE_TIMELINE_SIZE, PROFILE_VERSION_CACHE_SIZE
+)
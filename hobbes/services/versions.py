@@ -0,0 +1,138 @@
+"""
+Sortable version keys for dependency resolution.
+
+version_key turns a PEP 440 version (semver strings such as 1.2.3-rc.1 normalize to PEP
+440) into a string whose byte order matches PEP 440 ordering, so it can be stored,
+indexed with dep_name and range scanned. specifier_bounds narrows a specifier set to a
+key range for the index scan; the exact match, including pre-release rules, is
+checked in Python with packaging on the few candidate rows. Versions with a component
+too large for the padding, such as timestamp releases, have no key and are always
+candidates.
+"""
+
+from packaging.specifiers import SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+# release components and numeric suffixes are zero padded to this width
+WIDTH = 10
+# pre-release phases in PEP 440 order
+PRE_PHASES = {"a": "B", "b": "C", "rc": "D"}
+
+
+def number(value: int) -> str:
+    return f"{value:0{WIDTH}d}"
+
+
+def fits(version: Version) -> bool:
+    """whether every numeric component pads to WIDTH digits, longer ones would sort
+    out of PEP 440 order"""
+    numbers = [version.epoch, *version.release]
+    if version.pre is not None:
+        numbers.append(version.pre[1])
+    numbers.extend(value for value in (version.post, version.dev) if value is not None)
+    return max(numbers) < 10**WIDTH
+
+
+def encode(version: Version) -> str:
+    """key of a parsed version, local version labels are ignored
+
+    Layout: epoch, "." + each release component without trailing zeros, then "-"
+    followed by pre, post and dev markers. "-" sorts before "." so 1.0.post1 stays
+    below 1.0.1, and each marker letter orders the phases the way PEP 440 does.
+    """
+    release = list(version.release)
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    key = number(version.epoch) + "".join(f".{number(part)}" for part in release)
+
+    # dev only releases sort before any pre-release of the same version
+    if version.pre is None and version.post is None and version.dev is not None:
+        pre = "A"
+    elif version.pre is None:
+        pre = "E"
+    else:
+        pre = PRE_PHASES[version.pre[0]] + number(version.pre[1])
+    post = "A" if version.post is None else "B" + number(version.post)
+    dev = "B" if version.dev is None else "A" + number(version.dev)
+    return f"{key}-{pre}{post}{dev}"
+
+
+def parse(version: str) -> Version | None:
+    """parsed version or None when it is not PEP 440"""
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
+
+
+def version_key(version: str) -> str | None:
+    """sortable key of a version string
+
+    Args:
+        version (str): PEP 440 or semver version
+
+    Returns:
+        str | None: key or None when the version can not be parsed or does not fit
+    """
+    parsed = parse(version)
+    if parsed is None or not fits(parsed):
+        return None
+    return encode(parsed)
+
+
+def next_prefix(epoch: int, release: tuple[int, ...]) -> Version:
+    """first version after every release starting with the prefix, as a dev release"""
+    bumped = ".".join(map(str, (*release[:-1], release[-1] + 1)))
+    return Version(f"{epoch}!{bumped}.dev0")
+
+
+def specifier_bounds(specifier: SpecifierSet) -> tuple[str | None, str | None]:
+    """inclusive key range that contains every version matched by the specifier set.
+    The range may be wider than the specifier, never narrower
+
+    Args:
+        specifier (SpecifierSet): e.g. >=2.30,<3
+
+    Returns:
+        tuple[str | None, str | None]: low and high keys, None when unbounded
+    """
+    low, high = None, None
+
+    # bounds that do not fit are dropped, widening the range
+    def raise_low(version: Version):
+        nonlocal low
+        if fits(version):
+            key = encode(version)
+            low = key if low is None else max(low, key)
+
+    def lower_high(version: Version):
+        nonlocal high
+        if fits(version):
+            key = encode(version)
+            high = key if high is None else min(high, key)
+
+    for spec in specifier:
+        operator, value = spec.operator, spec.version
+        if operator in ("!=", "==="):
+            continue
+
+        if operator == "==" and value.endswith(".*"):
+            prefix = Version(value[:-2])
+            raise_low(Version(f"{prefix.base_version}.dev0"))
+            lower_high(next_prefix(prefix.epoch, prefix.release))
+            continue
+
+        version = Version(value)
+        if operator in (">=", ">"):
+            raise_low(version)
+        elif operator in ("<=", "<"):
+            # post releases of an inclusive bound are above it, local labels share it
+            lower_high(version)
+        elif operator == "==":
+            raise_low(version)
+            lower_high(version)
+        elif operator == "~=":
+            raise_low(version)
+            lower_high(next_prefix(version.epoch, version.release[:-1]))
+    return low, high
@@ -1,11 +1,57 @@
 import logging
+import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from prometheus_client import start_http_server
+
+from hobbes.db.task_db_manager import session_manager, worker_pool_size
 
 logger = logging.getLogger(__name__)
 
+# port for the worker prometheus endpoint, disabled when unset
+WORKER_METRICS_PORT = os.getenv("WORKER_METRICS_PORT")
+
 # init and configure celery
 celery_app = Celery(__name__)
 
 # find tasks
 celery_app.autodiscover_tasks(["hobbes.core"])
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """expose worker db pool and query metrics on WORKER_METRICS_PORT"""
+    if WORKER_METRICS_PORT:
+        start_http_server(int(WORKER_METRICS_PORT))
+        logger.info("worker metrics on port %s", WORKER_METRICS_PORT)
+
+
+def pool_name(pool_cls) -> str:
+    """celery pool name from the worker pool option, a name or a TaskPool class"""
+    if isinstance(pool_cls, str):
+        return pool_cls.lower()
+    # e.g. celery.concurrency.gevent.TaskPool
+    name = pool_cls.__module__.rsplit(".", 1)[-1]
+    return "threads" if name == "thread" else name
+
+
+@worker_init.connect
+def configure_db_pool(sender, **kwargs):
+    """size the task db pool from the worker concurrency before any task runs"""
+    pool_size, max_overflow = worker_pool_size(
+        sender.concurrency, pool_name(sender.pool_cls)
+    )
+    session_manager.configure(pool_size=pool_size, max_overflow=max_overflow)
+
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    """prefork children must not share the pooled sockets of the parent"""
+    session_manager.after_fork()
+
+
+@worker_process_shutdown.connect
+def close_db_pool(**kwargs):
+    """close the connections of an exiting prefork child"""
+    session_manager.dispose()
@@ -0,0 +1,96 @@
+"""
+Microbenchmark of the compiled FilterEngine against the legacy build_query path used
+by POST /v1/books/search.
+
+Measures statement build time (parse + construct) and end to end execution against an
+in memory sqlite database.
+
+    $ poetry run python -m profiling.bench_filter_engine --rows 20000 --iterations 5000
+"""
+
+import argparse
+import random
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel, and_, select
+
+from hobbes.models.book_models import Book
+from hobbes.services.crud import book_filter, build_query
+
+PAYLOADS = {
+    "eq": {"genre": "mystery"},
+    "range": {
+        "create_datetimestamp": "2024-01-01T00:00:00Z,2024-06-01T00:00:00Z",
+        "condition": "!poor",
+    },
+    "mixed": {
+        "title": ">M",
+        "genre": "mystery",
+        "condition": "new",
+        "create_datetimestamp": "<2024-06-01T00:00:00Z",
+    },
+}
+
+
+def legacy(payload):
+    return select(Book).filter(and_(*build_query(Book, payload))), {}
+
+
+def compiled(payload):
+    return book_filter.compile(payload)
+
+
+def seed(engine, rows):
+    SQLModel.metadata.create_all(engine)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    genres = ["mystery", "fantasy", "history", "poetry"]
+    conditions = ["new", "used", "poor"]
+    with Session(engine) as session:
+        for i in range(rows):
+            session.add(
+                Book(
+                    title=f"title {i}",
+                    isbn=str(uuid.uuid4()),
+                    genre=random.choice(genres),
+                    condition=random.choice(conditions),
+                    create_datetimestamp=start + timedelta(minutes=i),
+                )
+            )
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, args.rows)
+
+    print(f"{'payload':<8} {'path':<9} {'build us':>10} {'execute us':>12}")
+    for name, payload in PAYLOADS.items():
+        for label, build in (("legacy", legacy), ("compiled", compiled)):
+            build_time = timeit.timeit(lambda: build(payload), number=args.iterations)
+
+            with Session(engine) as session:
+
+                def execute():
+                    query, params = build(payload)
+                    session.exec(query, params=params).all()
+
+                exec_iterations = max(args.iterations // 20, 10)
+                exec_time = timeit.timeit(execute, number=exec_iterations)
+
+            print(
+                f"{name:<8} {label:<9} "
+                f"{build_time / args.iterations * 1e6:>10.1f} "
+                f"{exec_time / exec_iterations * 1e6:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Storage and read latency of profile versions stored as full copies against JSON Patch
+deltas with periodic snapshots.
+
+Writes one large profile with many small edits through add_profile_version in each
+storage mode, then reports stored JSON bytes and fetch_by_id latency with the version
+cache cleared (rebuilt from storage) and warm.
+
+    $ poetry run python -m profiling.bench_profile_versions --size-kb 1024 --versions 300
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from hobbes.core.service_iam import TokenData
+from hobbes.models.artifact_models import (
+    ProfileCreatePayload,
+    ProfileCreateVersionPayload,
+    ProfileVersions,
+)
+from hobbes.services import pf_crud
+from hobbes.services.profile_timeline import profile_timelines
+
+TOKEN = TokenData(username="bench", scopes=["write"])
+
+
+def document(size_kb: int) -> dict:
+    sections = max(size_kb // 8, 1)
+    return {
+        f"section{index}": {f"key{key}": "v" * 100 for key in range(64)}
+        for index in range(sections)
+    }
+
+
+async def run(mode: str, interval: int, size_kb: int, versions: int, reads: int):
+    pf_crud.PROFILE_STORAGE_MODE = mode
+    pf_crud.PROFILE_SNAPSHOT_INTERVAL = interval
+    profile_timelines.clear()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_dir}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        session_factory = async_sessionmaker(
+            engine, expire_on_commit=False, class_=AsyncSession
+        )
+
+        doc = document(size_kb)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        async with session_factory() as session:
+            await pf_crud.add_profile(
+                session, ProfileCreatePayload(prf_name="bench", data=doc), TOKEN
+            )
+            for _ in range(versions - 1):
+                section = rng.choice(list(doc))
+                doc[section][f"key{rng.randrange(64)}"] = f"edit {rng.random()}"
+                await pf_crud.add_profile_version(
+                    session, "bench", ProfileCreateVersionPayload(data=doc), TOKEN
+                )
+        write_ms = (time.perf_counter() - start) * 1000
+
+        async with session_factory() as session:
+            rows = (await session.exec(select(ProfileVersions))).all()
+            stored = sum(
+                len(json.dumps(row.ver_data if row.delta_depth == 0 else row.ver_delta))
+                for row in rows
+            )
+            ver_ids = [row.ver_id for row in rows]
+
+            sample = [rng.choice(ver_ids) for _ in range(reads)]
+            start = time.perf_counter()
+            for ver_id in sample:
+                # drop cached bodies and the session identity map so rows are read
+                profile_timelines.clear()
+                session.expunge_all()
+                await pf_crud.fetch_by_id(session, ProfileVersions, ver_id)
+            cold_ms = (time.perf_counter() - start) * 1000 / reads
+
+            for ver_id in sample:
+                await pf_crud.fetch_by_id(session, ProfileVersions, ver_id)
+            start = time.perf_counter()
+            for ver_id in sample:
+                await pf_crud.fetch_by_id(session, ProfileVersions, ver_id)
+            warm_ms = (time.perf_counter() - start) * 1000 / reads
+
+        await engine.dispose()
+    return stored, write_ms, cold_ms, warm_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--versions", type=int, default=200)
+    parser.add_argument("--interval", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<6} {'stored MB':>10} {'write ms':>10} "
+        f"{'cold read ms':>13} {'warm read ms':>13}"
+    )
+    for mode in ("full", "delta"):
+        stored, write_ms, cold_ms, warm_ms = await run(
+            mode, args.interval, args.size_kb, args.versions, args.reads
+        )
+        print(
+            f"{mode:<6} {stored / 1e6:>10.2f} {write_ms:>10.0f} "
+            f"{cold_ms:>13.2f} {warm_ms:>13.4f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""
+Cold start cost of the API process: import time of hobbes.main and the database step
+of the FastAPI lifespan.
+
+Imports hobbes.main in fresh interpreters with -X importtime and reports the median
+total, the packages with the largest self time and any worker-only modules that leaked
+into the API process. Then times create_all against the alembic revision check on a
+temp sqlite database holding every table.
+
+    $ poetry run python -m profiling.bench_startup --runs 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from sqlalchemy import text
+
+from hobbes.db.db_manager import DatabaseAsyncSessionManager, alembic_heads
+
+# modules only celery workers need
+WORKER_MODULES = ("gevent", "psycopg", "hobbes.core.tasks", "hobbes.db.task_db_manager")
+
+
+def import_profile() -> tuple[float, Counter, list[str]]:
+    code = "import sys, hobbes.main; print(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        packages[name.strip().split(".")[0]] += int(self_us)
+        if name.strip() == "hobbes.main":
+            total_us = int(cumulative_us)
+    loaded = set(result.stdout.split())
+    leaked = [name for name in WORKER_MODULES if name in loaded]
+    return total_us / 1000, packages, leaked
+
+
+async def startup(mode: str, runs: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite+aiosqlite:///{tmp_dir}/bench.db"
+        manager = DatabaseAsyncSessionManager()
+        manager.init(url)
+        await manager.init_db()
+        async with manager._engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE alembic_version (version_num TEXT)"))
+            for head in alembic_heads():
+                await conn.execute(
+                    text("INSERT INTO alembic_version VALUES (:head)"), {"head": head}
+                )
+        await manager.close()
+
+        timings = []
+        for _ in range(runs):
+            manager = DatabaseAsyncSessionManager()
+            start = time.perf_counter()
+            manager.init(url)
+            if mode == "check":
+                await manager.check_db(alembic_heads())
+            else:
+                await manager.init_db()
+            timings.append((time.perf_counter() - start) * 1000)
+            await manager.close()
+    return statistics.median(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals, packages, leaked = [], Counter(), set()
+    for _ in range(args.runs):
+        total_ms, run_packages, run_leaked = import_profile()
+        totals.append(total_ms)
+        packages.update(run_packages)
+        leaked.update(run_leaked)
+
+    print(f"import hobbes.main median {statistics.median(totals):.0f} ms")
+    print(f"{'package':<20} {'self ms':>8}")
+    for name, self_us in packages.most_common(args.top):
+        print(f"{name:<20} {self_us / 1000 / args.runs:>8.1f}")
+    print(f"worker modules imported: {', '.join(sorted(leaked)) or 'none'}")
+
+    print(f"{'startup':<20} {'ms':>8}")
+    for mode in ("create_all", "check"):
+        print(f"{mode:<20} {await startup(mode, args.runs):>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
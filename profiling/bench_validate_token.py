@@ -0,0 +1,47 @@
+"""
+Benchmark per request auth overhead of validate_token with the verified claims cache
+disabled (every request runs jwt.decode) and enabled.
+
+    $ poetry run python -m profiling.bench_validate_token --iterations 20000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+from fastapi.security import SecurityScopes
+
+from hobbes.core import service_iam
+from hobbes.core.service_iam import TokenCache, create_access_token, validate_token
+
+
+async def run(iterations: int, cache_size: int, token: str) -> float:
+    service_iam.token_cache = TokenCache(cache_size)
+    scopes = SecurityScopes(["write"])
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await validate_token(scopes, token)
+    return (time.perf_counter() - start) / iterations
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = await create_access_token(
+        data={"sub": "bench", "scope": ["read", "write"]},
+        expires_delta=timedelta(minutes=5),
+    )
+
+    uncached = await run(args.iterations, 0, token)
+    cached = await run(args.iterations, 4096, token)
+    print(f"{'mode':<10} {'us/request':>12}")
+    print(f"{'uncached':<10} {uncached * 1e6:>12.2f}")
+    print(f"{'cached':<10} {cached * 1e6:>12.2f}")
+    print(f"speedup {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -15,7 +15,7 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 
 from hobbes.models.book_models import * # noqa: F403
 from hobbes.main import app
-from hobbes.db.db_manager import get_async_session
+from hobbes.db.db_manager import get_async_session, get_read_session
 from hobbes.core.service_iam import create_access_token
 
 tmp_dir = tempfile.TemporaryDirectory()
@@ -50,6 +50,7 @@ async def override_get_async_session():
 
 
 app.dependency_overrides[get_async_session] = override_get_async_session
+app.dependency_overrides[get_read_session] = override_get_async_session
 asyncio.run(init_db())
 
 
@@ -0,0 +1,492 @@
+import copy
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from hobbes.models.artifact_models import ProfileVersions
+from hobbes.services import pf_crud
+from hobbes.services.json_patch import apply_patch, make_patch
+from hobbes.services.profile_timeline import profile_timelines
+from hobbes.services.versions import version_key
+
+
+@pytest.mark.asyncio
+async def test_profiles(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    name = f"profile-{uuid.uuid4()}"
+
+    response = client.post(
+        "/v1/profiles",
+        json={"prf_name": name, "description": "test", "data": {"a": 1}},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    prf_id = response.json()["prf_id"]
+    first_dts = response.json()["create_dts"]
+
+    response = client.post(
+        f"/v1/profiles/{name}/versions", json={"data": {"a": 2}}, headers=headers
+    )
+    assert response.status_code == 201
+    ver_id = response.json()["ver_id"]
+
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["ver_data"] == {"a": 2}
+
+    # as-of lookups resolve against the in-memory timeline
+    response = client.get(
+        f"/v1/profiles/{name}",
+        params={"search_date": first_dts},
+        headers=headers,
+    )
+    assert response.json()["ver_data"] == {"a": 1}
+
+    response = client.get(
+        f"/v1/profiles/{name}",
+        params={"search_date": "2000-01-01T00:00:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 404
+
+    response = client.get(f"/v1/profiles/versions/{ver_id}", headers=headers)
+    assert response.json()["ver_data"] == {"a": 2}
+
+    response = client.get(f"/v1/profiles/{name}/versions", headers=headers)
+    assert len(response.json()) == 2
+
+    response = client.get("/v1/profiles", headers=headers)
+    assert response.status_code == 200
+    assert name in {profile["prf_name"] for profile in response.json()["profiles"]}
+
+    response = client.delete(f"/v1/profiles/{prf_id}", headers=headers)
+    assert response.status_code == 200
+
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_search_profiles(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    prefix = f"Search_{uuid.uuid4().hex[:8]}"
+    for index in range(3):
+        name = f"{prefix}-{index}"
+        client.post(
+            "/v1/profiles",
+            json={"prf_name": name, "data": {"v": 1}},
+            headers=headers,
+        )
+        client.post(
+            f"/v1/profiles/{name}/versions", json={"data": {"v": 2}}, headers=headers
+        )
+
+    # latest version only, case insensitive prefix
+    response = client.get(
+        "/v1/profiles/search",
+        params={"profile_name": prefix.lower()},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert [row["prf_name"] for row in response.json()] == [
+        f"{prefix}-{index}" for index in range(3)
+    ]
+    assert all(row["version"]["ver_data"] == {"v": 2} for row in response.json())
+
+    # LIKE wildcards in the prefix are literal
+    response = client.get(
+        "/v1/profiles/search", params={"profile_name": "%"}, headers=headers
+    )
+    assert response.status_code == 404
+
+    names = []
+    params = {"profile_name": prefix, "limit": 2}
+    while True:
+        response = client.get("/v1/profiles/search", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        names.extend(row["prf_name"] for row in page["rows"])
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert names == [f"{prefix}-{index}" for index in range(3)]
+
+    response = client.get(
+        "/v1/profiles/search",
+        params={"profile_name": prefix, "cursor": "bad"},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_repositories_and_dependencies(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post(
+        "/v1/artifacts/repositories",
+        json={
+            "rep_name": f"repo-{uuid.uuid4()}",
+            "rep_type": "pypi",
+            "url": "https://pypi.org/simple",
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    rep_id = response.json()["rep_id"]
+
+    response = client.post(
+        "/v1/artifacts/dependencies",
+        json={"dep_name": f"dep-{uuid.uuid4()}", "version": "1.0.0", "rep_id": rep_id},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    dep_id = response.json()["dep_id"]
+
+    response = client.get("/v1/artifacts/dependencies", headers=headers)
+    assert response.status_code == 200
+    assert dep_id in {row["dep_id"] for row in response.json()["rows"]}
+
+    response = client.delete(f"/v1/artifacts/dependencies/{dep_id}", headers=headers)
+    assert response.status_code == 200
+    response = client.get(f"/v1/artifacts/dependencies/{dep_id}", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profile_delta_storage(client: TestClient, token: str, monkeypatch):
+    monkeypatch.setattr(pf_crud, "PROFILE_STORAGE_MODE", "delta")
+    monkeypatch.setattr(pf_crud, "PROFILE_SNAPSHOT_INTERVAL", 3)
+    headers = {"Authorization": f"Bearer {token}"}
+    name = f"delta-{uuid.uuid4()}"
+
+    docs = [
+        {"a": {"b": index, "c/~": [index]}, "keep": "x" * 100} for index in range(7)
+    ]
+    docs[4] = {"keep": "y", "new": None}
+    client.post(
+        "/v1/profiles", json={"prf_name": name, "data": docs[0]}, headers=headers
+    )
+    ver_ids = []
+    for doc in docs[1:]:
+        response = client.post(
+            f"/v1/profiles/{name}/versions", json={"data": doc}, headers=headers
+        )
+        assert response.json()["ver_data"] == doc
+        ver_ids.append(response.json()["ver_id"])
+
+    # rebuild from storage instead of the write path cache
+    profile_timelines.clear()
+    for ver_id, doc in zip(ver_ids, docs[1:]):
+        response = client.get(f"/v1/profiles/versions/{ver_id}", headers=headers)
+        assert response.json()["ver_data"] == doc
+        assert "ver_delta" not in response.json()
+
+    response = client.get(f"/v1/profiles/{name}/versions", headers=headers)
+    assert [row["ver_data"] for row in response.json()] == docs
+
+    profile_timelines.clear()
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.json()["ver_data"] == docs[-1]
+
+    response = client.get(
+        "/v1/profiles/search", params={"profile_name": name}, headers=headers
+    )
+    assert response.json()[0]["version"]["ver_data"] == docs[-1]
+
+
+@pytest.mark.asyncio
+async def test_profile_delta_chain_ignores_clock_skew(
+    client: TestClient, token: str, monkeypatch
+):
+    monkeypatch.setattr(pf_crud, "PROFILE_STORAGE_MODE", "delta")
+    headers = {"Authorization": f"Bearer {token}"}
+    name = f"skew-{uuid.uuid4()}"
+    docs = [{"step": index, "tags": ["x"] * index} for index in range(4)]
+    client.post(
+        "/v1/profiles", json={"prf_name": name, "data": docs[0]}, headers=headers
+    )
+
+    # every later write comes from a host whose clock is a day behind
+    behind = datetime.now(timezone.utc) - timedelta(days=1)
+    monkeypatch.setattr(pf_crud, "gen_utcnow", lambda: behind)
+    responses = [
+        client.post(
+            f"/v1/profiles/{name}/versions", json={"data": doc}, headers=headers
+        ).json()
+        for doc in docs[1:]
+    ]
+    create_dts = [response["create_dts"] for response in responses]
+    assert create_dts == sorted(create_dts)
+
+    profile_timelines.clear()
+    for response, doc in zip(responses, docs[1:]):
+        version = client.get(
+            f"/v1/profiles/versions/{response['ver_id']}", headers=headers
+        ).json()
+        assert version["ver_data"] == doc
+
+    response = client.get(f"/v1/profiles/{name}/versions", headers=headers)
+    assert [row["ver_data"] for row in response.json()] == docs
+
+
+@pytest.mark.asyncio
+async def test_profile_delta_reconstruct_stops_at_cached_ancestor(
+    client: TestClient, token: str, monkeypatch
+):
+    monkeypatch.setattr(pf_crud, "PROFILE_STORAGE_MODE", "delta")
+    headers = {"Authorization": f"Bearer {token}"}
+    name = f"chain-{uuid.uuid4()}"
+    client.post(
+        "/v1/profiles", json={"prf_name": name, "data": {"v": 0}}, headers=headers
+    )
+    ver_ids = [
+        client.post(
+            f"/v1/profiles/{name}/versions", json={"data": {"v": v}}, headers=headers
+        ).json()["ver_id"]
+        for v in range(1, 6)
+    ]
+
+    loaded = []
+
+    def record(session, instance):
+        if isinstance(instance, ProfileVersions):
+            loaded.append(str(instance.ver_id))
+
+    profile_timelines.clear()
+    event.listen(Session, "loaded_as_persistent", record)
+    try:
+        response = client.get(f"/v1/profiles/versions/{ver_ids[2]}", headers=headers)
+        assert response.json()["ver_data"] == {"v": 3}
+        assert len(loaded) == 4
+
+        # version 3 is cached, only the newer bodies are loaded
+        loaded.clear()
+        response = client.get(f"/v1/profiles/versions/{ver_ids[4]}", headers=headers)
+        assert response.json()["ver_data"] == {"v": 5}
+        assert sorted(loaded) == sorted(ver_ids[3:])
+    finally:
+        event.remove(Session, "loaded_as_persistent", record)
+
+
+@pytest.mark.asyncio
+async def test_profile_timeline_refresh_is_incremental(
+    client: TestClient, token: str, monkeypatch
+):
+    headers = {"Authorization": f"Bearer {token}"}
+    name = f"refresh-{uuid.uuid4()}"
+    client.post(
+        "/v1/profiles", json={"prf_name": name, "data": {"v": 0}}, headers=headers
+    )
+    for v in range(1, 3):
+        client.post(
+            f"/v1/profiles/{name}/versions", json={"data": {"v": v}}, headers=headers
+        )
+
+    loads = []
+    load = profile_timelines.load
+
+    async def counted_load(session, profile_name):
+        loads.append(profile_name)
+        return await load(session, profile_name)
+
+    profile_timelines.clear()
+    monkeypatch.setattr(profile_timelines, "ttl", 0)
+    monkeypatch.setattr(profile_timelines, "load", counted_load)
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.json()["ver_data"] == {"v": 2}
+    assert loads == [name]
+
+    # writes and deletes from another process never reach this index
+    monkeypatch.setattr(profile_timelines, "record", lambda *args: None)
+    monkeypatch.setattr(profile_timelines, "discard", lambda *args: None)
+    prf_id = client.post(
+        f"/v1/profiles/{name}/versions", json={"data": {"v": 3}}, headers=headers
+    ).json()["prf_id"]
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.json()["ver_data"] == {"v": 3}
+    assert loads == [name]
+    assert len(profile_timelines._timelines[name].entries) == 4
+
+    client.delete(f"/v1/profiles/{prf_id}", headers=headers)
+    response = client.get(f"/v1/profiles/{name}", headers=headers)
+    assert response.status_code == 404
+    assert name not in profile_timelines._timelines
+
+
+def test_json_patch_round_trip():
+    src = {"a": 1, "b": {"c": [1, 2], "d": True}, "e/f": "x"}
+    dst = {"a": 1.0, "b": {"c": [1, 2, 3]}, "e/f": "y", "g": {"h": None}}
+    patch = make_patch(src, dst)
+    assert apply_patch(copy.deepcopy(src), patch) == dst
+    assert make_patch(dst, dst) == []
+    assert apply_patch({"a": 1}, make_patch({"a": 1}, [1])) == [1]
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post(
+        "/v1/artifacts/repositories",
+        json={"rep_name": f"repo-{uuid.uuid4()}", "rep_type": "git", "url": "x"},
+        headers=headers,
+    )
+    rep_id = response.json()["rep_id"]
+    dep_ids = [
+        client.post(
+            "/v1/artifacts/dependencies",
+            json={"dep_name": f"dep-{uuid.uuid4()}", "version": "1", "rep_id": rep_id},
+            headers=headers,
+        ).json()["dep_id"]
+        for _ in range(2)
+    ]
+
+    name = f"bulk-{uuid.uuid4()}"
+    response = client.post(
+        "/v1/profiles", json={"prf_name": name, "data": {"a": 1}}, headers=headers
+    )
+    prf_id = response.json()["prf_id"]
+    client.post(f"/v1/profiles/{name}/versions", json={"data": {}}, headers=headers)
+
+    response = client.post(
+        "/v1/artifacts/delete",
+        json={
+            "repositories": [rep_id],
+            "profiles": [prf_id, str(uuid.uuid4())],
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["repositories"] == [rep_id]
+    assert sorted(response.json()["dependencies"]) == sorted(dep_ids)
+    assert response.json()["profiles"] == [prf_id]
+
+    response = client.get(f"/v1/artifacts/dependencies/{dep_ids[0]}", headers=headers)
+    assert response.status_code == 404
+    response = client.get(f"/v1/profiles/{name}/versions", headers=headers)
+    assert response.status_code == 404
+
+    response = client.delete(f"/v1/profiles/{prf_id}", headers=headers)
+    assert response.status_code == 404
+    response = client.delete(f"/v1/artifacts/repositories/{rep_id}", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_resolve_dependencies(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post(
+        "/v1/artifacts/repositories",
+        json={"rep_name": f"repo-{uuid.uuid4()}", "rep_type": "pypi", "url": "x"},
+        headers=headers,
+    )
+    rep_id = response.json()["rep_id"]
+    name = f"lib-{uuid.uuid4().hex[:8]}"
+    versions = ["2.9.1", "2.30.0", "2.31.0", "2.32.0rc1", "3.0.0", "not-pep440"]
+    versions += ["20231018120000", "20240101000000"]
+    for version in versions:
+        client.post(
+            "/v1/artifacts/dependencies",
+            json={"dep_name": name, "version": version, "rep_id": rep_id},
+            headers=headers,
+        )
+
+    requirements = [
+        f"{name}>=2.30,<3",
+        f"{name}==2.*",
+        f"{name}~=2.9.0",
+        f"{name}>=2.32rc1,<3",
+        f"{name}>4",
+        f"missing-{name}",
+        f"{name}>=2.30,<20240101000000",
+        f"{name}<20231018120001",
+    ]
+    response = client.post(
+        "/v1/artifacts/dependencies/resolve",
+        json={"requirements": requirements},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    versions = [
+        row["dependency"]["version"] if row["dependency"] else None
+        for row in response.json()
+    ]
+    assert versions == [
+        "2.31.0",
+        "2.31.0",
+        "2.9.1",
+        "2.32.0rc1",
+        "20240101000000",
+        None,
+        "20231018120000",
+        "20231018120000",
+    ]
+
+    response = client.post(
+        "/v1/artifacts/dependencies/resolve",
+        json={"requirements": ["bad requirement >>"]},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+def test_version_key_order():
+    ordered = ["1.0.dev0", "1.0a1", "1.0rc1", "1.0", "1.0.post1", "1.0.1", "1.10"]
+    keys = [version_key(version) for version in ordered]
+    assert keys == sorted(keys)
+    assert version_key("1.0") == version_key("1.0.0")
+    # components past the padding would sort below shorter numbers, so no key
+    assert version_key("20231018120000") is None
+    assert version_key("1.0.post12345678901") is None
+    assert version_key("9999999999") is not None
+
+
+@pytest.mark.asyncio
+async def test_dependencies_cursor_include_repository(client: TestClient, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    repositories = {}
+    for _ in range(2):
+        response = client.post(
+            "/v1/artifacts/repositories",
+            json={"rep_name": f"repo-{uuid.uuid4()}", "rep_type": "git", "url": "u"},
+            headers=headers,
+        )
+        repositories[response.json()["rep_id"]] = response.json()["rep_name"]
+    for index, rep_id in enumerate(list(repositories) * 2):
+        client.post(
+            "/v1/artifacts/dependencies",
+            json={"dep_name": "cursor-dep", "version": f"{index}.0", "rep_id": rep_id},
+            headers=headers,
+        )
+
+    rows = []
+    params = {"cursor": "", "limit": 3, "include": "repository"}
+    while True:
+        response = client.get(
+            "/v1/artifacts/dependencies", params=params, headers=headers
+        )
+        assert response.status_code == 200
+        rows.extend(response.json()["rows"])
+        if response.json()["next_cursor"] is None:
+            break
+        params["cursor"] = response.json()["next_cursor"]
+
+    keys = [(row["dep_name"], row["version"]) for row in rows]
+    assert keys == sorted(keys)
+    mine = [row for row in rows if row["dep_name"] == "cursor-dep"]
+    assert len(mine) == 4
+    assert all(
+        row["repository"]["rep_name"] == repositories[row["rep_id"]] for row in mine
+    )
+
+    response = client.get(
+        "/v1/artifacts/repositories", params={"cursor": "", "limit": 1}, headers=headers
+    )
+    assert response.json()["next_cursor"] is not None
+    response = client.get(
+        "/v1/artifacts/repositories", params={"cursor": "bad"}, headers=headers
+    )
+    assert response.status_code == 400
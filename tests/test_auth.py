@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import jwt
+import ldap3
+import pytest
+from fastapi import HTTPException
+from fastapi.security import SecurityScopes
+
+from hobbes.core import service_iam
+from hobbes.core.service_iam import LDAPAuth, TokenCache, TokenData, validate_token
+
+
+@pytest.mark.asyncio
+async def test_validate_token_cached(token: str, monkeypatch):
+    service_iam.token_cache.clear()
+    calls = []
+    decode_token = service_iam.decode_token
+
+    async def counting_decode(raw):
+        calls.append(raw)
+        return await decode_token(raw)
+
+    monkeypatch.setattr(service_iam, "decode_token", counting_decode)
+
+    for _ in range(3):
+        token_data = await validate_token(SecurityScopes(["write"]), token)
+        assert token_data.username == "tester"
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException) as error:
+        await validate_token(SecurityScopes(["admin"]), token)
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_validate_token_rejects_invalid():
+    with pytest.raises(HTTPException) as error:
+        await validate_token(SecurityScopes(["read"]), "not.a.token")
+    assert error.value.status_code == 401
+
+    expired = await service_iam.create_access_token(
+        data={"sub": "tester", "scope": ["read"]}, expires_delta=timedelta(minutes=-1)
+    )
+    with pytest.raises(HTTPException):
+        await validate_token(SecurityScopes(["read"]), expired)
+
+
+def test_token_cache_expiry_and_eviction():
+    cache = TokenCache(maxsize=2)
+    token_data = TokenData(username="tester", scopes=["read"])
+    scopes = frozenset(token_data.scopes)
+
+    cache.put(b"expired", time.time() - 1, token_data, scopes)
+    assert cache.get(b"expired") is None
+
+    cache.put(b"a", time.time() + 60, token_data, scopes)
+    cache.put(b"b", time.time() + 60, token_data, scopes)
+    assert cache.get(b"a") is not None
+    cache.put(b"c", time.time() + 60, token_data, scopes)
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+
+
+@pytest.mark.asyncio
+async def test_login_runs_off_event_loop(client, monkeypatch):
+    threads = []
+
+    def fake_authenticate(username, password):
+        threads.append(threading.current_thread().name)
+        return ["read", "write"]
+
+    monkeypatch.setattr(LDAPAuth, "authenticate", staticmethod(fake_authenticate))
+    response = client.post(
+        "/auth/token", data={"username": "tester", "password": "secret"}
+    )
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    assert threads[0].startswith("ldap-bind")
+
+
+@pytest.mark.asyncio
+async def test_login_fails_fast_when_saturated(client, monkeypatch):
+    monkeypatch.setattr(LDAPAuth, "pending", service_iam.ldap_max_pending)
+    response = client.post(
+        "/auth/token", data={"username": "tester", "password": "secret"}
+    )
+    assert response.status_code == 503
+
+
+def test_ldap_logins_release_pool_state(monkeypatch):
+    monkeypatch.setattr(service_iam, "testing_mode", 0)
+    monkeypatch.setattr(service_iam, "ldap_urls", ["ldap://127.0.0.1"])
+    # rejected binds, the connection is registered with the pool on construction
+    monkeypatch.setattr(ldap3.Connection, "bind", lambda self, *args, **kwargs: False)
+    service_iam.ldap_server_pool.cache_clear()
+    try:
+        for _ in range(3):
+            assert LDAPAuth.authenticate("tester", "secret") is None
+        assert service_iam.ldap_server_pool().pool_states == {}
+    finally:
+        service_iam.ldap_server_pool.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_login_holds_slot_until_bind_finishes(monkeypatch):
+    started = threading.Event()
+    finish = threading.Event()
+
+    def slow_authenticate(username, password):
+        started.set()
+        finish.wait(5)
+        return ["read", "write"]
+
+    monkeypatch.setattr(LDAPAuth, "authenticate", staticmethod(slow_authenticate))
+    monkeypatch.setattr(LDAPAuth, "pending", 0)
+    login = asyncio.create_task(LDAPAuth.authenticate_async("tester", "secret"))
+    await asyncio.to_thread(started.wait, 5)
+    login.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await login
+    # the bind thread is still running so the slot stays taken
+    assert LDAPAuth.pending == 1
+
+    finish.set()
+    for _ in range(100):
+        if LDAPAuth.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert LDAPAuth.pending == 0
+
+
+def test_ldap_pool_rechecks_offline_servers(monkeypatch):
+    monkeypatch.setattr(service_iam, "testing_mode", 0)
+    monkeypatch.setattr(
+        service_iam, "ldap_urls", ["ldap://ldap-a.test", "ldap://ldap-b.test"]
+    )
+    online = set()
+
+    def check_availability(self, *args, **kwargs):
+        return self.host in online
+
+    def bind(self, *args, **kwargs):
+        # what Connection.open does before sending the bind request
+        self.server = self.server_pool.get_server(self)
+        self.bound = True
+        return True
+
+    monkeypatch.setattr(ldap3.Server, "check_availability", check_availability)
+    monkeypatch.setattr(ldap3.Connection, "bind", bind)
+    monkeypatch.setattr(ldap3.Connection, "unbind", lambda self: True)
+    loop_timeout = ldap3.get_config_parameter("POOLING_LOOP_TIMEOUT")
+    ldap3.set_config_parameter("POOLING_LOOP_TIMEOUT", 0)
+    service_iam.ldap_server_pool.cache_clear()
+    try:
+        # every server down fails fast instead of looping forever
+        with pytest.raises(service_iam.LDAPUnavailableException):
+            LDAPAuth.authenticate("tester", "secret")
+
+        # back online but still inside the exhaust window
+        online.add("ldap-b.test")
+        with pytest.raises(service_iam.LDAPUnavailableException):
+            LDAPAuth.authenticate("tester", "secret")
+
+        # once the window passes the offline servers are checked again
+        exhausted = timedelta(seconds=service_iam.ldap_exhaust_seconds + 1)
+        for state in service_iam.ldap_server_pool()._pool_state.server_states:
+            state.last_checked_time -= exhausted
+        assert LDAPAuth.authenticate("tester", "secret") == ["read", "write"]
+    finally:
+        ldap3.set_config_parameter("POOLING_LOOP_TIMEOUT", loop_timeout)
+        service_iam.ldap_server_pool.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_login_unavailable_when_no_ldap_server(client, monkeypatch):
+    def unavailable(username, password):
+        raise service_iam.LDAPUnavailableException("no ldap server reachable")
+
+    monkeypatch.setattr(LDAPAuth, "authenticate", staticmethod(unavailable))
+    response = client.post(
+        "/auth/token", data={"username": "tester", "password": "secret"}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(service_iam.ldap_exhaust_seconds)
+
+
+@pytest.mark.asyncio
+async def test_validate_token_rejects_unknown_key_id(monkeypatch):
+    service_iam.token_cache.clear()
+    jwks = jwt.PyJWKClient("https://keys.test/jwks.json")
+    key_set = {
+        "keys": [{"kty": "oct", "kid": "current", "k": "c2VjcmV0", "alg": "HS256"}]
+    }
+    monkeypatch.setattr(jwks, "fetch_data", lambda: key_set)
+    monkeypatch.setattr(service_iam, "verification_key", jwks)
+
+    token = jwt.encode(
+        {"sub": "tester", "scope": ["read"]},
+        "rotated-out",
+        algorithm="HS256",
+        headers={"kid": "rotated"},
+    )
+    with pytest.raises(HTTPException) as error:
+        await validate_token(SecurityScopes(["read"]), token)
+    assert error.value.status_code == 401
@@ -0,0 +1,134 @@
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from starlette.requests import Request
+
+from hobbes.db import db_manager
+from hobbes.db.db_manager import DatabaseAsyncSessionManager, pinned_to_primary
+from hobbes.models.book_models import Book
+
+
+async def create_db(url: str, *books: Book):
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with engine.begin() as conn:
+        for book in books:
+            await conn.execute(Book.__table__.insert().values(**book.model_dump()))
+    await engine.dispose()
+
+
+def marker_book(title: str) -> Book:
+    return Book(title=title, isbn=f"{uuid.uuid4()}", genre="test", condition="new")
+
+
+async def read_titles(manager, use_primary=False) -> set[str]:
+    async with manager.read_session(use_primary) as session:
+        result = await session.exec(select(Book.title))
+        return set(result.all())
+
+
+@pytest.mark.asyncio
+async def test_read_session_routes_to_replica(tmp_path):
+    primary = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    replica = f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+    await create_db(primary, marker_book("primary"))
+    await create_db(replica, marker_book("replica"))
+
+    manager = DatabaseAsyncSessionManager()
+    manager.init(primary, [replica])
+    try:
+        assert await read_titles(manager) == {"replica"}
+        assert await read_titles(manager, use_primary=True) == {"primary"}
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_read_session_ejects_unhealthy_replica(tmp_path):
+    primary = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    replica = f"sqlite+aiosqlite:///{tmp_path}/replica.db"
+    missing = f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db"
+    await create_db(primary, marker_book("primary"))
+    await create_db(replica, marker_book("replica"))
+
+    manager = DatabaseAsyncSessionManager()
+    manager.init(primary, [missing, replica])
+    try:
+        with pytest.raises(Exception):
+            await read_titles(manager)
+        assert not manager._replicas[0].healthy
+
+        # ejected replica is skipped by the round robin
+        assert await read_titles(manager) == {"replica"}
+        assert await read_titles(manager) == {"replica"}
+
+        manager._replicas[1].ejected_until = time.monotonic() + 30
+        assert await read_titles(manager) == {"primary"}
+    finally:
+        await manager.close()
+
+
+def test_read_your_writes_pin(monkeypatch):
+    def request(cookie: str | None) -> Request:
+        headers = []
+        if cookie:
+            headers.append((b"cookie", f"hobbes_primary_until={cookie}".encode()))
+        return Request({"type": "http", "method": "GET", "headers": headers})
+
+    fresh = str(time.time() + 10)
+    assert not pinned_to_primary(request(fresh))
+
+    monkeypatch.setattr(db_manager, "DB_READ_YOUR_WRITES_SECONDS", 5)
+    assert pinned_to_primary(request(fresh))
+    assert not pinned_to_primary(request(str(time.time() - 1)))
+    assert not pinned_to_primary(request("garbage"))
+    assert not pinned_to_primary(request(None))
+
+
+@pytest.mark.asyncio
+async def test_check_db_alembic_revision(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path}/primary.db"
+    await create_db(url)
+    heads = db_manager.alembic_heads()
+    assert len(heads) == 1
+
+    manager = DatabaseAsyncSessionManager()
+    manager.init(url)
+    try:
+        with pytest.raises(db_manager.SchemaRevisionException):
+            await manager.check_db(heads)
+
+        async with manager._engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE alembic_version (version_num TEXT)"))
+            await conn.execute(
+                text("INSERT INTO alembic_version VALUES ('3f1a9c2d7b10')")
+            )
+        with pytest.raises(db_manager.SchemaRevisionException):
+            await manager.check_db(heads)
+
+        async with manager._engine.begin() as conn:
+            await conn.execute(
+                text("UPDATE alembic_version SET version_num = :head"),
+                {"head": heads.pop()},
+            )
+        await manager.check_db(db_manager.alembic_heads())
+    finally:
+        await manager.close()
+
+
+def test_api_import_skips_worker_modules():
+    code = (
+        "import sys, hobbes.main; "
+        "print(sorted({'gevent', 'hobbes.core.tasks', 'tomllib'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
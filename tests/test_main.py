@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+import time
 import uuid
 from fastapi.testclient import TestClient
 from datetime import datetime, timezone
@@ -26,6 +30,68 @@ async def test_get_books(client: TestClient):
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_get_books_etag(client: TestClient, token: str):
+    response = client.get("/v1/books", params={"limit": 5})
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/v1/books", params={"limit": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # a write invalidates the cached page
+    data = {
+        "title": "The Three Musketeers",
+        "isbn": f"{uuid.uuid4()}",
+        "genre": "adventure",
+        "condition": "new",
+    }
+    client.post("/v1/books", json=data, headers={"Authorization": f"Bearer {token}"})
+
+    response = client.get(
+        "/v1/books", params={"limit": 5}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["rows"][0]["isbn"] == data["isbn"]
+
+
+@pytest.mark.asyncio
+async def test_get_books_cache_reads_primary(client: TestClient, monkeypatch):
+    from hobbes.db import db_manager
+    from hobbes.main import app
+    from hobbes.routers import apis_v1
+
+    sessions = []
+    all_books = apis_v1.all_books
+
+    async def recording_all_books(session, offset, limit):
+        sessions.append(session)
+        return await all_books(session, offset, limit)
+
+    monkeypatch.setattr(apis_v1, "all_books", recording_all_books)
+    monkeypatch.setattr(db_manager, "DB_READ_YOUR_WRITES_SECONDS", 30)
+    monkeypatch.setitem(
+        app.dependency_overrides, db_manager.get_read_session, lambda: "replica"
+    )
+    params = {"limit": 3, "offset": 1}
+
+    client.get("/v1/books", params=params)
+    client.get("/v1/books", params=params)
+    assert len(sessions) == 1
+
+    # a client pinned after a write skips entries other processes may still hold
+    client.cookies.set(db_manager.PRIMARY_PIN_COOKIE, str(time.time() + 30))
+    try:
+        client.get("/v1/books", params=params)
+    finally:
+        client.cookies.clear()
+    assert len(sessions) == 2
+    assert "replica" not in sessions
+
+
 @pytest.mark.asyncio
 async def test_get_book_by_date(client: TestClient, token: str):
     response = client.get(
@@ -60,3 +126,317 @@ async def test_search_book(client: TestClient, token: str):
         "/v1/books/search", json=data, headers={"Authorization": f"Bearer {token}"}
     )
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_books_cursor(client: TestClient, token: str):
+    for _ in range(3):
+        data = {
+            "title": "Count of Monte Cristo",
+            "isbn": f"{uuid.uuid4()}",
+            "genre": "mystery",
+            "condition": "new",
+        }
+        response = client.post(
+            "/v1/books", json=data, headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+
+    response = client.get("/v1/books", params={"limit": 100})
+    total = response.json()["total"]
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/v1/books", params={"limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["rows"]) <= 2
+        seen.extend(row["book_id"] for row in body["rows"])
+        cursor = body["next_cursor"]
+
+    assert len(seen) == total
+    assert len(set(seen)) == total
+
+    response = client.get("/v1/books", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_books(client: TestClient, token: str):
+    isbn = f"{uuid.uuid4()}"
+    data = {
+        "title": "Count of Monte Cristo",
+        "isbn": isbn,
+        "genre": "mystery",
+        "condition": "new",
+    }
+    response = client.post(
+        "/v1/books", json=data, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 201
+
+    response = client.get(
+        "/v1/books/export",
+        params={"date_param": "2000-01-01T00:00:00Z", "compare": "gt"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == client.get("/v1/books").json()["total"]
+    assert isbn in {json.loads(line)["isbn"] for line in lines}
+
+    response = client.post(
+        "/v1/books/export/search", params={"fmt": "csv"}, json={"isbn": isbn}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["isbn"] == isbn
+
+
+@pytest.mark.asyncio
+async def test_search_book_operators(client: TestClient, token: str):
+    genre = f"genre-{uuid.uuid4()}"
+    isbns = []
+    for title in ["Dune", "Dune Messiah", "Emma", "Persuasion"]:
+        isbn = f"{uuid.uuid4()}"
+        isbns.append(isbn)
+        data = {"title": title, "isbn": isbn, "genre": genre, "condition": "used"}
+        response = client.post(
+            "/v1/books", json=data, headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 201
+
+    def search(data):
+        response = client.post("/v1/books/search", json={"genre": genre, **data})
+        assert response.status_code == 200
+        return response.json()
+
+    assert {b["title"] for b in search({"title": "Dune*"})} == {"Dune", "Dune Messiah"}
+    assert {b["title"] for b in search({"title": "[Emma,Persuasion]"})} == {
+        "Emma",
+        "Persuasion",
+    }
+    assert {b["title"] for b in search({"title": "Emma|Dune"})} == {"Emma", "Dune"}
+    assert {
+        b["title"] for b in search({"any_of": [{"title": "Emma"}, {"isbn": isbns[3]}]})
+    } == {"Emma", "Persuasion"}
+
+    seen = []
+    page = search({"limit": 3})
+    seen.extend(b["isbn"] for b in page["rows"])
+    assert page["next_cursor"]
+    page = search({"limit": 3, "cursor": page["next_cursor"]})
+    seen.extend(b["isbn"] for b in page["rows"])
+    assert page["next_cursor"] is None
+    assert sorted(seen) == sorted(isbns)
+
+    response = client.post(
+        "/v1/books/search", json={"create_datetimestamp": ">not-a-date"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_books(client: TestClient, token: str):
+    genre = f"genre-{uuid.uuid4()}"
+    rows = [
+        {
+            "title": f"title {i}",
+            "isbn": f"{uuid.uuid4()}",
+            "genre": genre,
+            "condition": "new",
+        }
+        for i in range(5)
+    ]
+    rows.insert(2, {"title": "missing isbn", "genre": genre, "condition": "new"})
+
+    response = client.post(
+        "/v1/books/bulk", json=rows, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 201
+    body = response.json()
+    assert body["inserted"] == 5
+    assert [err["index"] for err in body["errors"]] == [2]
+
+    lines = [json.dumps(row) for row in rows[:2]] + ["{not json", ""]
+    response = client.post(
+        "/v1/books/bulk",
+        content="\n".join(lines),
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+    assert response.status_code == 201
+    body = response.json()
+    assert body["inserted"] == 2
+    assert [err["index"] for err in body["errors"]] == [2]
+
+    response = client.post("/v1/books/search", json={"genre": genre})
+    assert len(response.json()) == 7
+
+    response = client.post(
+        "/v1/books/bulk",
+        json={"title": "x"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_task_result_page(client: TestClient, monkeypatch):
+    from hobbes.routers import apis_v1
+
+    async def fake_read(task_id, page):
+        if page == 0:
+            return b'[{"title": "Emma"}]'
+        return None
+
+    monkeypatch.setattr(apis_v1, "read_result_chunk", fake_read)
+
+    response = client.get("/v1/books/tasks/result/abc", params={"page": 0})
+    assert response.status_code == 200
+    assert response.json() == [{"title": "Emma"}]
+
+    response = client.get("/v1/books/tasks/result/abc", params={"page": 1})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_status_batch(client: TestClient, monkeypatch):
+    from hobbes.routers import apis_v1
+
+    metas = {
+        "a": {"status": "SUCCESS", "result": {"pages": 1}, "task_id": "a"},
+        "b": {"status": "PROGRESS", "result": {"moved": 10}, "task_id": "b"},
+    }
+
+    async def fake_fetch(task_ids):
+        return [metas.get(task_id) for task_id in task_ids]
+
+    monkeypatch.setattr(apis_v1, "fetch_task_metas", fake_fetch)
+
+    response = client.post("/v1/books/tasks/status", json={"task_ids": ["a", "b", "c"]})
+    assert response.status_code == 200
+    assert [task["task_status"] for task in response.json()] == [
+        "SUCCESS",
+        "PROGRESS",
+        "PENDING",
+    ]
+    assert response.json()[1]["task_progress"] == {"moved": 10}
+
+
+@pytest.mark.asyncio
+async def test_task_status_events(client: TestClient, monkeypatch):
+    from hobbes.routers import apis_v1
+
+    async def fake_watch(task_ids):
+        yield "a", {"status": "STARTED", "result": None}
+        yield None
+        yield "a", {"status": "SUCCESS", "result": True}
+
+    monkeypatch.setattr(apis_v1, "watch_task_metas", fake_watch)
+
+    response = client.get("/v1/books/tasks/events", params={"task_id": ["a"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = response.text.strip().split("\n\n")
+    assert frames[1] == ": keep-alive"
+    assert json.loads(frames[2].split("data: ")[1])["task_status"] == "SUCCESS"
+    assert frames[-1].startswith("event: done")
+
+
+@pytest.mark.asyncio
+async def test_task_status_events_timeout(client: TestClient, monkeypatch):
+    from hobbes.routers import apis_v1
+
+    async def fake_watch(task_ids):
+        yield "a", None
+        raise TimeoutError("1 tasks not ready")
+
+    monkeypatch.setattr(apis_v1, "watch_task_metas", fake_watch)
+
+    response = client.get("/v1/books/tasks/events", params={"task_id": ["a"]})
+    frames = response.text.strip().split("\n\n")
+    assert frames[0].startswith("event: status")
+    assert frames[-1].startswith("event: timeout")
+
+
+@pytest.mark.asyncio
+async def test_watch_task_metas_stops_at_max_duration(monkeypatch):
+    import asyncio
+
+    from hobbes.core import result_store
+
+    class FakePubSub:
+        closed = False
+
+        async def subscribe(self, *channels):
+            pass
+
+        async def get_message(self, ignore_subscribe_messages, timeout):
+            await asyncio.sleep(timeout)
+            return None
+
+        async def unsubscribe(self):
+            pass
+
+        async def aclose(self):
+            self.closed = True
+
+    pubsub = FakePubSub()
+
+    class FakeRedis:
+        def pubsub(self):
+            return pubsub
+
+        async def mget(self, keys):
+            return [None for _ in keys]
+
+    monkeypatch.setattr(result_store, "async_client", lambda: FakeRedis())
+    monkeypatch.setattr(result_store, "TASK_EVENTS_KEEPALIVE", 0.01)
+    monkeypatch.setattr(result_store, "TASK_EVENTS_MAX_SECONDS", 0.05)
+
+    # an unknown id never becomes ready
+    events = []
+    with pytest.raises(TimeoutError):
+        async for event in result_store.watch_task_metas(["unknown"]):
+            events.append(event)
+    assert events[0] == ("unknown", None)
+    assert None in events
+    assert pubsub.closed
+
+
+@pytest.mark.asyncio
+async def test_metrics(client: TestClient, tmp_path):
+    from prometheus_client import generate_latest
+    from sqlalchemy import create_engine, text
+
+    from hobbes.core.metrics import InstrumentedQueuePool, instrument_engine
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/metrics.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        pool_logging_name="test",
+    )
+    instrument_engine(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    output = generate_latest().decode()
+    assert 'hobbes_db_pool_checkout_wait_seconds_count{pool="test"} 1.0' in output
+    assert (
+        'hobbes_db_query_duration_seconds_count{pool="test",statement="SELECT"}'
+        in output
+    )
+    assert 'hobbes_db_pool_size{pool="test"} 2.0' in output
+    engine.dispose()
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/health"' in response.text
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlmodel import Session, SQLModel, func, select
+
+from hobbes.core import tasks
+from hobbes.core.metrics import checkout_waits
+from hobbes.core.tasks import move_books_batch
+from hobbes.db import task_db_manager
+from hobbes.models.book_models import Book, BookArchive
+
+
+@pytest.fixture(scope="function")
+def sync_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/tasks.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_move_books_batch(sync_session: Session):
+    now = datetime.now(timezone.utc)
+    for days in range(5):
+        sync_session.add(
+            Book(
+                title=f"book {days}",
+                isbn=f"{uuid.uuid4()}",
+                genre="mystery",
+                condition="new",
+                create_datetimestamp=now - timedelta(days=days),
+            )
+        )
+    sync_session.commit()
+
+    cutoff = now - timedelta(hours=12)
+    assert len(move_books_batch(sync_session, cutoff, 3)) == 3
+    assert len(move_books_batch(sync_session, cutoff, 3)) == 1
+    assert move_books_batch(sync_session, cutoff, 3) == []
+
+    assert sync_session.exec(select(func.count()).select_from(Book)).one() == 1
+    archived = sync_session.exec(select(BookArchive)).all()
+    assert len(archived) == 4
+    assert {book.title for book in archived} == {f"book {d}" for d in range(1, 5)}
+
+
+def test_store_inventory_chunks(sync_session: Session, monkeypatch):
+    for i in range(5):
+        sync_session.add(
+            Book(
+                title=f"book {i}",
+                isbn=f"{uuid.uuid4()}",
+                genre="mystery",
+                condition="new",
+            )
+        )
+    sync_session.commit()
+
+    pages = {}
+    monkeypatch.setattr(tasks, "RESULT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(
+        tasks,
+        "write_result_chunk",
+        lambda task_id, page, rows: pages.setdefault((task_id, page), rows),
+    )
+
+    result = tasks.store_inventory_chunks("task-1", sync_session)
+    assert result == {"pages": 3, "rows": 5, "chunk_size": 2}
+    assert [len(pages[("task-1", page)]) for page in range(3)] == [2, 2, 1]
+    assert json.loads(pages[("task-1", 0)][0])["genre"] == "mystery"
+
+
+def test_fair_queue_pool_fifo(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=task_db_manager.InstrumentedFairQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=5,
+    )
+    slots = engine.pool._slots
+    order = []
+
+    def checkout(index):
+        with engine.connect():
+            order.append(index)
+
+    held = engine.connect()
+    threads = []
+    for index in range(3):
+        thread = threading.Thread(target=checkout, args=(index,))
+        thread.start()
+        threads.append(thread)
+        while len(slots._waiters) <= index:
+            time.sleep(0.001)
+
+    waits = []
+    token = checkout_waits.set(waits)
+    held.close()
+    for thread in threads:
+        thread.join()
+    with engine.connect():
+        pass
+    checkout_waits.reset(token)
+
+    assert order == [0, 1, 2]
+    assert len(waits) == 1
+    engine.dispose()
+
+
+def test_fair_queue_pool_timeout(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=task_db_manager.FairQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    assert not engine.pool._slots._waiters
+    with engine.connect():
+        pass
+    engine.dispose()
+
+
+def test_worker_pool_size(monkeypatch):
+    monkeypatch.setattr(task_db_manager, "DB_WORKER_POOL_MAX", 50)
+    assert task_db_manager.worker_pool_size(100, "gevent") == (50, 0)
+    assert task_db_manager.worker_pool_size(8, "gevent") == (8, 0)
+    assert task_db_manager.worker_pool_size(4, "prefork") == (
+        task_db_manager.DB_CHILD_POOL_SIZE,
+        0,
+    )
+    assert task_db_manager.worker_pool_size(4, "custom") == (
+        task_db_manager.DB_POOL_SIZE,
+        task_db_manager.DB_MAX_OVERFLOW,
+    )
+
+
+def test_session_manager_after_fork(tmp_path):
+    manager = task_db_manager.DatabaseSessionManager()
+    manager.configure(f"sqlite:///{tmp_path}/fork.db", pool_size=1, max_overflow=0)
+    inherited = manager._engine.connect()
+    parent_pool = manager._engine.pool
+
+    manager.after_fork()
+    assert manager._engine.pool is not parent_pool
+    assert manager._engine.pool.size() == 1
+    assert isinstance(manager._engine.pool, task_db_manager.FairQueuePool)
+    # the parent's connection is left open and the child gets a fresh one
+    with manager._engine.connect() as conn:
+        assert conn.connection.dbapi_connection is not (
+            inherited.connection.dbapi_connection
+        )
+    assert not inherited.closed
+
+    inherited.close()
+    manager.dispose()
@@ -0,0 +1,176 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from hobbes.models.book_models import Hero, MutantClass, Team
+from hobbes.services import crud
+from hobbes.services.crud import search_recent_team_member
+
+
+@pytest_asyncio.fixture(scope="function")
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/teams.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_search_recent_team_member(session: AsyncSession):
+    now = datetime.now(timezone.utc)
+    teams = [Team(name=f"team {index}", headquarters="hq") for index in range(3)]
+    session.add_all(teams)
+    for team in teams[:2]:
+        for minutes in range(3):
+            session.add(
+                Hero(
+                    name=f"{team.name} hero {minutes}",
+                    secret_name=str(uuid.uuid4()),
+                    level=MutantClass.ALPHA,
+                    team_id=team.tid,
+                    create_datetimestamp=now - timedelta(minutes=minutes),
+                )
+            )
+    await session.commit()
+
+    recent = await search_recent_team_member(session)
+    assert list(recent) == ["team 0", "team 1"]
+    assert recent["team 0"].name == "team 0 hero 0"
+    assert recent["team 1"].team_id == teams[1].tid
+
+
+def test_import_roster(client: TestClient, monkeypatch):
+    # small chunks so teams and heroes span several INSERT statements
+    monkeypatch.setattr(crud, "ROSTER_BATCH_SIZE", 2)
+    prefix = uuid.uuid4()
+    teams = [
+        {
+            "name": f"{prefix} team {index}",
+            "headquarters": "hq",
+            "heroes": [
+                {
+                    "name": f"{prefix} hero {index}.{hero}",
+                    "secret_name": "secret",
+                    "level": "alpha",
+                    "powers": {"flight": True},
+                }
+                for hero in range(index)
+            ],
+        }
+        for index in range(4)
+    ]
+
+    response = client.post("/v1/teams/roster", json={"teams": teams})
+    assert response.status_code == 201
+    body = response.json()
+    assert body["heroes"] == 6
+    assert [team["heroes"] for team in body["teams"]] == [0, 1, 2, 3]
+
+    response = client.get("/v1/teams/recent_heroes")
+    assert response.status_code == 200
+    recent = response.json()
+    assert f"{prefix} team 0" not in recent
+    for team in body["teams"][1:]:
+        hero = recent[team["name"]]
+        assert hero["team_id"] == team["tid"]
+        assert hero["powers"] == {"flight": True}
+
+
+def test_roster_chunk_size_bind_limit(monkeypatch):
+    monkeypatch.setattr(crud, "ROSTER_BATCH_SIZE", 100_000)
+    for model in (Team, Hero):
+        chunk = crud.roster_chunk_size(model)
+        assert chunk * len(model.__table__.columns) <= crud.MAX_BIND_PARAMS
+        assert (chunk + 1) * len(model.__table__.columns) > crud.MAX_BIND_PARAMS
+
+    monkeypatch.setattr(crud, "ROSTER_BATCH_SIZE", 50)
+    assert crud.roster_chunk_size(Hero) == 50
+
+
+def test_search_hero_powers(client: TestClient):
+    prefix = str(uuid.uuid4())
+    powers = [
+        {"fire": {"range": 3}, "flight": True},
+        {"fire": {"range": 5}, "tags": ["x", "y"]},
+        {"fire": {"range": 3}, "tags": ["x", "y"], "marker": prefix},
+        None,
+    ]
+    heroes = [
+        {
+            "name": f"hero {index}",
+            "secret_name": "secret",
+            "level": "alpha" if index else "beta",
+            "powers": {**power, "team": prefix} if power else None,
+        }
+        for index, power in enumerate(powers)
+    ]
+    response = client.post(
+        "/v1/teams/roster",
+        json={"teams": [{"name": prefix, "headquarters": "hq", "heroes": heroes}]},
+    )
+    tid = response.json()["teams"][0]["tid"]
+
+    def search(**payload):
+        response = client.post(
+            "/v1/teams/heroes/search", json={"team_id": tid, **payload}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        return sorted(hero["name"] for hero in body["rows"]), body["next_cursor"]
+
+    assert search(contains={"fire": {"range": 3}}) == (["hero 0", "hero 2"], None)
+    assert search(contains={"tags": ["x", "y"]}, level="alpha")[0] == [
+        "hero 1",
+        "hero 2",
+    ]
+    assert search(has_keys=["flight"])[0] == ["hero 0"]
+    assert search(has_keys=["tags", "marker"])[0] == ["hero 2"]
+    assert search(path_equals=[{"path": ["fire", "range"], "value": 5}])[0] == [
+        "hero 1"
+    ]
+    assert search(level="beta", contains={"fire": {"range": 5}})[0] == []
+
+    names, cursor = search(contains={"team": prefix}, limit=2)
+    assert len(names) == 2 and cursor
+    rest, cursor = search(contains={"team": prefix}, limit=2, cursor=cursor)
+    assert sorted(names + rest) == ["hero 0", "hero 1", "hero 2"]
+    assert cursor is None
+
+    response = client.post("/v1/teams/heroes/search", json={"cursor": "bad"})
+    assert response.status_code == 400
+
+
+def test_insert_hero_team_cache(client: TestClient):
+    name = str(uuid.uuid4())
+    crud.team_ids.clear()
+    response = client.post("/v1/teams/team", json={"name": name, "headquarters": "hq"})
+    assert response.status_code == 201
+    tid = response.json()["tid"]
+    assert str(crud.team_ids.get(name)) == tid
+
+    response = client.post("/v1/teams/team", json={"name": name, "headquarters": "x"})
+    assert response.status_code == 409
+
+    # a cold cache resolves the name once then serves it from memory
+    crud.team_ids.clear()
+    hero = {"name": "hero", "secret_name": "secret", "level": "omega"}
+    response = client.post(f"/v1/teams/hero/{name}", json=hero)
+    assert response.status_code == 201
+    assert response.json()["team_id"] == tid
+    assert response.json()["level"] == "omega"
+    assert str(crud.team_ids.get(name)) == tid
+
+    response = client.post(f"/v1/teams/hero/{uuid.uuid4()}", json=hero)
+    assert response.status_code == 404
+
+    roster = {"teams": [{"name": name, "headquarters": "hq", "heroes": [hero]}]}
+    response = client.post("/v1/teams/roster", json=roster)
+    assert response.status_code == 409